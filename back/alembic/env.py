@@ -14,6 +14,10 @@ from app.models.models import Base # Импорт вашей модели Base 
 # access to the values within the .ini file in use.
 config = context.config
 
+# URL базы из окружения приложения имеет приоритет над alembic.ini
+if os.getenv("DATABASE_URL"):
+    config.set_main_option("sqlalchemy.url", os.getenv("DATABASE_URL"))
+
 # Interpret the config file for Python logging.
 # This line sets up loggers based on the
 # 'sqlalchemy.log.file' setting.
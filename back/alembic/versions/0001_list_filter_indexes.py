@@ -0,0 +1,61 @@
+"""Индексы под фильтры списков заявок и инцидентов
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NOT_NULL_ENGINEER = sa.text("aviation_engineer_id IS NOT NULL")
+
+# (таблица, имя индекса, колонки, условие частичного индекса)
+INDEXES = (
+    ("maintenance_requests", "ix_maintenance_requests_created_at_id", ["created_at", "id"], None),
+    ("maintenance_requests", "ix_maintenance_requests_status_created_at_id", ["status", "created_at", "id"], None),
+    ("maintenance_requests", "ix_maintenance_requests_aircraft_id_created_at_id", ["aircraft_id", "created_at", "id"], None),
+    (
+        "maintenance_requests", "ix_maintenance_requests_aviation_engineer_id_created_at_id",
+        ["aviation_engineer_id", "created_at", "id"], NOT_NULL_ENGINEER,
+    ),
+    ("incidents", "ix_incidents_created_at_id", ["created_at", "id"], None),
+    ("incidents", "ix_incidents_status_created_at_id", ["status", "created_at", "id"], None),
+    ("incidents", "ix_incidents_aviation_engineer_id_created_at_id", ["aviation_engineer_id", "created_at", "id"], None),
+    (
+        "incidents", "ix_incidents_quality_control_specialist_id_created_at_id",
+        ["quality_control_specialist_id", "created_at", "id"], None,
+    ),
+)
+
+
+def _existing_indexes(table: str) -> set:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return set()
+    return {index["name"] for index in inspector.get_indexes(table)}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Таблицы могли быть созданы через Base.metadata.create_all вместе с индексами - пропускаем существующие
+    for table, name, columns, where in INDEXES:
+        if name in _existing_indexes(table):
+            continue
+        op.create_index(name, table, columns, postgresql_where=where, sqlite_where=where)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, name, columns, where in reversed(INDEXES):
+        if name in _existing_indexes(table):
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,38 @@
+"""Дата разрешения инцидента
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_column(table: str, column: str) -> bool:
+    inspector = sa.inspect(op.get_bind())
+    return any(c["name"] == column for c in inspector.get_columns(table))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Для уже разрешенных инцидентов дата разрешения неизвестна: resolved_at остается NULL,
+    # такие инциденты не попадают в среднее время разрешения
+    if not _has_column("incidents", "resolved_at"):
+        op.add_column("incidents", sa.Column("resolved_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if _has_column("incidents", "resolved_at"):
+        with op.batch_alter_table("incidents") as batch_op:
+            batch_op.drop_column("resolved_at")
@@ -0,0 +1,90 @@
+"""Дневные агрегаты для аналитики
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _day(bind, column: str) -> str:
+    if bind.dialect.name == "sqlite":
+        return f"date({column})"
+    return f"CAST({column} AS DATE)"
+
+
+def _seconds(bind, start: str, end: str) -> str:
+    if bind.dialect.name == "sqlite":
+        return f"(julianday({end}) - julianday({start})) * 86400"
+    return f"EXTRACT(epoch FROM {end} - {start})"
+
+
+def _backfill(bind, metric: str, day: str, dimension: str, value_sum: str, source: str, where: str) -> None:
+    """Агрегаты по существующим данным; ключи (день, показатель, измерение), уже записанные приложением, не меняются"""
+    op.execute(f"""
+        INSERT INTO daily_rollups (day, metric, dimension, count, value_sum)
+        SELECT backfill.day, '{metric}', backfill.dimension, backfill.count, backfill.value_sum
+        FROM (
+            SELECT {_day(bind, day)} AS day, {dimension} AS dimension, COUNT(*) AS count, {value_sum} AS value_sum
+            FROM {source} WHERE {where}
+            GROUP BY {_day(bind, day)}, {dimension}
+        ) AS backfill
+        WHERE NOT EXISTS (
+            SELECT 1 FROM daily_rollups existing
+            WHERE existing.day = backfill.day AND existing.metric = '{metric}'
+              AND existing.dimension = backfill.dimension
+        )
+    """)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    # Приложение создает таблицы через create_all при старте, поэтому таблица может уже существовать -
+    # тогда пропускается только создание, заполнение выполняется всегда
+    if not sa.inspect(bind).has_table("daily_rollups"):
+        op.create_table(
+            "daily_rollups",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("day", sa.Date(), nullable=False),
+            sa.Column("metric", sa.String(), nullable=False),
+            sa.Column("dimension", sa.String(), nullable=False),
+            sa.Column("count", sa.Integer(), nullable=False),
+            sa.Column("value_sum", sa.Float(), nullable=False),
+            sa.UniqueConstraint("day", "metric", "dimension", name="uq_daily_rollups_day_metric_dimension"),
+        )
+        op.create_index("ix_daily_rollups_id", "daily_rollups", ["id"])
+        op.create_index("ix_daily_rollups_metric_day", "daily_rollups", ["metric", "day"])
+
+    # Заполнение по существующим данным. История переходов статусов не хранилась,
+    # поэтому заявки учитываются один раз - в текущем статусе на дату создания.
+    _backfill(
+        bind, "maintenance_requests.status", day="created_at", dimension="status", value_sum="0",
+        source="maintenance_requests", where="created_at IS NOT NULL",
+    )
+    _backfill(
+        bind, "incidents.created", day="created_at", dimension="CAST(aircraft_id AS VARCHAR)", value_sum="0",
+        source="incidents", where="created_at IS NOT NULL",
+    )
+    _backfill(
+        bind, "incidents.resolved", day="resolved_at", dimension="CAST(quality_control_specialist_id AS VARCHAR)",
+        value_sum=f"SUM({_seconds(bind, 'created_at', 'resolved_at')})",
+        source="incidents", where="resolved_at IS NOT NULL AND created_at IS NOT NULL",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if sa.inspect(op.get_bind()).has_table("daily_rollups"):
+        op.drop_table("daily_rollups")
@@ -0,0 +1,54 @@
+"""Состав типов наборов в таблице связей
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX_NAME = "ix_tool_set_type_tool_types_tool_type_id"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if INDEX_NAME not in {index["name"] for index in inspector.get_indexes("tool_set_type_tool_types")}:
+        op.create_index(INDEX_NAME, "tool_set_type_tool_types", ["tool_type_id"])
+
+    # Перенос состава из JSON tool_type_ids в таблицу связей (ID несуществующих типов пропускаются)
+    tool_type_ids = set(bind.execute(sa.text("SELECT id FROM tool_types")).scalars())
+    existing = set(bind.execute(sa.text(
+        "SELECT tool_set_type_id, tool_type_id FROM tool_set_type_tool_types"
+    )).tuples())
+    rows = []
+    for tool_set_type_id, raw_ids in bind.execute(sa.text("SELECT id, tool_type_ids FROM tool_set_types")):
+        ids = json.loads(raw_ids) if isinstance(raw_ids, str) else (raw_ids or [])
+        for tool_type_id in dict.fromkeys(ids):
+            if tool_type_id in tool_type_ids and (tool_set_type_id, tool_type_id) not in existing:
+                rows.append({"tool_set_type_id": tool_set_type_id, "tool_type_id": tool_type_id})
+    if rows:
+        op.bulk_insert(
+            sa.table("tool_set_type_tool_types", sa.column("tool_set_type_id"), sa.column("tool_type_id")),
+            rows
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Данные связей остаются: JSON-проекция поддерживалась синхронно
+    inspector = sa.inspect(op.get_bind())
+    if INDEX_NAME in {index["name"] for index in inspector.get_indexes("tool_set_type_tool_types")}:
+        op.drop_index(INDEX_NAME, table_name="tool_set_type_tool_types")
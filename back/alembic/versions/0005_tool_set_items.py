@@ -0,0 +1,67 @@
+"""Партийные номера инструментов в наборах (tool_set_items)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    # Приложение создает таблицы через create_all при старте, поэтому таблица может уже существовать -
+    # тогда пропускается только создание, заполнение выполняется всегда
+    if sa.inspect(bind).has_table("tool_set_items"):
+        tool_set_items = sa.table(
+            "tool_set_items",
+            sa.column("tool_set_id", sa.Integer()),
+            sa.column("tool_type_id", sa.Integer()),
+            sa.column("batch_number", sa.String()),
+        )
+    else:
+        tool_set_items = op.create_table(
+            "tool_set_items",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("tool_set_id", sa.Integer(), sa.ForeignKey("tool_sets.id"), nullable=False),
+            sa.Column("tool_type_id", sa.Integer(), sa.ForeignKey("tool_types.id"), nullable=False),
+            sa.Column("batch_number", sa.String(), nullable=False),
+            sa.UniqueConstraint("tool_set_id", "tool_type_id", name="uq_tool_set_items_tool_set_id_tool_type_id"),
+        )
+        op.create_index("ix_tool_set_items_id", "tool_set_items", ["id"])
+        op.create_index("ix_tool_set_items_batch_number", "tool_set_items", ["batch_number"])
+
+    # Заполнение из batch_map существующих наборов (ключи несуществующих типов и пары,
+    # уже записанные приложением, пропускаются)
+    tool_type_ids = set(bind.execute(sa.text("SELECT id FROM tool_types")).scalars())
+    existing = set(bind.execute(sa.text("SELECT tool_set_id, tool_type_id FROM tool_set_items")).tuples())
+    rows = []
+    for tool_set_id, raw_map in bind.execute(sa.text("SELECT id, batch_map FROM tool_sets")):
+        batch_map = json.loads(raw_map) if isinstance(raw_map, str) else (raw_map or {})
+        for tool_type_id, batch_number in batch_map.items():
+            try:
+                tool_type_id = int(tool_type_id)
+            except (TypeError, ValueError):
+                continue
+            if tool_type_id in tool_type_ids and batch_number and (tool_set_id, tool_type_id) not in existing:
+                rows.append({"tool_set_id": tool_set_id, "tool_type_id": tool_type_id, "batch_number": batch_number})
+    if rows:
+        op.bulk_insert(tool_set_items, rows)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if sa.inspect(op.get_bind()).has_table("tool_set_items"):
+        op.drop_table("tool_set_items")
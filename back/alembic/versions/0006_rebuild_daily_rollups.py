@@ -0,0 +1,68 @@
+"""Пересчет дневных агрегатов по исходным таблицам
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+METRICS = ("maintenance_requests.status", "incidents.created", "incidents.resolved")
+
+
+def _day(bind, column: str) -> str:
+    if bind.dialect.name == "sqlite":
+        return f"date({column})"
+    return f"CAST({column} AS DATE)"
+
+
+def _seconds(bind, start: str, end: str) -> str:
+    if bind.dialect.name == "sqlite":
+        return f"(julianday({end}) - julianday({start})) * 86400"
+    return f"EXTRACT(epoch FROM {end} - {start})"
+
+
+def _rebuild(bind, metric: str, day: str, dimension: str, value_sum: str, source: str, where: str) -> None:
+    op.execute(f"""
+        INSERT INTO daily_rollups (day, metric, dimension, count, value_sum)
+        SELECT {_day(bind, day)}, '{metric}', {dimension}, COUNT(*), {value_sum}
+        FROM {source} WHERE {where}
+        GROUP BY {_day(bind, day)}, {dimension}
+    """)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # До пересчета по затронутым дням агрегаты только увеличивались (удаления и повторное разрешение
+    # инцидента не учитывались) - пересчитываем все дни по текущим строкам, как в заполнении 0003
+    bind = op.get_bind()
+    metrics = ", ".join(f"'{metric}'" for metric in METRICS)
+    op.execute(f"DELETE FROM daily_rollups WHERE metric IN ({metrics})")
+    _rebuild(
+        bind, "maintenance_requests.status", day="created_at", dimension="status", value_sum="0",
+        source="maintenance_requests", where="created_at IS NOT NULL",
+    )
+    _rebuild(
+        bind, "incidents.created", day="created_at", dimension="CAST(aircraft_id AS VARCHAR)", value_sum="0",
+        source="incidents", where="created_at IS NOT NULL",
+    )
+    _rebuild(
+        bind, "incidents.resolved", day="resolved_at", dimension="CAST(quality_control_specialist_id AS VARCHAR)",
+        value_sum=f"SUM({_seconds(bind, 'created_at', 'resolved_at')})",
+        source="incidents", where="resolved_at IS NOT NULL AND created_at IS NOT NULL",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Только данные: прежние (завышенные) значения не восстанавливаются
+    pass
@@ -0,0 +1,168 @@
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import Date, and_, cast, delete, event, func, select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+from app.models import models
+
+# Показатели дневных агрегатов (models.DailyRollup.metric): число текущих строк исходной таблицы
+# за день по разрезу - то же, что дает заполнение по существующим данным в миграциях 0003/0006
+MAINTENANCE_REQUESTS_BY_STATUS = "maintenance_requests.status"  # день создания, разрез: текущий статус заявки
+INCIDENTS_BY_AIRCRAFT = "incidents.created"                      # день создания, разрез: ID самолета
+INCIDENTS_RESOLVED_BY_QC = "incidents.resolved"                  # день разрешения, разрез: ID специалиста КК, value_sum - секунды до разрешения
+
+
+def seconds_between(dialect_name: str, start, end):
+    """Разница двух DateTime-выражений в секундах в SQL диалекта БД"""
+    if dialect_name == "sqlite":
+        return (func.julianday(end) - func.julianday(start)) * 86400
+    return func.extract("epoch", end - start)
+
+
+def _day(dialect_name: str, column):
+    """Дата DateTime-выражения по часам БД"""
+    if dialect_name == "sqlite":
+        return func.date(column, type_=Date)
+    return cast(column, Date)
+
+
+def _on_day(dialect_name: str, column, day):
+    """Условие column в пределах дня day; в PostgreSQL - диапазоном, чтобы работали индексы по column"""
+    if dialect_name == "sqlite":
+        return func.date(column) == day.isoformat()
+    start = datetime.combine(day, time.min)
+    return and_(column >= start, column < start + timedelta(days=1))
+
+
+def _enum_value(value):
+    return getattr(value, "value", value)
+
+
+# Агрегат: показатель, исходная модель, колонка дня, колонка разреза, сумма значения (или None)
+Rollup = namedtuple("Rollup", "metric model day_column dimension_column value")
+
+ROLLUPS = (
+    Rollup(MAINTENANCE_REQUESTS_BY_STATUS, models.MaintenanceRequest, "created_at", "status", None),
+    Rollup(INCIDENTS_BY_AIRCRAFT, models.Incident, "created_at", "aircraft_id", None),
+    Rollup(
+        INCIDENTS_RESOLVED_BY_QC, models.Incident, "resolved_at", "quality_control_specialist_id",
+        lambda dialect_name: seconds_between(dialect_name, models.Incident.created_at, models.Incident.resolved_at),
+    ),
+)
+ROLLUPS_BY_MODEL = {
+    model: [rollup for rollup in ROLLUPS if rollup.model is model]
+    for model in {rollup.model for rollup in ROLLUPS}
+}
+
+
+def _bucket_keys(connection, model, ids) -> set:
+    """Ключи (агрегат, день, разрез) строк model с данными ID в их текущем состоянии в БД"""
+    rollups = ROLLUPS_BY_MODEL[model]
+    dialect_name = connection.dialect.name
+    columns = []
+    for rollup in rollups:
+        columns.append(_day(dialect_name, getattr(model, rollup.day_column)))
+        columns.append(getattr(model, rollup.dimension_column))
+    keys = set()
+    for row in connection.execute(select(*columns).where(model.id.in_(ids))):
+        for index, rollup in enumerate(rollups):
+            day, dimension = row[2 * index], row[2 * index + 1]
+            if day is not None and dimension is not None:
+                keys.add((rollup, day, dimension))
+    return keys
+
+
+def rebuild(connection, rollup: Rollup, day, dimension):
+    """
+    Пересчет одного агрегата (день, разрез) по исходной таблице.
+
+    Запрос ограничен одним днем и одним значением разреза, поэтому таблица целиком не сканируется.
+    """
+    table = models.DailyRollup.__table__
+    dimension_value = str(_enum_value(dimension))
+    connection.execute(delete(table).where(
+        table.c.day == day, table.c.metric == rollup.metric, table.c.dimension == dimension_value
+    ))
+
+    model = rollup.model
+    dialect_name = connection.dialect.name
+    value = func.coalesce(func.sum(rollup.value(dialect_name)), 0.0) if rollup.value else 0.0
+    query = select(func.count(), value).select_from(model).where(
+        _on_day(dialect_name, getattr(model, rollup.day_column), day),
+        getattr(model, rollup.dimension_column) == dimension,
+    )
+    if rollup.value is not None:
+        query = query.where(model.created_at.is_not(None))
+    count, value_sum = connection.execute(query).one()
+    if count:
+        connection.execute(table.insert().values(
+            day=day, metric=rollup.metric, dimension=dimension_value, count=count, value_sum=value_sum
+        ))
+
+
+def _affects_rollups(obj) -> bool:
+    """Изменена колонка дня или разреза хотя бы одного агрегата"""
+    return any(
+        get_history(obj, rollup.day_column).has_changes() or get_history(obj, rollup.dimension_column).has_changes()
+        for rollup in ROLLUPS_BY_MODEL[type(obj)]
+    )
+
+
+PENDING_KEY = "analytics_pending_rollups"
+
+
+@event.listens_for(Session, "before_flush")
+def collect_rollups(session, flush_context, instances):
+    """
+    Запоминает агрегаты, затронутые изменениями заявок и инцидентов.
+
+    Для измененных и удаленных строк ключи агрегатов читаются из БД до flush (прежний день
+    и разрез), для новых и измененных - после flush в update_rollups.
+    """
+    pending = session.info.setdefault(PENDING_KEY, {"keys": set(), "objects": []})
+    previous = {}
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if type(obj) not in ROLLUPS_BY_MODEL:
+            continue
+        if obj in session.new:
+            pending["objects"].append(obj)
+        elif obj in session.deleted:
+            previous.setdefault(type(obj), []).append(obj.id)
+        elif _affects_rollups(obj):
+            previous.setdefault(type(obj), []).append(obj.id)
+            pending["objects"].append(obj)
+    if previous:
+        connection = session.connection()
+        for model, ids in previous.items():
+            pending["keys"] |= _bucket_keys(connection, model, ids)
+
+
+@event.listens_for(Session, "after_flush")
+def update_rollups(session, flush_context):
+    """
+    Пересчитывает затронутые дневные агрегаты в той же транзакции, что и изменения.
+
+    Срабатывает для любого пути изменения (эндпоинты заявок, инцидентов, фикстуры). Агрегат
+    пересчитывается по исходным строкам своего дня и разреза, поэтому удаление, смена статуса
+    и повторное разрешение инцидента не накапливают расхождений с исходными таблицами.
+    """
+    pending = session.info.pop(PENDING_KEY, None)
+    if not pending:
+        return
+    connection = session.connection()
+    keys = pending["keys"]
+    current = {}
+    for obj in pending["objects"]:
+        current.setdefault(type(obj), []).append(obj.id)
+    for model, ids in current.items():
+        keys |= _bucket_keys(connection, model, ids)
+    for rollup, day, dimension in sorted(keys, key=lambda key: (key[0].metric, key[1], str(_enum_value(key[2])))):
+        rebuild(connection, rollup, day, dimension)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_rollups(session):
+    """Изменения не записаны - агрегаты по ним тоже не обновляем"""
+    session.info.pop(PENDING_KEY, None)
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from typing import List
 from .dependencies import get_db, get_current_user
 from app.schemas import aircraft_schema
 from app.models import models
+from app.bulk import check_bulk_size, payload_duplicates, bulk_insert
 
 router = APIRouter(prefix="/aircraft", tags=["Воздушные судная"])
 
@@ -52,6 +54,51 @@ def create_aircraft(
     db.refresh(db_aircraft)
     return db_aircraft
 
+@router.post(
+    "/bulk",
+    response_model=aircraft_schema.AircraftBulkResult,
+    status_code=status.HTTP_201_CREATED,
+    summary="Массово создать самолеты",
+    description="Создает список самолетов одной транзакцией с проверкой каждого элемента"
+)
+def bulk_create_aircrafts(
+    payload: aircraft_schema.AircraftBulkCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Массовое создание самолетов.
+    
+    - **items**: Список самолетов в формате одиночного создания
+    
+    Уникальность бортовых номеров проверяется одним запросом на весь список,
+    корректные элементы вставляются одним запросом. Элементы с ошибками не создаются
+    и перечисляются в **errors** с позицией в запросе.
+    
+    Требуется аутентификация.
+    """
+    items = payload.items
+    check_bulk_size(items)
+    
+    tail_numbers = [item.tail_number for item in items]
+    existing_tail_numbers = set(db.scalars(
+        select(models.Aircraft.tail_number).where(models.Aircraft.tail_number.in_(tail_numbers))
+    ))
+    duplicate_tail_numbers = payload_duplicates(tail_numbers)
+    
+    rows, errors = [], []
+    for index, item in enumerate(items):
+        if item.tail_number in existing_tail_numbers:
+            errors.append({"index": index, "detail": "Aircraft with this tail number already exists"})
+        elif item.tail_number in duplicate_tail_numbers:
+            errors.append({"index": index, "detail": "Duplicate tail number in request"})
+        else:
+            rows.append(item.model_dump())
+    
+    created = bulk_insert(db, models.Aircraft, rows)
+    db.commit()
+    return {"created": created, "errors": errors}
+
 @router.get(
     "/", 
     response_model=List[aircraft_schema.Aircraft],
@@ -0,0 +1,139 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from typing import List, Optional, Tuple
+from datetime import date, timedelta
+from collections import defaultdict
+from .dependencies import get_db, get_current_user
+from app.models import models
+from app.schemas import analytics_schema, maintenance_request_schema
+from app import analytics
+
+router = APIRouter(prefix="/analytics", tags=["Аналитика"])
+
+# Период по умолчанию, если границы не переданы
+DEFAULT_PERIOD_DAYS = 30
+
+def _period(date_from: Optional[date], date_to: Optional[date]) -> Tuple[date, date]:
+    date_to = date_to or date.today()
+    date_from = date_from or date_to - timedelta(days=DEFAULT_PERIOD_DAYS)
+    if date_from > date_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="date_from must be before date_to"
+        )
+    return date_from, date_to
+
+def _rollups(metric: str, date_from: date, date_to: date):
+    return select(models.DailyRollup).where(
+        models.DailyRollup.metric == metric,
+        models.DailyRollup.day >= date_from,
+        models.DailyRollup.day <= date_to,
+    )
+
+@router.get(
+    "/maintenance-requests/daily",
+    response_model=List[analytics_schema.DailyStatusCount],
+    summary="Заявки по статусам по дням",
+    description="Количество заявок, созданных за день, по их текущему статусу из дневных агрегатов"
+)
+def get_maintenance_requests_daily(
+    date_from: Optional[date] = Query(None, description="Дата от (по умолчанию 30 дней назад)"),
+    date_to: Optional[date] = Query(None, description="Дата до (по умолчанию сегодня)"),
+    status: Optional[maintenance_request_schema.MaintenanceRequestStatus] = Query(None, description="Фильтр по статусу"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Получение динамики заявок по статусам.
+    
+    - **date_from**, **date_to**: Период (включительно)
+    - **status**: Фильтр по статусу
+    
+    Требуется аутентификация.
+    """
+    date_from, date_to = _period(date_from, date_to)
+    query = _rollups(analytics.MAINTENANCE_REQUESTS_BY_STATUS, date_from, date_to)
+    if status:
+        query = query.where(models.DailyRollup.dimension == status.value)
+    
+    rollups = db.execute(query.order_by(models.DailyRollup.day, models.DailyRollup.dimension)).scalars().all()
+    return [{"day": r.day, "status": r.dimension, "count": r.count} for r in rollups]
+
+@router.get(
+    "/incidents/weekly-by-aircraft",
+    response_model=List[analytics_schema.WeeklyAircraftIncidents],
+    summary="Инциденты по самолетам по неделям",
+    description="Количество инцидентов по каждому самолету по неделям из дневных агрегатов"
+)
+def get_incidents_weekly_by_aircraft(
+    date_from: Optional[date] = Query(None, description="Дата от (по умолчанию 30 дней назад)"),
+    date_to: Optional[date] = Query(None, description="Дата до (по умолчанию сегодня)"),
+    aircraft_id: Optional[int] = Query(None, description="Фильтр по самолету"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Получение количества инцидентов по самолетам по неделям.
+    
+    - **date_from**, **date_to**: Период (включительно)
+    - **aircraft_id**: Фильтр по самолету
+    
+    Требуется аутентификация.
+    """
+    date_from, date_to = _period(date_from, date_to)
+    query = _rollups(analytics.INCIDENTS_BY_AIRCRAFT, date_from, date_to)
+    if aircraft_id:
+        query = query.where(models.DailyRollup.dimension == str(aircraft_id))
+    
+    # Дневных строк не больше (дней x самолетов), поэтому неделю собираем без диалектных функций дат
+    weekly = defaultdict(int)
+    for rollup in db.execute(query).scalars():
+        week_start = rollup.day - timedelta(days=rollup.day.weekday())
+        weekly[(week_start, int(rollup.dimension))] += rollup.count
+    
+    return [
+        {"week_start": week_start, "aircraft_id": aircraft, "count": count}
+        for (week_start, aircraft), count in sorted(weekly.items())
+    ]
+
+@router.get(
+    "/incidents/resolution-by-qc",
+    response_model=List[analytics_schema.QualityControlResolution],
+    summary="Время разрешения инцидентов по специалистам КК",
+    description="Количество разрешенных инцидентов и среднее время разрешения по каждому специалисту КК"
+)
+def get_incidents_resolution_by_qc(
+    date_from: Optional[date] = Query(None, description="Дата от (по умолчанию 30 дней назад)"),
+    date_to: Optional[date] = Query(None, description="Дата до (по умолчанию сегодня)"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Получение среднего времени разрешения инцидентов по специалистам КК.
+    
+    - **date_from**, **date_to**: Период разрешения (включительно)
+    
+    Требуется аутентификация.
+    """
+    date_from, date_to = _period(date_from, date_to)
+    rows = db.execute(
+        select(
+            models.DailyRollup.dimension,
+            func.sum(models.DailyRollup.count),
+            func.sum(models.DailyRollup.value_sum),
+        ).where(
+            models.DailyRollup.metric == analytics.INCIDENTS_RESOLVED_BY_QC,
+            models.DailyRollup.day >= date_from,
+            models.DailyRollup.day <= date_to,
+        ).group_by(models.DailyRollup.dimension)
+    ).all()
+    
+    return [
+        {
+            "quality_control_specialist_id": int(dimension),
+            "resolved_count": resolved_count,
+            "avg_resolution_time_seconds": seconds / resolved_count if resolved_count else None,
+        }
+        for dimension, resolved_count, seconds in sorted(rows, key=lambda row: int(row[0]))
+    ]
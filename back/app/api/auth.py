@@ -1,7 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
-from .dependencies import get_db, authenticate_user, create_access_token, get_password_hash, ACCESS_TOKEN_EXPIRE_MINUTES
+from .dependencies import get_async_db, authenticate_user, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.passwords import hash_password_async
 from app.schemas import user_schema
 from app.models import models
 
@@ -23,7 +25,7 @@ router = APIRouter(prefix="/auth", tags=["Авторизация"])
     - `quality_control_specialist` - Специалист по контролю качества
     """
 )
-def create_user(user: user_schema.UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: user_schema.UserCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Регистрация нового пользователя.
     
@@ -33,14 +35,15 @@ def create_user(user: user_schema.UserCreate, db: Session = Depends(get_db)):
     - **role**: Роль в системе
     """
     # Проверяем, существует ли пользователь с таким табельным номером
-    existing_user = db.query(models.User).filter(models.User.tab_number == user.tab_number).first()
+    result = await db.execute(select(models.User).where(models.User.tab_number == user.tab_number))
+    existing_user = result.scalars().first()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User with this tab number already exists"
         )
     
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password_async(user.password)
     new_user = models.User(
         tab_number=user.tab_number,
         full_name=user.full_name,
@@ -48,11 +51,11 @@ def create_user(user: user_schema.UserCreate, db: Session = Depends(get_db)):
         role=user.role
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     
     access_token = create_access_token(
-        data={"sub": new_user.tab_number}, 
+        data={"sub": new_user.tab_number, "role": new_user.role.value}, 
         expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
     return {
@@ -67,7 +70,7 @@ def create_user(user: user_schema.UserCreate, db: Session = Depends(get_db)):
     summary="Аутентификация пользователя",
     description="Аутентифицирует пользователя и возвращает JWT токен"
 )
-def login_for_access_token(userLogin: user_schema.UserLogin, db: Session = Depends(get_db)):
+async def login_for_access_token(userLogin: user_schema.UserLogin, db: AsyncSession = Depends(get_async_db)):
     """
     Вход в систему.
     
@@ -76,7 +79,7 @@ def login_for_access_token(userLogin: user_schema.UserLogin, db: Session = Depen
     
     Возвращает данные пользователя и JWT токен для доступа к API.
     """
-    user = authenticate_user(db, userLogin.tab_number, userLogin.password)
+    user = await authenticate_user(db, userLogin.tab_number, userLogin.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -84,7 +87,7 @@ def login_for_access_token(userLogin: user_schema.UserLogin, db: Session = Depen
             headers={"WWW-Authenticate": "Bearer"},
         )
     access_token = create_access_token(
-        data={"sub": user.tab_number}, 
+        data={"sub": user.tab_number, "role": user.role.value}, 
         expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
     return {
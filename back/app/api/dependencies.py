@@ -1,13 +1,24 @@
 from fastapi import Depends, HTTPException, status
+from sqlalchemy import select, event
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
+from collections import OrderedDict
+from typing import Optional
 import hashlib
-from app.database import SessionLocal
+import hmac
+import threading
+import time
+from app.config import USER_CACHE_TTL_SECONDS, USER_CACHE_MAX_SIZE, METRICS_TOKEN
+from app.database import SessionLocal, AsyncSessionLocal
 from app.models import models
-import bcrypt
+from app.passwords import (
+    hash_password, check_password, needs_rehash, hash_password_async, check_password_async, login_metrics,
+)
 
 SECRET_KEY = "your_secret_key_here"
 ALGORITHM = "HS256"
@@ -24,28 +35,95 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """Асинхронная сессия БД для эндпоинтов, объявленных через async def"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
+
+class UserCache:
+    """
+    LRU-кэш пользователей по табельному номеру (sub токена) с ограниченным временем жизни записи.
+
+    Хранятся значения колонок (без хэша пароля), а не ORM-объект: каждый запрос получает
+    собственный экземпляр models.User, не привязанный к сессии.
+    """
+
+    USER_COLUMNS = ("id", "tab_number", "full_name", "role", "created_at", "updated_at")
+
+    def __init__(self, ttl: float, max_size: int):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.ttl = ttl
+        self.max_size = max_size
+
+    def get(self, tab_number: str) -> Optional[models.User]:
+        with self._lock:
+            entry = self._entries.get(tab_number)
+            if entry is None:
+                return None
+            expires_at, values = entry
+            if expires_at < time.monotonic():
+                del self._entries[tab_number]
+                return None
+            self._entries.move_to_end(tab_number)
+        return models.User(**values)
+
+    def set(self, user: models.User):
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        values = {column: getattr(user, column) for column in self.USER_COLUMNS}
+        with self._lock:
+            self._entries[user.tab_number] = (time.monotonic() + self.ttl, values)
+            self._entries.move_to_end(user.tab_number)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *tab_numbers: str):
+        with self._lock:
+            for tab_number in tab_numbers:
+                self._entries.pop(tab_number, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache(USER_CACHE_TTL_SECONDS, USER_CACHE_MAX_SIZE)
+USERS_CHANGED_KEY = "users_changed"
+
+
+@event.listens_for(Session, "before_flush")
+def _mark_users_changed(session, flush_context, instances):
+    changed = session.info.setdefault(USERS_CHANGED_KEY, set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, models.User):
+            # При смене табельного номера сбрасываем и прежний ключ
+            history = get_history(obj, "tab_number")
+            changed.update(value for value in (*history.added, *history.unchanged, *history.deleted) if value)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_users(session):
+    changed = session.info.pop(USERS_CHANGED_KEY, None)
+    if changed:
+        user_cache.invalidate(*changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_users_changed(session):
+    session.info.pop(USERS_CHANGED_KEY, None)
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Проверка пароля с двойным хэшированием"""
-    try:
-        # Всегда сначала хэшируем пароль через SHA-256
-        # sha256_hash = hashlib.sha256(plain_password.encode()).hexdigest()
-        # Затем проверяем через bcrypt
-        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('ascii'))
-    except Exception:
-        return False
+    """Проверка пароля (синхронно, в вызывающем потоке)"""
+    return check_password(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    """Хэширование пароля с двойным хэшированием"""
-    # Всегда сначала хэшируем пароль через SHA-256
-    # sha256_hash = hashlib.sha256(password.encode()).hexdigest()
-    # Затем хэшируем через bcrypt
-
-    hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-    return hashed.decode('ascii')
-    # print(password[:72])
-    # return pwd_context.hash(password[:72])
+    """Хэширование пароля с cost factor из PASSWORD_HASH_ROUNDS (синхронно, в вызывающем потоке)"""
+    return hash_password(password)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     """Создание JWT токена"""
@@ -59,17 +137,37 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def authenticate_user(db: Session, tab_number: str, password: str):
-    """Аутентификация пользователя"""
-    user = db.query(models.User).filter(models.User.tab_number == tab_number).first()
-    if not user:
-        return False
-    if not verify_password(password, user.password):
+async def authenticate_user(db: AsyncSession, tab_number: str, password: str):
+    """
+    Аутентификация пользователя.
+
+    bcrypt выполняется в ограниченном пуле хэширования, поэтому всплеск входов не занимает
+    потоки обработчиков. Хэш, созданный с устаревшим cost factor, пересчитывается при успешном входе.
+    """
+    result = await db.execute(select(models.User).where(models.User.tab_number == tab_number))
+    user = result.scalars().first()
+    if not user or not await check_password_async(password, user.password):
+        login_metrics.increment("login_failures")
         return False
+
+    login_metrics.increment("logins")
+    if needs_rehash(user.password):
+        user.password = await hash_password_async(password)
+        await db.commit()
+        # updated_at обновляется на стороне БД - перечитываем до сериализации ответа
+        await db.refresh(user)
+        login_metrics.increment("rehashes")
+    # Сразу после входа клиент обращается к API - кладем пользователя в кэш заранее
+    user_cache.set(user)
     return user
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    """Получение текущего пользователя из JWT токена"""
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    """
+    Получение текущего пользователя из JWT токена.
+
+    Пользователь берется из user_cache, в БД запрос идет только при промахе кэша.
+    Токен, выданный до смены роли пользователя (claim role), отклоняется.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -83,11 +181,36 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
     
-    user = db.query(models.User).filter(models.User.tab_number == tab_number).first()
+    user = user_cache.get(tab_number)
     if user is None:
+        result = await db.execute(select(models.User).where(models.User.tab_number == tab_number))
+        user = result.scalars().first()
+        if user is None:
+            raise credentials_exception
+        user_cache.set(user)
+    
+    role = payload.get("role")
+    if role is not None and role != user.role.value:
         raise credentials_exception
     return user
 
 async def get_current_active_user(current_user: models.User = Depends(get_current_user)):
     """Проверка что пользователь активен"""
-    return current_user
\ No newline at end of file
+    return current_user
+
+async def get_current_admin(current_user: models.User = Depends(get_current_user)):
+    """Проверка что пользователь - администратор"""
+    if current_user.role != models.Role.ADMINISTRATOR:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return current_user
+
+async def get_metrics_access(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    """
+    Доступ к /metrics: статический METRICS_TOKEN (для сборщика Prometheus) или JWT администратора.
+    """
+    if METRICS_TOKEN and hmac.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+        return None
+    return await get_current_admin(await get_current_user(token, db))
@@ -1,12 +1,14 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 import zipfile
 import tempfile
 import os
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Literal, Optional
 import uuid
-from app.ml.predict_yolo_seg_prod import SegmentModel, get_prediction_results_with_img
+from app.ml.predict_yolo_seg_prod import model_registry, get_prediction_results_with_img
+from app.tracing import start_trace, span
 from datetime import datetime
 import zipfile
 import json
@@ -37,57 +39,85 @@ def map_classes_to_names(class_numbers: List[int]) -> List[str]:
     """Конвертирует числа классов в названия"""
     return [TOOL_CLASSES_MAP.get(cls, f"UNKNOWN_{cls}") for cls in class_numbers]
 
-def process_single_image(image_path: str) -> Dict[str, Any]:
-    """Обрабатывает одно изображение и возвращает результат"""
-    # Инициализация модели (можно вынести в глобальную переменную для кэширования)
-    model_path = "/app/app/ml/weights/yolo11s-seg-tools.pt"
-    
-    model = SegmentModel(
-        model_path=model_path,
-        conf_threshold=0.5,
-        imgsz=640,
-        prefer="auto",
-        verbose=False
-    )
-    
-    # Получаем предсказания
-    classes, obb_rows, masks, probs, img, overlap_flag, overlap_score = get_prediction_results_with_img(model, image_path)
-    
-    # Конвертируем masks в JSON-сериализуемый формат
-    serializable_masks = []
-    if masks is not None:
-        for mask in masks:
-            # Конвертируем numpy array в список
-            if hasattr(mask, 'tolist'):
-                serializable_masks.append(mask.tolist())
-            else:
-                serializable_masks.append(mask)
-    serializable_probs = []
-    if probs is not None:
-        for prob in probs:
-            # Конвертируем numpy array в список
-            if hasattr(prob, 'tolist'):
-                serializable_probs.append(prob.tolist())
-            else:
-                serializable_probs.append(prob)
-    
-    resultClasses = map_classes_to_names(classes)
+def process_single_image(
+    image_path: str,
+    timings: bool = False,
+    tiled: bool = False,
+    quality: Optional[str] = None,
+    latency_budget_ms: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Обрабатывает одно изображение и возвращает результат.
 
-    return {
+    При timings=True в результат добавляется объект timings - длительность этапов в миллисекундах.
+    При tiled=True изображение обрабатывается тайлами в исходном разрешении (мелкие инструменты на больших фото).
+    quality или latency_budget_ms задают входное разрешение модели (см. app.ml.resolution).
+    Блокирующая (инференс под inference_lock): из async-эндпоинтов вызывается через run_in_threadpool.
+    """
+    with start_trace("predict_file", filename=os.path.basename(image_path)) as trace:
+        # Модель загружается один раз на процесс (прогревается при старте приложения)
+        model = model_registry.get_segment_model()
+        imgsz = model.imgsz if tiled else model.resolution.select(quality, latency_budget_ms)
+
+        # Получаем предсказания
+        with model_registry.inference_lock:
+            classes, obb_rows, masks, probs, img, overlap_flag, overlap_score, overlap_pairs = get_prediction_results_with_img(
+                model, image_path, tiled=tiled, imgsz=imgsz
+            )
+        
+        with span("serialize"):
+            # Конвертируем masks в JSON-сериализуемый формат
+            serializable_masks = []
+            if masks is not None:
+                for mask in masks:
+                    # Конвертируем numpy array в список
+                    if hasattr(mask, 'tolist'):
+                        serializable_masks.append(mask.tolist())
+                    else:
+                        serializable_masks.append(mask)
+            serializable_probs = []
+            if probs is not None:
+                for prob in probs:
+                    # Конвертируем numpy array в список
+                    if hasattr(prob, 'tolist'):
+                        serializable_probs.append(prob.tolist())
+                    else:
+                        serializable_probs.append(prob)
+        
+        resultClasses = map_classes_to_names(classes)
+
+    result = {
         'classes': resultClasses,
         'probs': serializable_probs,
         'masks': serializable_masks,
         'obb_rows': obb_rows,
         'overlap_flag': overlap_flag,
-        'overlap_score': overlap_score
-    }, img
+        'overlap_score': overlap_score,
+        'overlap_pairs': overlap_pairs,
+        'imgsz': imgsz
+    }
+    if timings:
+        result['timings'] = trace.timings()
+    return result, img
 
 @router.post("/predict/single")
-async def predict_single_image(file: UploadFile = File(...)):
+async def predict_single_image(
+    file: UploadFile = File(...),
+    timings: bool = False,
+    tiled: bool = False,
+    quality: Optional[Literal["fast", "balanced", "accurate"]] = Query(None, description="Качество: входное разрешение модели"),
+    latency_budget_ms: Optional[float] = Query(None, gt=0, description="Бюджет задержки инференса, мс"),
+):
     """
     API для предсказания на одном изображении
     
     - Принимает: файл изображения (jpg, png, jpeg)
+    - **timings**: добавить в JSON длительность этапов обработки в миллисекундах
+    - **tiled**: тайловый инференс в исходном разрешении (точнее для мелких инструментов, дольше)
+    - **quality**: fast - наименьшее входное разрешение модели, balanced - по умолчанию, accurate - наибольшее
+    - **latency_budget_ms**: наибольшее разрешение, оценка задержки которого укладывается в бюджет
+    - В JSON: overlap_pairs - пересекающиеся пары инструментов (индексы в obb_rows, IoU и доля
+      пересечения от меньшего по OBB и маскам)
     - Возвращает: ZIP архив с JSON результатами и изображением
     """
     # Проверяем тип файла
@@ -107,8 +137,10 @@ async def predict_single_image(file: UploadFile = File(...)):
             temp_file.write(content)
             temp_file_path = temp_file.name
         
-        # Обрабатываем изображение
-        json_data, img_path = process_single_image(temp_file_path)
+        # Обрабатываем изображение (инференс блокирующий и ждет inference_lock - вне event loop)
+        json_data, img_path = await run_in_threadpool(
+            process_single_image, temp_file_path, timings=timings, tiled=tiled, quality=quality, latency_budget_ms=latency_budget_ms
+        )
         
         # Создаем временный ZIP архив
         with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as zip_temp:
@@ -169,11 +201,20 @@ async def predict_single_image(file: UploadFile = File(...)):
             detail=f"Ошибка обработки изображения: {str(e)}"
         )
 @router.post("/predict/batch")
-async def predict_batch_images(zip_file: UploadFile = File(...)):
+async def predict_batch_images(
+    zip_file: UploadFile = File(...),
+    timings: bool = False,
+    tiled: bool = False,
+    quality: Optional[Literal["fast", "balanced", "accurate"]] = Query(None, description="Качество: входное разрешение модели"),
+    latency_budget_ms: Optional[float] = Query(None, gt=0, description="Бюджет задержки инференса, мс"),
+):
     """
     API для пакетной обработки изображений из архива
     
     - Принимает: ZIP архив с изображениями
+    - **timings**: добавить в JSON каждого изображения длительность этапов обработки
+    - **tiled**: тайловый инференс в исходном разрешении
+    - **quality**, **latency_budget_ms**: входное разрешение модели, как в /predict/single
     - Возвращает: ZIP архив с результатами (images/ и json/ папки)
     """
     if not zip_file.filename.endswith('.zip'):
@@ -223,7 +264,9 @@ async def predict_batch_images(zip_file: UploadFile = File(...)):
                     
                     try:
                         # Обрабатываем изображение
-                        json_data, img_path = process_single_image(image_path)
+                        json_data, img_path = await run_in_threadpool(
+                            process_single_image, image_path, timings=timings, tiled=tiled, quality=quality, latency_budget_ms=latency_budget_ms
+                        )
                         
                         # Добавляем информацию о файле в JSON
                         json_data['filename'] = image_file
@@ -1,11 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks, Response
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm.attributes import get_history
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 import random
-from .dependencies import get_db, get_current_user
+from .dependencies import get_db, get_async_db, get_current_user
 from app.models import models
 from app.schemas import incident_schema, maintenance_request_schema
+from app import events
+from app.analytics import seconds_between
+from app.pagination import paginate, set_next_cursor
 
 router = APIRouter(prefix="/incidents", tags=["Инцидент"])
 
@@ -15,42 +21,92 @@ router = APIRouter(prefix="/incidents", tags=["Инцидент"])
     summary="Получить все инциденты",
     description="Возвращает список всех инцидентов с возможностью фильтрации"
 )
-def get_all_incidents(
+async def get_all_incidents(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (заголовок X-Next-Cursor)"),
     status: Optional[incident_schema.IncidentStatus] = Query(None, description="Фильтр по статусу"),
     aviation_engineer_id: Optional[int] = Query(None, description="Фильтр по инженеру"),
     quality_control_specialist_id: Optional[int] = Query(None, description="Фильтр по специалисту КК"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """
     Получение списка инцидентов.
     
     **Параметры запроса:**
-    - **skip**: Пропуск записей
+    - **skip**: Пропуск записей (если курсор не передан)
     - **limit**: Лимит записей
+    - **cursor**: Курсор следующей страницы из заголовка `X-Next-Cursor` предыдущего ответа
     - **status**: Фильтр по статусу
     - **aviation_engineer_id**: Фильтр по инженеру
     - **quality_control_specialist_id**: Фильтр по специалисту КК
     
     Требуется аутентификация.
     """
-    query = db.query(models.Incident)
+    query = _filter_incidents(select(models.Incident), status, aviation_engineer_id, quality_control_specialist_id)
     
+    result = await db.execute(paginate(query, models.Incident, skip, limit, cursor))
+    incidents = result.scalars().all()
+    set_next_cursor(response, incidents, limit)
+    return incidents
+
+def _filter_incidents(query, status, aviation_engineer_id, quality_control_specialist_id):
+    """Фильтры списка инцидентов (общие для списка и списка со связями)"""
     # Применяем фильтры
     if status:
-        query = query.filter(models.Incident.status == status)
+        query = query.where(models.Incident.status == status)
     if aviation_engineer_id:
-        query = query.filter(models.Incident.aviation_engineer_id == aviation_engineer_id)
+        query = query.where(models.Incident.aviation_engineer_id == aviation_engineer_id)
     if quality_control_specialist_id:
-        query = query.filter(models.Incident.quality_control_specialist_id == quality_control_specialist_id)
+        query = query.where(models.Incident.quality_control_specialist_id == quality_control_specialist_id)
+    
+    return query
+
+# Связи инцидента, загружаемые одним запросом через JOIN (все отношения many-to-one)
+INCIDENT_RELATIONS = (
+    joinedload(models.Incident.aviation_engineer),
+    joinedload(models.Incident.quality_control_specialist),
+    joinedload(models.Incident.aircraft),
+    joinedload(models.Incident.tool_set),
+    joinedload(models.Incident.maintenance_request),
+)
+
+@router.get(
+    "/with-relations",
+    response_model=List[Dict[str, Any]],
+    summary="Получить инциденты с полной информацией",
+    description="Возвращает страницу инцидентов с информацией о связанных объектах, загруженной одним запросом"
+)
+async def get_all_incidents_with_relations(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (заголовок X-Next-Cursor)"),
+    status: Optional[incident_schema.IncidentStatus] = Query(None, description="Фильтр по статусу"),
+    aviation_engineer_id: Optional[int] = Query(None, description="Фильтр по инженеру"),
+    quality_control_specialist_id: Optional[int] = Query(None, description="Фильтр по специалисту КК"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Получение списка инцидентов с полной информацией о связанных объектах.
     
-    # Сортировка по дате создания (новые сначала)
-    query = query.order_by(models.Incident.created_at.desc())
+    Параметры фильтрации и пагинации те же, что и у списка инцидентов. Количество запросов к БД
+    не зависит от размера страницы.
     
-    incidents = query.offset(skip).limit(limit).all()
-    return incidents
+    Требуется аутентификация.
+    """
+    query = _filter_incidents(
+        select(models.Incident).options(*INCIDENT_RELATIONS),
+        status, aviation_engineer_id, quality_control_specialist_id
+    )
+    
+    result = await db.execute(paginate(query, models.Incident, skip, limit, cursor))
+    incidents = result.scalars().all()
+    set_next_cursor(response, incidents, limit)
+    return [_incident_with_relations(incident) for incident in incidents]
 
 @router.get(
     "/{incident_id}", 
@@ -93,7 +149,9 @@ def get_incident_with_relations(
     """
     Получение инцидента с полной информацией о связанных объектах.
     """
-    incident = db.query(models.Incident).filter(models.Incident.id == incident_id).first()
+    incident = db.query(models.Incident).options(*INCIDENT_RELATIONS).filter(
+        models.Incident.id == incident_id
+    ).first()
     
     if not incident:
         raise HTTPException(
@@ -101,6 +159,10 @@ def get_incident_with_relations(
             detail="Incident not found"
         )
     
+    return _incident_with_relations(incident)
+
+def _incident_with_relations(incident: models.Incident) -> Dict[str, Any]:
+    """Инцидент с информацией о связанных объектах (связи должны быть уже загружены)"""
     # Собираем полную информацию
     response_data = {
         "id": incident.id,
@@ -177,6 +239,7 @@ def get_incident_with_relations(
 def update_incident(
     incident_id: int,
     incident_update: incident_schema.IncidentUpdate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
@@ -205,9 +268,12 @@ def update_incident(
     # Применяем обновления
     for field, value in update_data.items():
         setattr(incident, field, value)
+    _track_resolution(incident)
     
     db.commit()
     db.refresh(incident)
+
+    background_tasks.add_task(events.publish_events, events.incident_event("updated", incident))
     return incident
 
 @router.put(
@@ -219,6 +285,7 @@ def update_incident(
 def resolve_incident(
     incident_id: int,
     resolve_data: incident_schema.CloseIncidentRequest,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
@@ -253,6 +320,7 @@ def resolve_incident(
     
     # Обновляем инцидент
     incident.status = incident_schema.IncidentStatus.RESOLVED
+    _track_resolution(incident)
     incident.resolution_summary = resolve_data.resolution_summary
     if resolve_data.comments:
         incident.comments = resolve_data.comments
@@ -263,6 +331,8 @@ def resolve_incident(
     
     db.commit()
     db.refresh(incident)
+
+    background_tasks.add_task(events.publish_events, *_resolution_events("resolved", incident))
     return incident
 
 @router.put(
@@ -274,6 +344,7 @@ def resolve_incident(
 def close_incident(
     incident_id: int,
     close_data: incident_schema.CloseIncidentRequest,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
@@ -308,6 +379,7 @@ def close_incident(
     
     # Обновляем инцидент
     incident.status = incident_schema.IncidentStatus.CLOSED
+    _track_resolution(incident)
     incident.resolution_summary = close_data.resolution_summary
     if close_data.comments:
         incident.comments = close_data.comments
@@ -318,8 +390,43 @@ def close_incident(
     
     db.commit()
     db.refresh(incident)
+
+    background_tasks.add_task(events.publish_events, *_resolution_events("closed", incident))
     return incident
 
+RESOLVED_STATUSES = (incident_schema.IncidentStatus.RESOLVED, incident_schema.IncidentStatus.CLOSED)
+RESOLVED_STATUS_VALUES = {status.value for status in RESOLVED_STATUSES}
+
+def _track_resolution(incident: models.Incident):
+    """
+    Проставляет resolved_at при переводе в RESOLVED/CLOSED из другого статуса и сбрасывает при возврате в работу.
+
+    Если статус не менялся, resolved_at не трогаем: у инцидентов, разрешенных до появления колонки
+    (миграция 0002), дата разрешения неизвестна и остается пустой, такие инциденты не учитываются
+    в среднем времени разрешения и в агрегатах incidents.resolved.
+    """
+    history = get_history(incident, "status")
+    if not history.added:
+        return
+    # Статус приходит из схемы (str Enum) или из БД (Enum модели) - сравниваем по значению
+    new_status = getattr(history.added[0], "value", history.added[0])
+    old_status = getattr(history.deleted[0], "value", history.deleted[0]) if history.deleted else None
+    if new_status == old_status:
+        return
+    if new_status in RESOLVED_STATUS_VALUES:
+        if old_status not in RESOLVED_STATUS_VALUES:
+            # Время БД, как и у created_at, чтобы разница считалась в одной временной зоне
+            incident.resolved_at = func.now()
+    else:
+        incident.resolved_at = None
+
+def _resolution_events(event_type: str, incident: models.Incident):
+    """События закрытия/разрешения инцидента вместе с изменением статуса связанной заявки"""
+    result = [events.incident_event(event_type, incident)]
+    if incident.maintenance_request:
+        result.append(events.maintenance_request_event("completed", incident.maintenance_request))
+    return result
+
 @router.get(
     "/stats/summary",
     response_model=Dict[str, Any],
@@ -337,41 +444,29 @@ def get_incidents_stats(
     - Общее количество инцидентов
     - Количество инцидентов по статусам
     - Количество инцидентов за последние 30 дней
+    - Среднее время разрешения (от создания до перевода в RESOLVED/CLOSED)
     
     Требуется аутентификация.
     """
-    # Общее количество
-    total_count = db.query(models.Incident).count()
-    
-    # Количество по статусам
-    status_counts = {}
-    for status in incident_schema.IncidentStatus:
-        count = db.query(models.Incident).filter(
-            models.Incident.status == status
-        ).count()
-        status_counts[status] = count
-    
-    # Количество за последние 30 дней
     month_ago = datetime.now() - timedelta(days=30)
-    recent_count = db.query(models.Incident).filter(
-        models.Incident.created_at >= month_ago
-    ).count()
-    
-    # Среднее время разрешения инцидентов
-    resolved_incidents = db.query(models.Incident).filter(
-        models.Incident.status.in_([incident_schema.IncidentStatus.RESOLVED, incident_schema.IncidentStatus.CLOSED])
-    ).all()
-    
-    avg_resolution_time = None
-    if resolved_incidents:
-        total_seconds = 0
-        for incident in resolved_incidents:
-            if incident.created_at:
-                # Предполагаем, что инцидент разрешен при изменении статуса
-                # В реальной системе нужно хранить дату разрешения
-                resolution_time = (datetime.now() - incident.created_at).total_seconds()
-                total_seconds += resolution_time
-        avg_resolution_time = total_seconds / len(resolved_incidents)
+    resolution_seconds = seconds_between(db.get_bind().dialect.name, models.Incident.created_at, models.Incident.resolved_at)
+    
+    # Все показатели одним запросом: COUNT ... FILTER (WHERE ...) по каждому статусу
+    stats = db.execute(select(
+        func.count().label("total"),
+        *[
+            func.count().filter(models.Incident.status == status).label(status.value)
+            for status in incident_schema.IncidentStatus
+        ],
+        func.count().filter(models.Incident.created_at >= month_ago).label("recent_count"),
+        # Среднее время разрешения по инцидентам с проставленным resolved_at
+        func.avg(resolution_seconds).label("avg_resolution_time"),
+    ).select_from(models.Incident)).one()._mapping
+    
+    total_count = stats["total"]
+    status_counts = {status: stats[status.value] for status in incident_schema.IncidentStatus}
+    recent_count = stats["recent_count"]
+    avg_resolution_time = float(stats["avg_resolution_time"]) if stats["avg_resolution_time"] is not None else None
     
     return {
         "total": total_count,
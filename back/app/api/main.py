@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from . import auth,files,users, websocket, aircraft, tool_types, tool_set_types, tool_sets, maintenance_requests, incidents
+from . import auth,files,users, websocket, aircraft, tool_types, tool_set_types, tool_sets, maintenance_requests, incidents, monitoring, analytics
 
 router = APIRouter()
 
@@ -14,6 +14,8 @@ router.include_router(maintenance_requests.router)
 router.include_router(incidents.router)  # добавляем incidents роутер
 router.include_router(websocket.router)
 router.include_router(files.router)
+router.include_router(monitoring.router)
+router.include_router(analytics.router)
 
 # Основной эндпоинт для проверки работы API
 @router.get("/")
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks, Response
+from sqlalchemy import select, func, exists
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
-from .dependencies import get_db, get_current_user
+from .dependencies import get_db, get_async_db, get_current_user
 from app.models import models
 from app.schemas import maintenance_request_schema, incident_schema
+from app import events
+from app.pagination import paginate, set_next_cursor
 
 router = APIRouter(prefix="/maintenance-requests", tags=["Заявки на выполнение тех. обслуживания"])
 
@@ -17,6 +21,7 @@ router = APIRouter(prefix="/maintenance-requests", tags=["Заявки на вы
 )
 def create_maintenance_request(
     maintenance_request: maintenance_request_schema.MaintenanceRequestCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
@@ -37,53 +42,14 @@ def create_maintenance_request(
     - Проверяет существование tool_set_id (если указан)
     - Проверяет, что aviation_engineer имеет соответствующую роль
     """
-    # Проверяем существование самолета
-    aircraft = db.query(models.Aircraft).filter(
-        models.Aircraft.id == maintenance_request.aircraft_id
-    ).first()
-    if not aircraft:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Aircraft not found"
-        )
-    
-    # Проверяем существование сотрудника склада
-    warehouse_employee = db.query(models.User).filter(
-        models.User.id == maintenance_request.warehouse_employee_id
-    ).first()
-    if not warehouse_employee:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Warehouse employee not found"
-        )
-    
-    # Проверяем существование инженера (если указан)
-    if maintenance_request.aviation_engineer_id:
-        aviation_engineer = db.query(models.User).filter(
-            models.User.id == maintenance_request.aviation_engineer_id
-        ).first()
-        if not aviation_engineer:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Aviation engineer not found"
-            )
-        # Проверяем роль инженера
-        if aviation_engineer.role != models.Role.AVIATION_ENGINEER:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Specified user is not an aviation engineer"
-            )
-    
-    # Проверяем существование набора инструментов (если указан)
-    if maintenance_request.tool_set_id:
-        tool_set = db.query(models.ToolSet).filter(
-            models.ToolSet.id == maintenance_request.tool_set_id
-        ).first()
-        if not tool_set:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Tool set not found"
-            )
+    # Все ссылки заявки проверяются одним запросом
+    row = db.execute(select(*_reference_checks(
+        aircraft_id=maintenance_request.aircraft_id,
+        warehouse_employee_id=maintenance_request.warehouse_employee_id,
+        aviation_engineer_id=maintenance_request.aviation_engineer_id,
+        tool_set_id=maintenance_request.tool_set_id,
+    ))).one()
+    _raise_for_references(row)
     
     db_maintenance_request = models.MaintenanceRequest(
         aircraft_id=maintenance_request.aircraft_id,
@@ -97,6 +63,10 @@ def create_maintenance_request(
     db.add(db_maintenance_request)
     db.commit()
     db.refresh(db_maintenance_request)
+
+    background_tasks.add_task(
+        events.publish_events, events.maintenance_request_event("created", db_maintenance_request)
+    )
     return db_maintenance_request
 
 @router.get(
@@ -105,23 +75,26 @@ def create_maintenance_request(
     summary="Получить все заявки на ТО",
     description="Возвращает список всех заявок на техническое обслуживание с возможностью фильтрации"
 )
-def get_all_maintenance_requests(
+async def get_all_maintenance_requests(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (заголовок X-Next-Cursor)"),
     status: Optional[maintenance_request_schema.MaintenanceRequestStatus] = Query(None, description="Фильтр по статусу"),
     aircraft_id: Optional[int] = Query(None, description="Фильтр по самолету"),
     aviation_engineer_id: Optional[int] = Query(None, description="Фильтр по инженеру"),
     date_from: Optional[datetime] = Query(None, description="Дата от (создания заявки)"),
     date_to: Optional[datetime] = Query(None, description="Дата до (создания заявки)"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """
     Получение списка заявок на техническое обслуживание.
     
     **Параметры запроса:**
-    - **skip**: Пропуск записей
+    - **skip**: Пропуск записей (если курсор не передан)
     - **limit**: Лимит записей
+    - **cursor**: Курсор следующей страницы из заголовка `X-Next-Cursor` предыдущего ответа
     - **status**: Фильтр по статусу
     - **aircraft_id**: Фильтр по самолету
     - **aviation_engineer_id**: Фильтр по инженеру
@@ -130,27 +103,77 @@ def get_all_maintenance_requests(
     
     Требуется аутентификация.
     """
-    query = db.query(models.MaintenanceRequest)
+    query = _filter_maintenance_requests(
+        select(models.MaintenanceRequest), status, aircraft_id, aviation_engineer_id, date_from, date_to
+    )
     
+    result = await db.execute(paginate(query, models.MaintenanceRequest, skip, limit, cursor))
+    maintenance_requests = result.scalars().all()
+    set_next_cursor(response, maintenance_requests, limit)
+    return maintenance_requests
+
+def _filter_maintenance_requests(query, status, aircraft_id, aviation_engineer_id, date_from, date_to):
+    """Фильтры списка заявок (общие для списка и списка со связями)"""
     # Применяем фильтры
     if status:
-        query = query.filter(models.MaintenanceRequest.status == status)
+        query = query.where(models.MaintenanceRequest.status == status)
     if aircraft_id:
-        query = query.filter(models.MaintenanceRequest.aircraft_id == aircraft_id)
+        query = query.where(models.MaintenanceRequest.aircraft_id == aircraft_id)
     if aviation_engineer_id:
-        query = query.filter(models.MaintenanceRequest.aviation_engineer_id == aviation_engineer_id)
+        query = query.where(models.MaintenanceRequest.aviation_engineer_id == aviation_engineer_id)
     if date_from:
-        query = query.filter(models.MaintenanceRequest.created_at >= date_from)
+        query = query.where(models.MaintenanceRequest.created_at >= date_from)
     if date_to:
         # Добавляем 1 день чтобы включить всю указанную дату
         date_to_end = date_to.replace(hour=23, minute=59, second=59)
-        query = query.filter(models.MaintenanceRequest.created_at <= date_to_end)
+        query = query.where(models.MaintenanceRequest.created_at <= date_to_end)
+    
+    return query
+
+# Связи заявки, загружаемые одним запросом через JOIN (все отношения many-to-one)
+MAINTENANCE_REQUEST_RELATIONS = (
+    joinedload(models.MaintenanceRequest.aircraft),
+    joinedload(models.MaintenanceRequest.warehouse_employee),
+    joinedload(models.MaintenanceRequest.aviation_engineer),
+    joinedload(models.MaintenanceRequest.tool_set),
+)
+
+@router.get(
+    "/with-relations",
+    response_model=List[Dict[str, Any]],
+    summary="Получить заявки на ТО с полной информацией",
+    description="Возвращает страницу заявок на ТО с информацией о связанных объектах, загруженной одним запросом"
+)
+async def get_all_maintenance_requests_with_relations(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (заголовок X-Next-Cursor)"),
+    status: Optional[maintenance_request_schema.MaintenanceRequestStatus] = Query(None, description="Фильтр по статусу"),
+    aircraft_id: Optional[int] = Query(None, description="Фильтр по самолету"),
+    aviation_engineer_id: Optional[int] = Query(None, description="Фильтр по инженеру"),
+    date_from: Optional[datetime] = Query(None, description="Дата от (создания заявки)"),
+    date_to: Optional[datetime] = Query(None, description="Дата до (создания заявки)"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Получение списка заявок с полной информацией о связанных объектах.
     
-    # Сортировка по дате создания (новые сначала)
-    query = query.order_by(models.MaintenanceRequest.created_at.desc())
+    Параметры фильтрации и пагинации те же, что и у списка заявок. Количество запросов к БД
+    не зависит от размера страницы.
     
-    maintenance_requests = query.offset(skip).limit(limit).all()
-    return maintenance_requests
+    Требуется аутентификация.
+    """
+    query = _filter_maintenance_requests(
+        select(models.MaintenanceRequest).options(*MAINTENANCE_REQUEST_RELATIONS),
+        status, aircraft_id, aviation_engineer_id, date_from, date_to
+    )
+    
+    result = await db.execute(paginate(query, models.MaintenanceRequest, skip, limit, cursor))
+    maintenance_requests = result.scalars().all()
+    set_next_cursor(response, maintenance_requests, limit)
+    return [_maintenance_request_with_relations(mr) for mr in maintenance_requests]
 
 @router.get(
     "/{request_id}", 
@@ -201,7 +224,9 @@ def get_maintenance_request_with_relations(
     
     Требуется аутентификация.
     """
-    maintenance_request = db.query(models.MaintenanceRequest).filter(
+    maintenance_request = db.query(models.MaintenanceRequest).options(
+        *MAINTENANCE_REQUEST_RELATIONS
+    ).filter(
         models.MaintenanceRequest.id == request_id
     ).first()
     
@@ -211,6 +236,10 @@ def get_maintenance_request_with_relations(
             detail="Maintenance request not found"
         )
     
+    return _maintenance_request_with_relations(maintenance_request)
+
+def _maintenance_request_with_relations(maintenance_request: models.MaintenanceRequest) -> Dict[str, Any]:
+    """Заявка с информацией о связанных объектах (связи должны быть уже загружены)"""
     # Собираем полную информацию
     response_data = {
         "id": maintenance_request.id,
@@ -273,6 +302,7 @@ def get_maintenance_request_with_relations(
 def update_maintenance_request(
     request_id: int,
     maintenance_request_update: maintenance_request_schema.MaintenanceRequestUpdate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
@@ -292,48 +322,83 @@ def update_maintenance_request(
     
     Требуется аутентификация.
     """
-    maintenance_request = db.query(models.MaintenanceRequest).filter(
-        models.MaintenanceRequest.id == request_id
+    maintenance_request = _apply_maintenance_request_update(request_id, maintenance_request_update, db)
+    background_tasks.add_task(
+        events.publish_events, events.maintenance_request_event("updated", maintenance_request)
+    )
+    return maintenance_request
+
+def _reference_checks(
+    aircraft_id: Optional[int] = None,
+    warehouse_employee_id: Optional[int] = None,
+    aviation_engineer_id: Optional[int] = None,
+    tool_set_id: Optional[int] = None
+) -> list:
+    """
+    Колонки проверки ссылок заявки для одного SELECT.
+    
+    Каждая указанная ссылка превращается в подзапрос EXISTS (для инженера - его роль),
+    поэтому проверка всех ссылок стоит один запрос к БД вместо отдельного запроса на каждую.
+    """
+    columns = []
+    if aircraft_id is not None:
+        columns.append(exists().where(models.Aircraft.id == aircraft_id).label("aircraft_exists"))
+    if warehouse_employee_id is not None:
+        columns.append(exists().where(models.User.id == warehouse_employee_id).label("warehouse_employee_exists"))
+    if aviation_engineer_id:
+        columns.append(
+            select(models.User.role).where(models.User.id == aviation_engineer_id)
+            .scalar_subquery().label("aviation_engineer_role")
+        )
+    if tool_set_id:
+        columns.append(exists().where(models.ToolSet.id == tool_set_id).label("tool_set_exists"))
+    return columns
+
+def _raise_for_references(row):
+    """Ошибка 400 для первой несуществующей ссылки (порядок проверок прежний)"""
+    checks = row._mapping
+    detail = None
+    if "aircraft_exists" in checks and not checks["aircraft_exists"]:
+        detail = "Aircraft not found"
+    elif "warehouse_employee_exists" in checks and not checks["warehouse_employee_exists"]:
+        detail = "Warehouse employee not found"
+    elif "aviation_engineer_role" in checks and checks["aviation_engineer_role"] is None:
+        detail = "Aviation engineer not found"
+    elif "aviation_engineer_role" in checks and checks["aviation_engineer_role"] != models.Role.AVIATION_ENGINEER:
+        detail = "Specified user is not an aviation engineer"
+    elif "tool_set_exists" in checks and not checks["tool_set_exists"]:
+        detail = "Tool set not found"
+    
+    if detail:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=detail
+        )
+
+def _apply_maintenance_request_update(
+    request_id: int,
+    maintenance_request_update: maintenance_request_schema.MaintenanceRequestUpdate,
+    db: Session
+):
+    """Валидация и применение изменений заявки (общая часть update и assign-engineer)"""
+    update_data = maintenance_request_update.dict(exclude_unset=True)
+    
+    # Заявка загружается тем же запросом, что и проверка новых ссылок
+    row = db.execute(
+        select(models.MaintenanceRequest, *_reference_checks(
+            aviation_engineer_id=update_data.get('aviation_engineer_id'),
+            tool_set_id=update_data.get('tool_set_id'),
+        )).where(models.MaintenanceRequest.id == request_id)
     ).first()
     
-    if not maintenance_request:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Maintenance request not found"
         )
     
-    update_data = maintenance_request_update.dict(exclude_unset=True)
-    
-    # Валидация aviation_engineer_id
-    if 'aviation_engineer_id' in update_data:
-        aviation_engineer_id = update_data['aviation_engineer_id']
-        if aviation_engineer_id:
-            aviation_engineer = db.query(models.User).filter(
-                models.User.id == aviation_engineer_id
-            ).first()
-            if not aviation_engineer:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Aviation engineer not found"
-                )
-            if aviation_engineer.role != models.Role.AVIATION_ENGINEER:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Specified user is not an aviation engineer"
-                )
-    
-    # Валидация tool_set_id
-    if 'tool_set_id' in update_data:
-        tool_set_id = update_data['tool_set_id']
-        if tool_set_id:
-            tool_set = db.query(models.ToolSet).filter(
-                models.ToolSet.id == tool_set_id
-            ).first()
-            if not tool_set:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Tool set not found"
-                )
+    maintenance_request = row[0]
+    _raise_for_references(row)
     
     # Применяем обновления
     for field, value in update_data.items():
@@ -352,6 +417,7 @@ def update_maintenance_request(
 def assign_engineer_to_request(
     request_id: int,
     engineer_data: maintenance_request_schema.MaintenanceRequestUpdate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
@@ -365,7 +431,11 @@ def assign_engineer_to_request(
     
     Требуется аутентификация.
     """
-    return update_maintenance_request(request_id, engineer_data, db, current_user)
+    maintenance_request = _apply_maintenance_request_update(request_id, engineer_data, db)
+    background_tasks.add_task(
+        events.publish_events, events.maintenance_request_event("assigned", maintenance_request)
+    )
+    return maintenance_request
 
 @router.put(
     "/{request_id}/complete",
@@ -375,6 +445,7 @@ def assign_engineer_to_request(
 )
 def complete_maintenance_request(
     request_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
@@ -400,6 +471,10 @@ def complete_maintenance_request(
     maintenance_request.status = maintenance_request_schema.MaintenanceRequestStatus.COMPLETED.value
     db.commit()
     db.refresh(maintenance_request)
+
+    background_tasks.add_task(
+        events.publish_events, events.maintenance_request_event("completed", maintenance_request)
+    )
     return maintenance_request
 
 @router.get(
@@ -422,22 +497,21 @@ def get_maintenance_requests_stats(
     
     Требуется аутентификация.
     """
-    # Общее количество
-    total_count = db.query(models.MaintenanceRequest).count()
-    
-    # Количество по статусам
-    status_counts = {}
-    for status in maintenance_request_schema.MaintenanceRequestStatus:
-        count = db.query(models.MaintenanceRequest).filter(
-            models.MaintenanceRequest.status == status
-        ).count()
-        status_counts[status] = count
-    
-    # Количество за последние 7 дней
     week_ago = datetime.now() - timedelta(days=7)
-    recent_count = db.query(models.MaintenanceRequest).filter(
-        models.MaintenanceRequest.created_at >= week_ago
-    ).count()
+    
+    # Все показатели одним запросом: COUNT ... FILTER (WHERE ...) по каждому статусу
+    stats = db.execute(select(
+        func.count().label("total"),
+        *[
+            func.count().filter(models.MaintenanceRequest.status == status).label(status.value)
+            for status in maintenance_request_schema.MaintenanceRequestStatus
+        ],
+        func.count().filter(models.MaintenanceRequest.created_at >= week_ago).label("recent_count"),
+    ).select_from(models.MaintenanceRequest)).one()._mapping
+    
+    total_count = stats["total"]
+    status_counts = {status: stats[status.value] for status in maintenance_request_schema.MaintenanceRequestStatus}
+    recent_count = stats["recent_count"]
     
     return {
         "total": total_count,
@@ -496,6 +570,7 @@ def delete_maintenance_request(
 def mark_request_as_incident(
     request_id: int,
     incident_data: incident_schema.CreateIncidentFromRequest,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
@@ -580,6 +655,12 @@ def mark_request_as_incident(
     db.commit()
     db.refresh(maintenance_request)
     db.refresh(incident)  # Обновляем инцидент чтобы получить ID
+
+    background_tasks.add_task(
+        events.publish_events,
+        events.maintenance_request_event("incident_marked", maintenance_request),
+        events.incident_event("created", incident)
+    )
     
     # Создаем расширенный ответ
     response_data = maintenance_request_schema.MaintenanceRequest.from_orm(maintenance_request).dict()
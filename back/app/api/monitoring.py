@@ -0,0 +1,72 @@
+from fastapi import APIRouter, Depends
+from app.database import engine, async_engine, sync_pool_metrics, async_pool_metrics, get_pool_stats
+from app.config import DB_STATEMENT_TIMEOUT_MS, DB_POOL_RECYCLE, DB_POOL_PRE_PING
+from app.passwords import login_metrics
+from app.events import events_manager
+from app.metrics import REGISTRY, QUEUE_DEPTH, DB_POOL_CONNECTIONS
+from .websocket import manager
+from .dependencies import get_current_admin
+
+router = APIRouter(prefix="/monitoring", tags=["Мониторинг"], dependencies=[Depends(get_current_admin)])
+
+
+def collect_state_metrics():
+    """Текущее состояние очередей и пулов для /metrics"""
+    for engine_name, sync_engine, pool_metrics in (
+        ("sync", engine, sync_pool_metrics),
+        ("async", async_engine.sync_engine, async_pool_metrics),
+    ):
+        stats = get_pool_stats(sync_engine, pool_metrics)
+        for state in ("checkedin", "checkedout", "overflow"):
+            if stats[state] is not None:
+                DB_POOL_CONNECTIONS.set(stats[state], engine=engine_name, state=state)
+    QUEUE_DEPTH.set(manager.frames_in_progress, queue="ws_video_frames")
+    QUEUE_DEPTH.set(len(manager.active_connections), queue="ws_video_connections")
+    QUEUE_DEPTH.set(len(events_manager.subscribers), queue="ws_event_subscribers")
+    QUEUE_DEPTH.set(login_metrics.in_flight, queue="password_hashing")
+
+
+REGISTRY.add_collector(collect_state_metrics)
+
+@router.get(
+    "/db-pool",
+    summary="Статистика пула соединений с БД",
+    description="Возвращает состояние пулов синхронного и асинхронного движков SQLAlchemy"
+)
+async def get_db_pool_stats():
+    """
+    Получение статистики пула соединений (только для администратора).
+
+    Для каждого движка (`sync`, `async`) возвращает:
+    - **size**, **checkedin**, **checkedout**, **overflow**: текущее состояние пула
+    - **checkouts**, **connects**, **invalidations**: накопленные счетчики
+    - **wait_seconds_avg**, **wait_seconds_max**: время ожидания свободного соединения
+    - **timeouts**: сколько раз истек pool_timeout (`QueuePool limit reached`)
+    """
+    return {
+        "sync": get_pool_stats(engine, sync_pool_metrics),
+        "async": get_pool_stats(async_engine.sync_engine, async_pool_metrics),
+        "settings": {
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pool_pre_ping": DB_POOL_PRE_PING,
+            "statement_timeout_ms": DB_STATEMENT_TIMEOUT_MS,
+        }
+    }
+
+@router.get(
+    "/auth",
+    summary="Статистика входов и хэширования паролей",
+    description="Возвращает счетчики входов и загрузку пула хэширования паролей"
+)
+async def get_auth_stats():
+    """
+    Получение статистики аутентификации (только для администратора).
+
+    - **logins**, **login_failures**: успешные и неуспешные входы
+    - **rehashes**: пароли, пересчитанные при входе после смены cost factor
+    - **in_flight**: операции bcrypt в пуле и в очереди к нему
+    - **hash_seconds_avg**, **hash_seconds_max**: длительность одной операции bcrypt
+    - **queue_wait_seconds_max**: максимальное ожидание свободного потока пула
+    - **workers**, **rounds**: размер пула и текущий cost factor
+    """
+    return login_metrics.snapshot()
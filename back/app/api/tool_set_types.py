@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select, insert
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from .dependencies import get_db, get_current_user
 from app.models import models
 from app.schemas import tool_set_type_schema
+from app.bulk import check_bulk_size, payload_duplicates, bulk_insert
 
 router = APIRouter(prefix="/tool-set-types", tags=["Тип набора инструментов"])
 
@@ -64,6 +66,63 @@ def create_tool_set_type(
     db.refresh(db_tool_set_type)
     return db_tool_set_type
 
+@router.post(
+    "/bulk",
+    response_model=tool_set_type_schema.ToolSetTypeBulkResult,
+    status_code=status.HTTP_201_CREATED,
+    summary="Массово создать типы наборов инструментов",
+    description="Создает список типов наборов одной транзакцией с проверкой каждого элемента"
+)
+def bulk_create_tool_set_types(
+    payload: tool_set_type_schema.ToolSetTypeBulkCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Массовое создание типов наборов инструментов.
+    
+    - **items**: Список типов наборов в формате одиночного создания
+    
+    Уникальность имен и существование всех tool_type_ids проверяются одним запросом
+    на весь список. Типы наборов и их связи с типами инструментов вставляются пакетно.
+    Элементы с ошибками не создаются и перечисляются в **errors** с позицией в запросе.
+    
+    Требуется аутентификация.
+    """
+    items = payload.items
+    check_bulk_size(items)
+    
+    names = [item.name for item in items]
+    existing_names = set(db.scalars(select(models.ToolSetType.name).where(models.ToolSetType.name.in_(names))))
+    duplicate_names = payload_duplicates(names)
+    referenced_ids = {tool_type_id for item in items for tool_type_id in item.tool_type_ids}
+    existing_tool_type_ids = set(db.scalars(
+        select(models.ToolType.id).where(models.ToolType.id.in_(referenced_ids))
+    )) if referenced_ids else set()
+    
+    rows, errors = [], []
+    for index, item in enumerate(items):
+        if item.name in existing_names:
+            errors.append({"index": index, "detail": "Tool set type with this name already exists"})
+        elif item.name in duplicate_names:
+            errors.append({"index": index, "detail": "Duplicate name in request"})
+        elif not set(item.tool_type_ids) <= existing_tool_type_ids:
+            errors.append({"index": index, "detail": "One or more tool type IDs not found"})
+        else:
+            rows.append({"name": item.name, "description": item.description, "tool_type_ids": item.tool_type_ids})
+    
+    created = bulk_insert(db, models.ToolSetType, rows)
+    # Массовая вставка не проходит через flush - связи с типами инструментов добавляем отдельным пакетом
+    links = [
+        {"tool_set_type_id": tool_set_type.id, "tool_type_id": tool_type_id}
+        for tool_set_type in created
+        for tool_type_id in dict.fromkeys(tool_set_type.tool_type_ids)
+    ]
+    if links:
+        db.execute(insert(models.tool_set_type_tool_types), links)
+    db.commit()
+    return {"created": created, "errors": errors}
+
 @router.get(
     "/", 
     response_model=List[tool_set_type_schema.ToolSetType],
@@ -147,12 +206,8 @@ def get_tool_set_type_with_tools(
             detail="Tool set type not found"
         )
     
-    # Получаем детальную информацию об инструментах
-    tool_types = []
-    if tool_set_type.tool_type_ids:
-        tool_types = db.query(models.ToolType).filter(
-            models.ToolType.id.in_(tool_set_type.tool_type_ids)
-        ).all()
+    # Получаем детальную информацию об инструментах из таблицы связей
+    tool_types = sorted(tool_set_type.tool_types, key=lambda tool_type: tool_type.id)
     
     # Создаем расширенный ответ
     tool_set_type_data = tool_set_type_schema.ToolSetType.from_orm(tool_set_type)
@@ -189,14 +244,13 @@ def get_tool_set_types_by_tool_type(
             detail="Tool type not found"
         )
     
-    # Получаем все типы наборов
-    all_tool_set_types = db.query(models.ToolSetType).all()
-    
-    # Фильтруем вручную те наборы, которые содержат нужный tool_type_id
-    matching_tool_set_types = []
-    for tool_set_type in all_tool_set_types:
-        if tool_set_type.tool_type_ids and tool_type_id in tool_set_type.tool_type_ids:
-            matching_tool_set_types.append(tool_set_type)
+    # Индексный поиск по таблице связей вместо перебора всех типов наборов
+    matching_tool_set_types = db.query(models.ToolSetType).join(
+        models.tool_set_type_tool_types,
+        models.tool_set_type_tool_types.c.tool_set_type_id == models.ToolSetType.id
+    ).filter(
+        models.tool_set_type_tool_types.c.tool_type_id == tool_type_id
+    ).order_by(models.ToolSetType.id).all()
     
     return matching_tool_set_types
 
@@ -391,12 +445,8 @@ def get_tool_set_type_with_tools(
             detail="Tool set type not found"
         )
     
-    # Получаем детальную информацию об инструментах
-    tool_types = []
-    if tool_set_type.tool_type_ids:
-        tool_types = db.query(models.ToolType).filter(
-            models.ToolType.id.in_(tool_set_type.tool_type_ids)
-        ).all()
+    # Получаем детальную информацию об инструментах из таблицы связей
+    tool_types = sorted(tool_set_type.tool_types, key=lambda tool_type: tool_type.id)
     
     # Создаем расширенный ответ
     tool_set_type_data = tool_set_type_schema.ToolSetType.from_orm(tool_set_type)
@@ -1,12 +1,43 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select, insert
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Set
 from .dependencies import get_db, get_current_user
 from app.models import models
 from app.schemas import tool_set_schema, tool_set_type_schema
+from app.bulk import check_bulk_size, payload_duplicates, bulk_insert
 
 router = APIRouter(prefix="/tool-sets", tags=["Набор инструментов"])
 
+def _existing_tool_type_ids(db: Session, batch_maps) -> Set[int]:
+    """ID типов инструментов из ключей batch_map, существующие в БД (один запрос на все мапы)"""
+    ids = {tool_type_id for batch_map in batch_maps for tool_type_id in models.batch_map_items(batch_map)}
+    if not ids:
+        return set()
+    return set(db.scalars(select(models.ToolType.id).where(models.ToolType.id.in_(ids))))
+
+def _batch_map_errors(batch_map: Dict[str, str], tool_set_type: models.ToolSetType,
+                      existing_tool_type_ids: Set[int]) -> List[str]:
+    """Проверяет, что ключи batch_map - существующие типы инструментов из tool_type_ids типа набора"""
+    allowed = tool_set_type.tool_type_ids if tool_set_type is not None else None
+    errors = []
+    for key in (batch_map or {}).keys():
+        try:
+            tool_type_id = int(key)
+        except (TypeError, ValueError):
+            errors.append(f"Invalid tool type ID {key}")
+            continue
+        if allowed and tool_type_id not in allowed:
+            errors.append(f"Tool type ID {key} is not part of the selected tool set type")
+        elif tool_type_id not in existing_tool_type_ids:
+            errors.append(f"Tool type ID {key} not found")
+    return errors
+
+def _batch_map_error(batch_map: Dict[str, str], tool_set_type: models.ToolSetType,
+                     existing_tool_type_ids: Set[int]) -> Optional[str]:
+    errors = _batch_map_errors(batch_map, tool_set_type, existing_tool_type_ids)
+    return errors[0] if errors else None
+
 @router.post(
     "/", 
     response_model=tool_set_schema.ToolSet, 
@@ -30,7 +61,7 @@ def create_tool_set(
     **Валидация:**
     - Проверяет существование tool_set_type_id
     - Проверяет уникальность batch_number
-    - Проверяет, что batch_map соответствует tool_type_ids из типа набора
+    - Проверяет, что batch_map соответствует tool_type_ids из типа набора и ссылается на существующие типы инструментов
     """
     # Проверяем существование типа набора
     tool_set_type = db.query(models.ToolSetType).filter(
@@ -55,14 +86,14 @@ def create_tool_set(
         )
     
     # Валидация batch_map
-    if tool_set_type.tool_type_ids:
-        # Проверяем, что все ключи в batch_map существуют в tool_type_ids
-        for tool_type_id in tool_set.batch_map.keys():
-            if int(tool_type_id) not in tool_set_type.tool_type_ids:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Tool type ID {tool_type_id} is not part of the selected tool set type"
-                )
+    batch_map_error = _batch_map_error(
+        tool_set.batch_map, tool_set_type, _existing_tool_type_ids(db, [tool_set.batch_map])
+    )
+    if batch_map_error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=batch_map_error
+        )
     
     db_tool_set = models.ToolSet(
         tool_set_type_id=tool_set.tool_set_type_id,
@@ -76,6 +107,77 @@ def create_tool_set(
     db.refresh(db_tool_set)
     return db_tool_set
 
+@router.post(
+    "/bulk",
+    response_model=tool_set_schema.ToolSetBulkResult,
+    status_code=status.HTTP_201_CREATED,
+    summary="Массово создать наборы инструментов",
+    description="Создает список наборов инструментов одной транзакцией с проверкой каждого элемента"
+)
+def bulk_create_tool_sets(
+    payload: tool_set_schema.ToolSetBulkCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Массовое создание наборов инструментов.
+    
+    - **items**: Список наборов в формате одиночного создания
+    
+    Типы наборов и занятые партийные номера загружаются одним запросом на весь список,
+    наборы и их партийные номера инструментов (tool_set_items) вставляются пакетно.
+    Элементы с ошибками не создаются и перечисляются в **errors** с позицией в запросе.
+    
+    Требуется аутентификация.
+    """
+    items = payload.items
+    check_bulk_size(items)
+    
+    type_ids = {item.tool_set_type_id for item in items}
+    tool_set_types = {
+        tool_set_type.id: tool_set_type
+        for tool_set_type in db.scalars(select(models.ToolSetType).where(models.ToolSetType.id.in_(type_ids)))
+    }
+    batch_numbers = [item.batch_number for item in items]
+    existing_batch_numbers = set(db.scalars(
+        select(models.ToolSet.batch_number).where(models.ToolSet.batch_number.in_(batch_numbers))
+    ))
+    duplicate_batch_numbers = payload_duplicates(batch_numbers)
+    existing_tool_type_ids = _existing_tool_type_ids(db, [item.batch_map for item in items])
+    
+    rows, errors = [], []
+    for index, item in enumerate(items):
+        tool_set_type = tool_set_types.get(item.tool_set_type_id)
+        if tool_set_type is None:
+            error = "Tool set type not found"
+        elif item.batch_number in existing_batch_numbers:
+            error = "Tool set with this batch number already exists"
+        elif item.batch_number in duplicate_batch_numbers:
+            error = "Duplicate batch number in request"
+        else:
+            error = _batch_map_error(item.batch_map, tool_set_type, existing_tool_type_ids)
+        if error:
+            errors.append({"index": index, "detail": error})
+            continue
+        rows.append({
+            "tool_set_type_id": item.tool_set_type_id,
+            "batch_number": item.batch_number,
+            "description": item.description,
+            "batch_map": item.batch_map or {},
+        })
+    
+    created = bulk_insert(db, models.ToolSet, rows)
+    # Массовая вставка не проходит через flush - tool_set_items заполняем отдельным пакетом
+    tool_set_items = [
+        {"tool_set_id": tool_set.id, "tool_type_id": tool_type_id, "batch_number": batch_number}
+        for tool_set in created
+        for tool_type_id, batch_number in models.batch_map_items(tool_set.batch_map).items()
+    ]
+    if tool_set_items:
+        db.execute(insert(models.ToolSetItem), tool_set_items)
+    db.commit()
+    return {"created": created, "errors": errors}
+
 @router.get(
     "/", 
     response_model=List[tool_set_schema.ToolSet],
@@ -163,6 +265,50 @@ def get_tool_set_by_batch_number(
         )
     return tool_set
 
+@router.post(
+    "/resolve-serials",
+    response_model=List[tool_set_schema.SerialResolution],
+    summary="Найти наборы по партийным номерам инструментов",
+    description="Для каждого партийного номера инструмента возвращает наборы, в которых он числится"
+)
+def resolve_serials(
+    request: tool_set_schema.SerialResolveRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Поиск наборов по партийным номерам инструментов (например, распознанным OCR).
+    
+    - **serials**: Список партийных номеров инструментов
+    
+    Все номера ищутся одним запросом по индексу tool_set_items.batch_number.
+    Ответ содержит элемент для каждого номера из запроса в том же порядке.
+    
+    Требуется аутентификация.
+    """
+    serials = list(dict.fromkeys(request.serials))
+    matches: Dict[str, list] = {serial: [] for serial in serials}
+    if serials:
+        rows = db.query(
+            models.ToolSetItem.batch_number,
+            models.ToolSetItem.tool_type_id,
+            models.ToolSet.id,
+            models.ToolSet.batch_number,
+        ).join(
+            models.ToolSet, models.ToolSet.id == models.ToolSetItem.tool_set_id
+        ).filter(
+            models.ToolSetItem.batch_number.in_(serials)
+        ).order_by(models.ToolSet.id).all()
+        
+        for serial, tool_type_id, tool_set_id, tool_set_batch_number in rows:
+            matches[serial].append({
+                "tool_set_id": tool_set_id,
+                "tool_set_batch_number": tool_set_batch_number,
+                "tool_type_id": tool_type_id,
+            })
+    
+    return [{"serial": serial, "matches": matches[serial]} for serial in request.serials]
+
 @router.get(
     "/{tool_set_id}/with-type",
     response_model=tool_set_schema.ToolSetWithType,
@@ -230,7 +376,7 @@ def update_tool_set(
     
     **Валидация:**
     - Проверяет уникальность batch_number при изменении
-    - Проверяет соответствие batch_map tool_type_ids типа набора
+    - Проверяет соответствие batch_map tool_type_ids типа набора и существование типов инструментов
     
     Требуется аутентификация.
     """
@@ -257,15 +403,15 @@ def update_tool_set(
     
     # Валидация batch_map
     if 'batch_map' in update_data:
-        tool_set_type = tool_set.tool_set_type
-        if tool_set_type and tool_set_type.tool_type_ids:
-            # Проверяем, что все ключи в batch_map существуют в tool_type_ids
-            for tool_type_id in update_data['batch_map'].keys():
-                if int(tool_type_id) not in tool_set_type.tool_type_ids:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Tool type ID {tool_type_id} is not part of the tool set type"
-                    )
+        batch_map_error = _batch_map_error(
+            update_data['batch_map'], tool_set.tool_set_type,
+            _existing_tool_type_ids(db, [update_data['batch_map']])
+        )
+        if batch_map_error:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=batch_map_error
+            )
     
     # Применяем обновления
     for field, value in update_data.items():
@@ -358,10 +504,9 @@ def validate_tool_set(
         validation_errors.append("Tool set type not found")
     else:
         # Проверка соответствия batch_map
-        if tool_set_type.tool_type_ids and tool_set.batch_map:
-            for tool_type_id in tool_set.batch_map.keys():
-                if int(tool_type_id) not in tool_set_type.tool_type_ids:
-                    validation_errors.append(f"Tool type ID {tool_type_id} is not part of the selected tool set type")
+        validation_errors.extend(_batch_map_errors(
+            tool_set.batch_map, tool_set_type, _existing_tool_type_ids(db, [tool_set.batch_map])
+        ))
     
     # Проверка уникальности batch_number
     existing_tool_set = db.query(models.ToolSet).filter(
@@ -1,12 +1,89 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy import select, delete, event
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from .dependencies import get_db, get_current_user
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Dict, Any
+import hashlib
+import json
+import threading
+from types import SimpleNamespace
+from .dependencies import get_db, get_async_db, get_current_user
 from app.models import models
 from app.schemas import tool_types_schema
+from app.bulk import check_bulk_size, payload_duplicates, bulk_insert, bulk_update
 
 router = APIRouter(prefix="/tool-types", tags=["Тип инструмента"])
 
+
+class ToolTypeTreeCache:
+    """Закэшированное дерево типов инструментов и его ETag (сбрасывается при изменении типов)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = 0
+        self.tree: Optional[List[Dict[str, Any]]] = None
+        self.etag: Optional[str] = None
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def set(self, tree: List[Dict[str, Any]], version: int):
+        """Сохраняет дерево, если с момента начала его построения не было изменений"""
+        etag = '"' + hashlib.sha1(json.dumps(tree, sort_keys=True).encode()).hexdigest() + '"'
+        with self._lock:
+            if version == self._version:
+                self.tree, self.etag = tree, etag
+        return etag
+
+    def invalidate(self):
+        with self._lock:
+            self._version += 1
+            self.tree, self.etag = None, None
+
+
+tool_type_tree_cache = ToolTypeTreeCache()
+TOOL_TYPES_CHANGED_KEY = "tool_types_changed"
+
+
+@event.listens_for(Session, "before_flush")
+def _mark_tool_types_changed(session, flush_context, instances):
+    if any(isinstance(obj, models.ToolType) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info[TOOL_TYPES_CHANGED_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_tool_type_tree(session):
+    # Сбрасываем кэш при любом изменении типов через ORM (эндпоинты, массовые операции, скрипты)
+    if session.info.pop(TOOL_TYPES_CHANGED_KEY, False):
+        tool_type_tree_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_tool_types_changed(session):
+    session.info.pop(TOOL_TYPES_CHANGED_KEY, None)
+
+
+def build_tool_type_tree(tool_types) -> List[Dict[str, Any]]:
+    """Собирает дерево из плоского списка типов (одним проходом, без запросов по узлам)"""
+    children_by_parent: Dict[Optional[int], list] = {}
+    for item in tool_types:
+        children_by_parent.setdefault(item.category_id, []).append(item)
+
+    def build(parent_id: Optional[int]):
+        return [
+            {
+                "id": item.id,
+                "name": item.name,
+                "category_id": item.category_id,
+                "is_item": item.is_item,
+                "children": build(item.id) if not item.is_item else []
+            }
+            for item in children_by_parent.get(parent_id, [])
+        ]
+
+    return build(None)
+
 @router.post(
     "/", 
     response_model=tool_types_schema.ToolType, 
@@ -40,53 +117,279 @@ def create_tool_type(
             detail="Tool type with this name already exists"
         )
     
-    # Валидация tool_class
-    if tool_type.tool_class and not tool_type.is_item:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Tool class can only be set for items (is_item=true)"
-        )
-    
-    # Если указан tool_class, автоматически устанавливаем is_item=true
-    if tool_type.tool_class:
-        tool_type.is_item = True
-    
-    # Валидация иерархии (существующий код)
+    parent_category = None
     if tool_type.category_id:
         parent_category = db.query(models.ToolType).filter(
             models.ToolType.id == tool_type.category_id
         ).first()
-        
-        if not parent_category:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Parent category not found"
-            )
-        
-        if parent_category.is_item and not tool_type.is_item:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Category cannot be nested under an item"
-            )
     
-    if tool_type.is_item and not tool_type.category_id:
+    error = _tool_type_error(tool_type, parent_category)
+    if error:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Item must have a parent category"
+            detail=error
         )
     
-    db_tool_type = models.ToolType(
-        name=tool_type.name,
-        category_id=tool_type.category_id,
-        is_item=tool_type.is_item,
-        tool_class=tool_type.tool_class
-    )
+    db_tool_type = models.ToolType(**_tool_type_values(tool_type))
     
     db.add(db_tool_type)
     db.commit()
     db.refresh(db_tool_type)
     return db_tool_type
 
+def _tool_type_error(tool_type: tool_types_schema.ToolTypeCreate, parent_category: Optional[models.ToolType]) -> Optional[str]:
+    """
+    Проверка правил иерархии и tool_class (общая для одиночного и массового создания).
+    
+    parent_category - загруженная родительская категория (или элемент того же массового запроса,
+    на который ссылается parent_ref) либо None, если она не найдена.
+    """
+    has_parent = bool(tool_type.category_id or getattr(tool_type, "parent_ref", None))
+    
+    # Валидация tool_class
+    if tool_type.tool_class and not tool_type.is_item:
+        return "Tool class can only be set for items (is_item=true)"
+    
+    # Валидация иерархии
+    if has_parent:
+        if not parent_category:
+            return "Parent category not found"
+        if parent_category.is_item and not tool_type.is_item:
+            return "Category cannot be nested under an item"
+    
+    if tool_type.is_item and not has_parent:
+        return "Item must have a parent category"
+    return None
+
+def _tool_type_values(tool_type: tool_types_schema.ToolTypeCreate) -> Dict[str, Any]:
+    return {
+        "name": tool_type.name,
+        "category_id": tool_type.category_id,
+        # Если указан tool_class, это всегда инструмент
+        "is_item": tool_type.is_item or bool(tool_type.tool_class),
+        "tool_class": tool_type.tool_class,
+    }
+
+def _bulk_ref_levels(items: List[tool_types_schema.ToolTypeBulkItem], errors: Dict[int, str]) -> Dict[int, int]:
+    """
+    Уровень каждого корректного элемента в цепочке parent_ref (0 - родитель в БД или корень).
+
+    Элементы, родитель которых не прошел проверку или которые образуют цикл, добавляются в errors.
+    """
+    index_by_ref = {item.ref: index for index, item in enumerate(items) if item.ref is not None}
+    levels: Dict[int, int] = {}
+    for start in range(len(items)):
+        # Поднимаемся по parent_ref до корня, уже обработанного элемента или цикла
+        path, on_path = [], set()
+        index = start
+        while index is not None and index not in levels and index not in errors and index not in on_path:
+            path.append(index)
+            on_path.add(index)
+            parent_ref = items[index].parent_ref
+            index = index_by_ref[parent_ref] if parent_ref is not None else None
+        if index is None or index in levels:
+            level = levels[index] if index is not None else -1
+            for member in reversed(path):
+                level += 1
+                levels[member] = level
+            continue
+        if index in on_path:
+            cycle_start = path.index(index)
+            for member in path[cycle_start:]:
+                errors[member] = "Cyclic parent_ref"
+            path = path[:cycle_start]
+        for member in path:
+            errors[member] = "Parent item is not created"
+    return levels
+
+@router.post(
+    "/bulk",
+    response_model=tool_types_schema.ToolTypeBulkResult,
+    status_code=status.HTTP_201_CREATED,
+    summary="Массово создать типы инструментов",
+    description="Создает список типов инструментов и категорий одной транзакцией с проверкой каждого элемента"
+)
+def bulk_create_tool_types(
+    payload: tool_types_schema.ToolTypeBulkCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Массовое создание типов инструментов.
+    
+    - **items**: Список типов в формате одиночного создания
+    - **ref**, **parent_ref**: родитель из этого же запроса - дерево категорий с инструментами
+      создается одним запросом (parent_ref указывается вместо category_id)
+    
+    Все проверки выполняются набором запросов на весь список (уникальность имен,
+    существование родительских категорий), корректные элементы вставляются одним запросом
+    на каждый уровень вложенности parent_ref. Элементы с ошибками не создаются и перечисляются
+    в **errors** с позицией в запросе; потомки такого элемента по parent_ref тоже не создаются.
+    
+    Требуется аутентификация.
+    """
+    items = payload.items
+    check_bulk_size(items)
+    
+    names = [item.name for item in items]
+    existing_names = set(db.scalars(select(models.ToolType.name).where(models.ToolType.name.in_(names))))
+    duplicate_names = payload_duplicates(names)
+    refs = [item.ref for item in items if item.ref is not None]
+    duplicate_refs = payload_duplicates(refs)
+    index_by_ref = {item.ref: index for index, item in enumerate(items) if item.ref is not None}
+    parent_ids = {item.category_id for item in items if item.category_id}
+    parents = {
+        parent.id: parent
+        for parent in db.scalars(select(models.ToolType).where(models.ToolType.id.in_(parent_ids)))
+    } if parent_ids else {}
+    values = [_tool_type_values(item) for item in items]
+    
+    errors: Dict[int, str] = {}
+    for index, item in enumerate(items):
+        if item.name in existing_names:
+            error = "Tool type with this name already exists"
+        elif item.name in duplicate_names:
+            error = "Duplicate name in request"
+        elif item.ref is not None and item.ref in duplicate_refs:
+            error = "Duplicate ref in request"
+        elif item.parent_ref is not None and item.category_id:
+            error = "Specify either category_id or parent_ref"
+        elif item.parent_ref is not None and (item.parent_ref not in index_by_ref or item.parent_ref in duplicate_refs):
+            error = "Parent ref not found"
+        elif item.parent_ref is not None:
+            parent = values[index_by_ref[item.parent_ref]]
+            error = _tool_type_error(item, SimpleNamespace(is_item=parent["is_item"]))
+        else:
+            error = _tool_type_error(item, parents.get(item.category_id))
+        if error:
+            errors[index] = error
+    
+    levels = _bulk_ref_levels(items, errors)
+    created_by_index = {}
+    for level in range(max(levels.values(), default=-1) + 1):
+        indexes = [index for index, item_level in levels.items() if item_level == level]
+        rows = []
+        for index in indexes:
+            row = values[index]
+            if items[index].parent_ref is not None:
+                row = {**row, "category_id": created_by_index[index_by_ref[items[index].parent_ref]].id}
+            rows.append(row)
+        created_by_index.update(zip(indexes, bulk_insert(db, models.ToolType, rows)))
+    db.commit()
+    # Массовая вставка не проходит через flush - сбрасываем кэш дерева явно
+    tool_type_tree_cache.invalidate()
+    return {
+        "created": [created_by_index[index] for index in sorted(created_by_index)],
+        "errors": [{"index": index, "detail": errors[index]} for index in sorted(errors)],
+    }
+
+@router.put(
+    "/bulk",
+    response_model=tool_types_schema.ToolTypeBulkUpdateResult,
+    summary="Массово обновить типы инструментов",
+    description="Обновляет список типов инструментов и категорий одной транзакцией с проверкой каждого элемента"
+)
+def bulk_update_tool_types(
+    payload: tool_types_schema.ToolTypeBulkUpdate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Массовое обновление типов инструментов.
+    
+    - **items**: Список изменений в формате одиночного обновления с **id** элемента
+    
+    Правила те же, что у PUT /tool-types/{id}; проверки выполняются по состоянию БД до запроса
+    набором запросов на весь список, изменения записываются пакетными UPDATE в одной транзакции.
+    Элементы с ошибками не обновляются и перечисляются в **errors** с позицией в запросе.
+    
+    Требуется аутентификация.
+    """
+    items = payload.items
+    check_bulk_size(items)
+    
+    ids = [item.id for item in items]
+    tool_types = {
+        tool_type.id: tool_type
+        for tool_type in db.scalars(select(models.ToolType).where(models.ToolType.id.in_(ids)))
+    }
+    duplicate_ids = payload_duplicates(ids)
+    updates = [item.model_dump(exclude_unset=True, exclude={"id"}) for item in items]
+    new_names = [data["name"] for data in updates if data.get("name")]
+    name_owners = dict(db.execute(
+        select(models.ToolType.name, models.ToolType.id).where(models.ToolType.name.in_(new_names))
+    ).all()) if new_names else {}
+    duplicate_names = payload_duplicates(new_names)
+    parent_ids = {data["category_id"] for data in updates if data.get("category_id")}
+    parents = {
+        parent.id: parent
+        for parent in db.scalars(select(models.ToolType).where(models.ToolType.id.in_(parent_ids)))
+    } if parent_ids else {}
+    
+    rows, updated_ids, errors = [], [], []
+    for index, (item, data) in enumerate(zip(items, updates)):
+        tool_type = tool_types.get(item.id)
+        if tool_type is None:
+            error = "Tool type not found"
+        elif item.id in duplicate_ids:
+            error = "Duplicate id in request"
+        else:
+            error = _tool_type_update_error(tool_type, data, name_owners, duplicate_names, parents)
+        if error:
+            errors.append({"index": index, "detail": error})
+            continue
+        if data:
+            rows.append({"id": item.id, **data})
+        updated_ids.append(item.id)
+    
+    bulk_update(db, models.ToolType, rows)
+    db.commit()
+    # Массовое обновление не проходит через flush - сбрасываем кэш дерева явно
+    tool_type_tree_cache.invalidate()
+    updated = {
+        tool_type.id: tool_type
+        for tool_type in db.scalars(
+            select(models.ToolType).where(models.ToolType.id.in_(updated_ids)).execution_options(populate_existing=True)
+        )
+    } if updated_ids else {}
+    return {"updated": [updated[tool_type_id] for tool_type_id in updated_ids], "errors": errors}
+
+def _tool_type_update_error(
+    tool_type: models.ToolType,
+    update_data: Dict[str, Any],
+    name_owners: Dict[str, int],
+    duplicate_names: set,
+    parents: Dict[int, models.ToolType],
+) -> Optional[str]:
+    """
+    Проверки PUT /tool-types/{id} для одного элемента массового обновления.
+
+    update_data дополняется is_item=True, если задается tool_class.
+    """
+    name = update_data.get("name")
+    if name and name != tool_type.name:
+        if name in duplicate_names:
+            return "Duplicate name in request"
+        if name in name_owners:
+            return "Tool type with this name already exists"
+    
+    tool_class = update_data.get("tool_class")
+    if tool_class:
+        if not (tool_type.is_item or update_data.get("is_item", True)):
+            return "Tool class can only be set for items (is_item=true)"
+        update_data["is_item"] = True
+    
+    new_category_id = update_data.get("category_id")
+    if new_category_id:
+        parent_category = parents.get(new_category_id)
+        if not parent_category:
+            return "Parent category not found"
+        if new_category_id == tool_type.id:
+            return "Cannot set self as parent"
+        if parent_category.is_item and not update_data.get("is_item", tool_type.is_item):
+            return "Category cannot be nested under an item"
+    return None
+
 @router.get(
     "/", 
     response_model=List[tool_types_schema.ToolType],
@@ -190,31 +493,33 @@ def get_tool_type_children(
     summary="Получить дерево категорий",
     description="Возвращает дерево категорий и инструментов, начиная с корневого уровня"
 )
-def get_tool_type_tree(
-    db: Session = Depends(get_db),
+async def get_tool_type_tree(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """
     Получение полного дерева категорий и инструментов.
+    
+    Дерево строится одним запросом и кэшируется до изменения типов инструментов.
+    Ответ содержит заголовок `ETag`: при совпадении `If-None-Match` возвращается 304 без тела.
     """
-    def build_tree(parent_id: Optional[int] = None):
-        query = db.query(models.ToolType).filter(models.ToolType.category_id == parent_id)
-        items = query.all()
-        
-        result = []
-        for item in items:
-            node = {
-                "id": item.id,
-                "name": item.name,
-                "category_id": item.category_id,
-                "is_item": item.is_item,
-                "children": build_tree(item.id) if not item.is_item else []
-            }
-            result.append(node)
-        
-        return result
+    tree, etag = tool_type_tree_cache.tree, tool_type_tree_cache.etag
+    if tree is None:
+        version = tool_type_tree_cache.version
+        result = await db.execute(
+            select(models.ToolType).order_by(models.ToolType.id)
+        )
+        tree = build_tool_type_tree(result.scalars().all())
+        etag = tool_type_tree_cache.set(tree, version)
+    
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
     
-    return build_tree()
+    response.headers.update(headers)
+    return tree
 
 @router.get(
     "/categories/root",
@@ -331,7 +636,7 @@ def update_tool_type(
     "/{tool_type_id}", 
     status_code=status.HTTP_204_NO_CONTENT,
     summary="Удалить тип инструмента",
-    description="Удаляет тип инструмента или категорию из системы. Для категорий рекурсивно удаляет все дочерние элементы."
+    description="Удаляет тип инструмента или категорию из системы. Для категорий удаляет все поддерево одним запросом."
 )
 def delete_tool_type(
     tool_type_id: int,
@@ -350,26 +655,48 @@ def delete_tool_type(
                 detail="Tool type not found"
             )
         
-        def delete_children(parent_id: int):
-            """Удаляет всех дочерних элементов"""
-            children = db.query(models.ToolType).filter(
-                models.ToolType.category_id == parent_id
-            ).all()
-            
-            for child in children:
-                # Рекурсивно удаляем детей детей
-                delete_children(child.id)
-                # Удаляем самого ребенка
-                db.delete(child)
+        # Все поддерево (сам элемент и потомки любой глубины) - рекурсивный CTE
+        subtree = select(models.ToolType.id).where(
+            models.ToolType.id == tool_type_id
+        ).cte(name="subtree", recursive=True)
+        subtree = subtree.union_all(
+            select(models.ToolType.id).where(models.ToolType.category_id == subtree.c.id)
+        )
+        subtree_ids = set(db.execute(select(subtree.c.id)).scalars().all())
         
-        # Удаляем всех детей (если это категория)
-        if not tool_type.is_item:
-            delete_children(tool_type_id)
+        # Типы наборов, в состав которых входят удаляемые типы - их проекцию tool_type_ids нужно обновить
+        affected_tool_set_types = db.query(models.ToolSetType).join(
+            models.tool_set_type_tool_types,
+            models.tool_set_type_tool_types.c.tool_set_type_id == models.ToolSetType.id
+        ).filter(
+            models.tool_set_type_tool_types.c.tool_type_id.in_(subtree_ids)
+        ).distinct().all()
         
-        # Удаляем сам элемент
-        db.delete(tool_type)
+        # Убираем удаляемые типы из batch_map наборов (строки tool_set_items удаляются синхронно при flush)
+        affected_tool_sets = db.query(models.ToolSet).join(models.ToolSet.items).filter(
+            models.ToolSetItem.tool_type_id.in_(subtree_ids)
+        ).distinct().all()
+        removed_keys = {str(tool_type_id) for tool_type_id in subtree_ids}
+        for tool_set in affected_tool_sets:
+            tool_set.batch_map = {
+                key: value for key, value in tool_set.batch_map.items() if key not in removed_keys
+            }
+        db.flush()
+        
+        # Связи с типами наборов и само поддерево удаляются двумя запросами вместо обхода по узлам
+        db.execute(delete(models.tool_set_type_tool_types).where(
+            models.tool_set_type_tool_types.c.tool_type_id.in_(subtree_ids)
+        ))
+        db.execute(
+            delete(models.ToolType).where(models.ToolType.id.in_(subtree_ids)),
+            execution_options={"synchronize_session": False}
+        )
+        for tool_set_type in affected_tool_set_types:
+            tool_set_type.tool_type_ids = [i for i in tool_set_type.tool_type_ids if i not in subtree_ids]
         
         db.commit()
+        # Удаление через Core не проходит через flush - сбрасываем кэш дерева явно
+        tool_type_tree_cache.invalidate()
         
     except Exception as e:
         db.rollback()
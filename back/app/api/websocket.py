@@ -1,4 +1,6 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from typing import Dict, Optional
 import time
 import base64
@@ -6,9 +8,22 @@ import json
 from datetime import datetime
 from pathlib import Path
 from app.ml import predict_yolo_seg_prod
+from app.events import events_manager
+from app.tracing import start_trace, span
+from app.config import VIDEO_LATENCY_BUDGET_MS
+from .dependencies import get_async_db, get_current_user
 
 router = APIRouter(prefix="/ws", tags=["WebSocket видео потоки"])
 
+# Файл последнего кадра, который передается в модель (/app/app/ml/img/output.jpg в контейнере);
+# у каждого клиента свой файл (output_<client_id>.jpg) - кадры разных клиентов обрабатываются параллельно
+FRAME_PATH = predict_yolo_seg_prod.SCRIPT_DIR / "img/output.jpg"
+
+
+def frame_path(client_id: str) -> Path:
+    """Файл последнего кадра клиента"""
+    return FRAME_PATH.with_name(f"{FRAME_PATH.stem}_{client_id}{FRAME_PATH.suffix}")
+
 # Создаем словарь для маппинга
 TOOL_CLASSES_MAP = {
     0: "BOKOREZY",
@@ -37,6 +52,8 @@ class ConnectionManager:
         # Хранилище клиентов и их данных
         self.active_connections: Dict[str, Dict] = {}
         self.frames_history: Dict[str, list] = {}
+        # Кадры, которые сейчас обрабатываются моделью (глубина очереди инференса)
+        self.frames_in_progress = 0
 
     async def connect(self, websocket: WebSocket, client_id: str):
         """Подключение клиента"""
@@ -65,6 +82,7 @@ class ConnectionManager:
             frame_count = client_data['frame_count']
             print(f'🔌 Клиент отключен: {client_id} | Время: {connection_time:.1f}с | Кадров: {frame_count}')
             del self.active_connections[client_id]
+            frame_path(client_id).unlink(missing_ok=True)
 
     async def handle_video_frame(self, client_id: str, data: dict):
         """Обработка видео кадров от клиента"""
@@ -90,66 +108,96 @@ class ConnectionManager:
             # Сохраняем последний кадр
             client_data['last_frame'] = frame_data
             
-            # Добавляем в историю (ограничиваем размер)
-            if client_id not in self.frames_history:
-                self.frames_history[client_id] = []
-            
-            self.frames_history[client_id].append({
-                'frame': frame_data,
-                # 'timestamp': data.get('timestamp', time.time()),
-                'size': len(base64.b64decode(frame_data))
-            })
-            
-            # Ограничиваем историю последними 100 кадрами
-            if len(self.frames_history[client_id]) > 100:
-                self.frames_history[client_id].pop(0)
-            
-            # Логируем статистику
-            fps = self.calculate_fps(client_id)
-            frame_size = len(base64.b64decode(frame_data))
-            print(f'📹 Кадр от {client_id[:8]}... | FPS: {fps:.1f} | Размер: {frame_size} байт')
-            
-            # Декодируем base64 в бинарные данные
-            image_data = base64.b64decode(frame_data)
-            # Сохраняем в файл
-            with open('/app/app/ml/img/output.jpg', 'wb') as f:
-                f.write(image_data)
-
-            classes, obb_rows, masks, probs, overlap_flag, overlap_score = predict_yolo_seg_prod.run('/app/app/ml/img/output.jpg')
-
-            # Конвертируем masks в JSON-сериализуемый формат
-            serializable_masks = []
-            if masks is not None:
-                for mask in masks:
-                    # Конвертируем numpy array в список
-                    if hasattr(mask, 'tolist'):
-                        serializable_masks.append(mask.tolist())
-                    else:
-                        serializable_masks.append(mask)
-            serializable_probs = []
-            if probs is not None:
-                for prob in probs:
-                    # Конвертируем numpy array в список
-                    if hasattr(prob, 'tolist'):
-                        serializable_probs.append(prob.tolist())
-                    else:
-                        serializable_probs.append(prob)
-            
-            resultClasses = map_classes_to_names(classes)
+            with start_trace("ws_video_frame", client_id=client_id, frame_number=client_data['frame_count']) as trace:
+                with span("image_decode"):
+                    # Декодируем base64 в бинарные данные
+                    image_data = base64.b64decode(frame_data)
+
+                    # Добавляем в историю (ограничиваем размер)
+                    if client_id not in self.frames_history:
+                        self.frames_history[client_id] = []
+
+                    self.frames_history[client_id].append({
+                        'frame': frame_data,
+                        # 'timestamp': data.get('timestamp', time.time()),
+                        'size': len(image_data)
+                    })
+
+                    # Ограничиваем историю последними 100 кадрами
+                    if len(self.frames_history[client_id]) > 100:
+                        self.frames_history[client_id].pop(0)
+
+                    # Сохраняем в файл
+                    image_path = frame_path(client_id)
+                    with open(image_path, 'wb') as f:
+                        f.write(image_data)
+
+                # Логируем статистику
+                fps = self.calculate_fps(client_id)
+                print(f'📹 Кадр от {client_id[:8]}... | FPS: {fps:.1f} | Размер: {len(image_data)} байт')
+
+                # Счетчик увеличивается до ожидания инференса: кадры других клиентов, пришедшие за это
+                # время, видят его в queue_depth, /health/ready и метрике очереди
+                self.frames_in_progress += 1
+                try:
+                    # Разрешение по бюджету задержки с учетом очереди: под нагрузкой кадры обрабатываются
+                    # в меньшем разрешении, а не накапливаются
+                    imgsz = predict_yolo_seg_prod.select_imgsz(
+                        quality=data.get('quality'),
+                        latency_budget_ms=data.get('latency_budget_ms', VIDEO_LATENCY_BUDGET_MS),
+                        queue_depth=self.frames_in_progress,
+                    )
+                    # Инференс блокирующий - выполняется в пуле потоков, event loop продолжает принимать кадры
+                    classes, obb_rows, masks, probs, overlap_flag, overlap_score, overlap_pairs = await run_in_threadpool(
+                        predict_yolo_seg_prod.run, str(image_path), imgsz=imgsz
+                    )
+                finally:
+                    self.frames_in_progress -= 1
+
+                with span("serialize"):
+                    # Конвертируем masks в JSON-сериализуемый формат
+                    serializable_masks = []
+                    if masks is not None:
+                        for mask in masks:
+                            # Конвертируем numpy array в список
+                            if hasattr(mask, 'tolist'):
+                                serializable_masks.append(mask.tolist())
+                            else:
+                                serializable_masks.append(mask)
+                    serializable_probs = []
+                    if probs is not None:
+                        for prob in probs:
+                            # Конвертируем numpy array в список
+                            if hasattr(prob, 'tolist'):
+                                serializable_probs.append(prob.tolist())
+                            else:
+                                serializable_probs.append(prob)
+
+                resultClasses = map_classes_to_names(classes)
+
+                message = {
+                    'overlap_flag': overlap_flag,
+                    'overlap_score': overlap_score,
+                    'overlap_pairs': overlap_pairs,
+                    'classes': resultClasses,
+                    'probs': serializable_probs,
+                    'masks': serializable_masks,
+                    'obb_rows': obb_rows,
+                    'imgsz': imgsz,
+                    'type': 'frame_received',
+                    'frame_number': client_data['frame_count'],
+                    'fps': fps,
+                    'timestamp': time.time()
+                }
+                if data.get('timings'):
+                    # Время кодирования самого ответа в него не попадает - только в метрики и файл трассировки
+                    message['timings'] = trace.timings()
+
+                with span("json_encode"):
+                    payload = json.dumps(message)
 
             # Отправляем подтверждение клиенту
-            await self.send_message(client_id, {
-                'overlap_flag': overlap_flag,
-                'overlap_score': overlap_score,
-                'classes': resultClasses,
-                'probs': serializable_probs,
-                'masks': serializable_masks,
-                'obb_rows': obb_rows,
-                'type': 'frame_received',
-                'frame_number': client_data['frame_count'],
-                'fps': fps,
-                'timestamp': time.time()
-            })
+            await self.send_text(client_id, payload)
             
             return True
             
@@ -184,9 +232,13 @@ class ConnectionManager:
 
     async def send_message(self, client_id: str, message: dict):
         """Отправка сообщения конкретному клиенту"""
+        await self.send_text(client_id, json.dumps(message))
+
+    async def send_text(self, client_id: str, payload: str):
+        """Отправка уже закодированного сообщения конкретному клиенту"""
         if client_id in self.active_connections:
             try:
-                await self.active_connections[client_id]['websocket'].send_text(json.dumps(message))
+                await self.active_connections[client_id]['websocket'].send_text(payload)
             except Exception as e:
                 print(f'❌ Ошибка отправки сообщения клиенту {client_id}: {e}')
                 await self.disconnect(client_id)
@@ -250,10 +302,27 @@ async def websocket_video_endpoint(websocket: WebSocket):
     {
         "type": "video_frame",
         "frame": "base64_encoded_image_data",
-        "timestamp": 1234567890.123
+        "timestamp": 1234567890.123,
+        "timings": false,
+        "quality": null,
+        "latency_budget_ms": 300
     }
     ```
     
+    Входное разрешение модели выбирается для каждого кадра: `quality` (fast | balanced | accurate)
+    задает его явно, иначе - наибольшее, укладывающееся в `latency_budget_ms`
+    (по умолчанию VIDEO_LATENCY_BUDGET_MS) с учетом очереди кадров. Выбранный размер
+    возвращается в поле `imgsz` ответа `frame_received`.
+    
+    Поле `overlap_pairs` ответа `frame_received` - пересекающиеся пары инструментов:
+    `{"pair": [i, j], "obb_iou", "obb_overlap", "mask_iou", "mask_overlap"}`, где i, j - индексы
+    в `obb_rows`, overlap - доля пересечения от площади меньшего из двух инструментов.
+    
+    При `"timings": true` ответ `frame_received` содержит объект `timings` - длительность
+    этапов обработки кадра в миллисекундах (image_decode, letterbox, forward, mask_postprocess,
+    obb_extraction, overlap_geometry, overlap_classifier - только если перекрытие не определено
+    по геометрии инстансов, crop_loop, serialize, total).
+    
     **Клиенту:**
     ```json
     {
@@ -321,6 +390,88 @@ async def websocket_video_endpoint(websocket: WebSocket):
     except WebSocketDisconnect:
         await manager.disconnect(client_id)
 
+@router.websocket("/events")
+async def websocket_events_endpoint(
+    websocket: WebSocket,
+    entities: Optional[str] = Query(None, description="Сущности через запятую: maintenance_request,incident"),
+    token: Optional[str] = Query(None, description="JWT токен (если не передан заголовок Authorization)"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    WebSocket канал событий об изменениях заявок на ТО и инцидентов.
+
+    Заменяет периодический опрос `/api/maintenance-requests` и `/api/incidents`.
+    Требуется аутентификация, как и у этих эндпоинтов: токен передается в заголовке
+    `Authorization: Bearer <token>` или параметром `token` (браузерный WebSocket не передает заголовки).
+    Без действительного токена соединение закрывается с кодом 1008 (policy violation).
+
+    **Параметры:**
+    - `entities`: фильтр по сущностям (по умолчанию - все)
+    - `token`: JWT токен
+
+    **Клиенту:**
+    ```json
+    {
+        "type": "incident.resolved",
+        "entity": "incident",
+        "data": {"id": 1, "status": "RESOLVED", "maintenance_request_id": 3},
+        "timestamp": 1234567890.123
+    }
+    ```
+
+    **Типы событий:**
+    - `maintenance_request.created`, `maintenance_request.updated`, `maintenance_request.assigned`,
+      `maintenance_request.completed`, `maintenance_request.incident_marked`
+    - `incident.created`, `incident.updated`, `incident.resolved`, `incident.closed`
+    """
+    authorization = websocket.headers.get('authorization', '')
+    if authorization.lower().startswith('bearer '):
+        token = authorization[7:]
+    try:
+        if not token:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+        await get_current_user(token, db)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    finally:
+        # Сессия нужна только для проверки токена - соединение с БД не держим на время подписки
+        await db.close()
+
+    client_id = f"events_{int(time.time() * 1000)}_{id(websocket)}"
+    subscribed = {e.strip() for e in entities.split(',') if e.strip()} if entities else None
+
+    await events_manager.connect(websocket, client_id, subscribed)
+
+    try:
+        while True:
+            data = await websocket.receive_text()
+            try:
+                message = json.loads(data)
+            except json.JSONDecodeError:
+                continue
+            if message.get('type') == 'ping':
+                await websocket.send_text(json.dumps({'type': 'pong', 'timestamp': time.time()}))
+    except WebSocketDisconnect:
+        events_manager.disconnect(client_id)
+
+@router.get("/events/status")
+async def get_events_status():
+    """
+    Получение статуса канала событий.
+
+    **Пример ответа:**
+    ```json
+    {
+        "subscribers_count": 3,
+        "events_sent": 120,
+        "rabbitmq_enabled": true,
+        "rabbitmq_connected": true
+    }
+    ```
+    """
+    return events_manager.get_stats()
+
 # HTTP endpoints для мониторинга (опционально)
 @router.get("/status")
 async def get_websocket_status():
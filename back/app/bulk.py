@@ -0,0 +1,46 @@
+from collections import Counter
+from typing import Iterable, List, Set
+
+from fastapi import HTTPException, status
+from sqlalchemy import insert, update
+
+from .config import BULK_MAX_ITEMS
+
+
+def check_bulk_size(items: list):
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many items in one request (max {BULK_MAX_ITEMS})"
+        )
+
+
+def payload_duplicates(values: Iterable) -> Set:
+    """Значения, которые встречаются в запросе больше одного раза"""
+    return {value for value, count in Counter(values).items() if count > 1}
+
+
+def bulk_insert(db, model, rows: List[dict]) -> list:
+    """
+    Вставка строк одним executemany-запросом с RETURNING, без flush по объектам.
+
+    Возвращает ORM-объекты в порядке rows. Хуки before_flush при этом не срабатывают,
+    связанные таблицы вызывающий код заполняет сам.
+    """
+    if not rows:
+        return []
+    return db.scalars(insert(model).returning(model, sort_by_parameter_order=True), rows).all()
+
+
+def bulk_update(db, model, rows: List[dict]):
+    """
+    Обновление строк по первичному ключу (в каждой строке - id и изменяемые поля).
+
+    Строки группируются по набору полей, каждая группа - один executemany-запрос UPDATE.
+    Как и bulk_insert, не проходит через flush.
+    """
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    for group in groups.values():
+        db.execute(update(model), group)
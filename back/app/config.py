@@ -5,3 +5,70 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 RABBITMQ_URL = os.getenv("RABBITMQ_URL")
+
+# События об изменениях заявок и инцидентов
+EVENTS_EXCHANGE = os.getenv("EVENTS_EXCHANGE", "aflt.events")
+RABBITMQ_RETRY_INTERVAL = float(os.getenv("RABBITMQ_RETRY_INTERVAL", "30"))
+
+# Пул соединений SQLAlchemy (общий для синхронного и асинхронного движков, на каждый движок)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# Таймаут одного SQL-запроса на стороне PostgreSQL, 0 - без ограничения
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+
+# Максимальное количество элементов в одном запросе массового создания
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "1000"))
+
+# Хэширование паролей: cost factor bcrypt и размер выделенного пула потоков.
+# При изменении PASSWORD_HASH_ROUNDS хэши пересчитываются при следующем входе пользователя
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+
+# Кэш пользователей для get_current_user: время жизни записи и максимальное число записей (LRU)
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "1000"))
+
+# Статический Bearer-токен для сбора /metrics (Prometheus), пусто - только JWT администратора
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Файл для трассировок инференса в формате Chrome Trace (chrome://tracing, Perfetto), пусто - не писать
+INFERENCE_TRACE_FILE = os.getenv("INFERENCE_TRACE_FILE", "")
+
+# Проверки состояния: загрузка и прогрев моделей при старте (если выключено - при первой проверке
+# готовности), интервал повтора неудавшегося прогрева, время кэширования результата проверки
+# готовности и максимальное число кадров в обработке, при котором сервис еще готов
+ML_WARMUP_ON_STARTUP = os.getenv("ML_WARMUP_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+ML_WARMUP_RETRY_SECONDS = float(os.getenv("ML_WARMUP_RETRY_SECONDS", "30"))
+HEALTH_CACHE_TTL_SECONDS = float(os.getenv("HEALTH_CACHE_TTL_SECONDS", "2"))
+INFERENCE_QUEUE_LIMIT = int(os.getenv("INFERENCE_QUEUE_LIMIT", "8"))
+
+# Заглушка инференса для нагрузочного тестования /api/ws/video без весов моделей:
+# задержка в миллисекундах на INFERENCE_IMGSZ (на других размерах - пропорционально площади)
+# вместо вызова модели, пусто - реальная модель
+INFERENCE_STUB_MS = float(os.getenv("INFERENCE_STUB_MS")) if os.getenv("INFERENCE_STUB_MS") else None
+
+# Тайловый инференс фото высокого разрешения (/api/files/predict/*?tiled=true): сторона тайла
+# в пикселях, перекрытие соседних тайлов (доля), размер батча, порог IoU масок для объединения
+# инстансов соседних тайлов, дополнительный прогон изображения целиком (для крупных инструментов)
+INFERENCE_TILE_SIZE = int(os.getenv("INFERENCE_TILE_SIZE", "1024"))
+INFERENCE_TILE_OVERLAP = float(os.getenv("INFERENCE_TILE_OVERLAP", "0.2"))
+INFERENCE_TILE_BATCH = int(os.getenv("INFERENCE_TILE_BATCH", "8"))
+INFERENCE_TILE_MERGE_IOU = float(os.getenv("INFERENCE_TILE_MERGE_IOU", "0.5"))
+INFERENCE_TILE_FULL_IMAGE = os.getenv("INFERENCE_TILE_FULL_IMAGE", "true").lower() in ("1", "true", "yes")
+
+# Входное разрешение SegmentModel: размер по умолчанию и дополнительные размеры (для ONNX/OpenVINO
+# экспортируются заранее), из которых выбирается размер для запроса по качеству или бюджету задержки;
+# бюджет задержки кадра видеопотока в миллисекундах (под нагрузкой кадры обрабатываются в меньшем разрешении)
+INFERENCE_IMGSZ = int(os.getenv("INFERENCE_IMGSZ", "640"))
+INFERENCE_IMGSZ_OPTIONS = [int(size) for size in os.getenv("INFERENCE_IMGSZ_OPTIONS", "480,640,960").split(",") if size.strip()]
+VIDEO_LATENCY_BUDGET_MS = float(os.getenv("VIDEO_LATENCY_BUDGET_MS", "300"))
+
+# Каскад проверки перекрытия инструментов: классификатор перекрытия запускается, только если геометрия
+# инстансов неоднозначна. Перекрытие OBB пары (доля меньшего) не больше OVERLAP_CLEAN_MAX - перекрытия нет,
+# перекрытие масок от OVERLAP_MASK_MIN - есть; при 0-1 инстансе и false - классификатор на каждом кадре
+OVERLAP_CASCADE_ENABLED = os.getenv("OVERLAP_CASCADE_ENABLED", "true").lower() in ("1", "true", "yes")
+OVERLAP_CLEAN_MAX = float(os.getenv("OVERLAP_CLEAN_MAX", "0.02"))
+OVERLAP_MASK_MIN = float(os.getenv("OVERLAP_MASK_MIN", "0.3"))
@@ -1,12 +1,152 @@
-from sqlalchemy import create_engine
+import threading
+import time
+
+from sqlalchemy import create_engine, event, exc
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from databases import Database
-from .config import DATABASE_URL
+from .metrics import attach_query_listeners
+from .config import (
+    DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT_MS,
+)
+
+# Асинхронные драйверы для схем из DATABASE_URL
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url: str) -> str:
+    """postgresql://... -> postgresql+asyncpg://..., sqlite://... -> sqlite+aiosqlite://..."""
+    scheme, sep, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+
+class PoolMetrics:
+    """Счетчики пула соединений: выдачи, ожидание свободного соединения, таймауты"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.waits = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.timeouts = 0
+
+    def observe_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.waits += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def increment(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": self.wait_seconds_total,
+                "wait_seconds_avg": self.wait_seconds_total / self.waits if self.waits else 0.0,
+                "wait_seconds_max": self.wait_seconds_max,
+            }
+
+
+def make_instrumented_pool(pool_cls, metrics: PoolMetrics):
+    """
+    Подкласс пула, замеряющий время ожидания соединения.
+
+    Время считается от запроса соединения до его выдачи (включая открытие нового соединения),
+    таймауты `QueuePool limit ... reached` учитываются отдельно.
+    """
+    class InstrumentedPool(pool_cls):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                connection = super()._do_get()
+            except exc.TimeoutError:
+                metrics.observe_wait(time.perf_counter() - start, timed_out=True)
+                raise
+            metrics.observe_wait(time.perf_counter() - start)
+            return connection
 
-engine = create_engine(DATABASE_URL)
+    InstrumentedPool.__name__ = f"Instrumented{pool_cls.__name__}"
+    return InstrumentedPool
+
+
+def attach_pool_listeners(sync_engine, metrics: PoolMetrics):
+    event.listen(sync_engine, "connect", lambda *args: metrics.increment("connects"))
+    event.listen(sync_engine, "checkout", lambda *args: metrics.increment("checkouts"))
+    event.listen(sync_engine, "checkin", lambda *args: metrics.increment("checkins"))
+    event.listen(sync_engine, "invalidate", lambda *args: metrics.increment("invalidations"))
+
+
+def engine_options(url: str, pool_cls, metrics: PoolMetrics, is_async: bool = False) -> dict:
+    """Параметры пула и таймаута запросов из app.config (для SQLite - настройки по умолчанию)"""
+    if url.startswith("sqlite"):
+        return {}
+
+    options = {
+        "poolclass": make_instrumented_pool(pool_cls, metrics),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if DB_STATEMENT_TIMEOUT_MS > 0 and url.startswith("postgresql"):
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+
+def get_pool_stats(sync_engine, metrics: PoolMetrics) -> dict:
+    """Текущее состояние пула движка вместе с накопленными счетчиками"""
+    pool = sync_engine.pool
+    stats = {"pool_class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        stats[name] = method() if callable(method) else None
+    stats["max_overflow"] = getattr(pool, "_max_overflow", None)
+    stats["timeout"] = pool.timeout() if callable(getattr(pool, "timeout", None)) else None
+    stats.update(metrics.snapshot())
+    return stats
+
+
+sync_pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL, QueuePool, sync_pool_metrics))
+attach_pool_listeners(engine, sync_pool_metrics)
+attach_query_listeners(engine, "sync")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронный путь для нагруженных эндпоинтов чтения: не занимает потоки threadpool на время запроса к БД
+ASYNC_DATABASE_URL = to_async_url(DATABASE_URL)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    **engine_options(ASYNC_DATABASE_URL, AsyncAdaptedQueuePool, async_pool_metrics, is_async=True)
+)
+attach_pool_listeners(async_engine.sync_engine, async_pool_metrics)
+attach_query_listeners(async_engine.sync_engine, "async")
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 database = Database(DATABASE_URL)
@@ -0,0 +1,112 @@
+import enum
+import json
+import time
+from typing import Dict, Optional, Set
+
+from fastapi import WebSocket
+from starlette.concurrency import run_in_threadpool
+
+from .rabbitmq import event_publisher
+
+# Поля, которые попадают в компактное событие (без описаний и путей к изображениям)
+MAINTENANCE_REQUEST_EVENT_FIELDS = (
+    "id", "status", "aircraft_id", "warehouse_employee_id", "aviation_engineer_id", "tool_set_id",
+)
+INCIDENT_EVENT_FIELDS = (
+    "id", "status", "maintenance_request_id", "aircraft_id", "aviation_engineer_id",
+    "quality_control_specialist_id", "tool_set_id",
+)
+
+
+def build_event(event_type: str, obj, fields) -> dict:
+    """
+    Собирает компактное событие об изменении сущности.
+
+    Формат:
+        {"type": "incident.resolved", "entity": "incident", "data": {...}, "timestamp": 1234567890.123}
+    """
+    data = {}
+    for field in fields:
+        value = getattr(obj, field, None)
+        if isinstance(value, enum.Enum):
+            value = value.value
+        data[field] = value
+    return {
+        "type": event_type,
+        "entity": event_type.split(".", 1)[0],
+        "data": data,
+        "timestamp": time.time(),
+    }
+
+
+def maintenance_request_event(event_type: str, maintenance_request) -> dict:
+    return build_event(f"maintenance_request.{event_type}", maintenance_request, MAINTENANCE_REQUEST_EVENT_FIELDS)
+
+
+def incident_event(event_type: str, incident) -> dict:
+    return build_event(f"incident.{event_type}", incident, INCIDENT_EVENT_FIELDS)
+
+
+class EventsManager:
+    """Подписчики WebSocket-канала событий"""
+
+    def __init__(self):
+        # client_id -> {'websocket': ..., 'entities': set() | None}
+        self.subscribers: Dict[str, Dict] = {}
+        self.events_sent = 0
+
+    async def connect(self, websocket: WebSocket, client_id: str, entities: Optional[Set[str]] = None):
+        await websocket.accept()
+        self.subscribers[client_id] = {
+            'websocket': websocket,
+            'entities': entities or None,
+            'connected_at': time.time(),
+        }
+        await websocket.send_text(json.dumps({
+            'type': 'subscribed',
+            'client_id': client_id,
+            'entities': sorted(entities) if entities else None,
+            'timestamp': time.time(),
+        }))
+
+    def disconnect(self, client_id: str):
+        self.subscribers.pop(client_id, None)
+
+    async def broadcast(self, event: dict):
+        message = json.dumps(event, default=str)
+        disconnected_clients = []
+        for client_id, subscriber in list(self.subscribers.items()):
+            entities = subscriber['entities']
+            if entities is not None and event.get('entity') not in entities:
+                continue
+            try:
+                await subscriber['websocket'].send_text(message)
+                self.events_sent += 1
+            except Exception:
+                disconnected_clients.append(client_id)
+
+        for client_id in disconnected_clients:
+            self.disconnect(client_id)
+
+    def get_stats(self) -> Dict:
+        return {
+            'subscribers_count': len(self.subscribers),
+            'events_sent': self.events_sent,
+            'rabbitmq_enabled': event_publisher.enabled,
+            'rabbitmq_connected': event_publisher.is_connected,
+        }
+
+
+# Глобальный менеджер подписчиков на события
+events_manager = EventsManager()
+
+
+async def publish_events(*events: dict):
+    """
+    Рассылает события подписчикам WebSocket и публикует их в RabbitMQ.
+
+    Вызывается через BackgroundTasks, поэтому выполняется уже после отправки ответа клиенту.
+    """
+    for event in events:
+        await events_manager.broadcast(event)
+        await run_in_threadpool(event_publisher.publish, event)
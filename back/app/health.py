@@ -0,0 +1,137 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from .config import HEALTH_CACHE_TTL_SECONDS, INFERENCE_QUEUE_LIMIT
+from .database import engine, sync_pool_metrics, get_pool_stats
+from .rabbitmq import event_publisher
+from .ml.predict_yolo_seg_prod import model_registry
+from .api.websocket import manager
+
+STARTED_AT = datetime.now(timezone.utc)
+
+# Статусы проверок: ok - в порядке, degraded - некритичная зависимость недоступна
+# (готовность не снимается), fail - сервис не готов принимать трафик
+OK, DEGRADED, FAIL = "ok", "degraded", "fail"
+
+
+def liveness() -> dict:
+    """Процесс жив и обслуживает event loop; зависимости не проверяются"""
+    now = datetime.now(timezone.utc)
+    return {
+        "status": "alive",
+        "timestamp": now.isoformat(),
+        "started_at": STARTED_AT.isoformat(),
+        "uptime_seconds": round((now - STARTED_AT).total_seconds(), 3),
+    }
+
+
+def check_database() -> dict:
+    """Пул не исчерпан и БД отвечает на SELECT 1"""
+    stats = get_pool_stats(engine, sync_pool_metrics)
+    if stats["size"] is not None and stats["max_overflow"] is not None and stats["max_overflow"] >= 0:
+        capacity = stats["size"] + stats["max_overflow"]
+        if stats["checkedout"] >= capacity:
+            return {"status": FAIL, "detail": "Connection pool exhausted", "checkedout": stats["checkedout"]}
+
+    start = time.perf_counter()
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except Exception as e:
+        return {"status": FAIL, "detail": f"{type(e).__name__}: {e}"}
+    return {"status": OK, "latency_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+
+def check_models() -> dict:
+    """
+    Модели загружены и прогреты.
+
+    Если прогрев при старте выключен (ML_WARMUP_ON_STARTUP=false) или не удался, проверка
+    запускает его в фоне (неудачный - не чаще ML_WARMUP_RETRY_SECONDS), иначе готовность
+    не наступила бы никогда.
+    """
+    model_registry.start_warmup()
+    status = model_registry.status()
+    if status["warmed"]:
+        return {"status": OK, **status}
+    detail = "Model warmup failed" if status["error"] else "Models are loading"
+    return {"status": FAIL, "detail": detail, **status}
+
+
+def check_inference_queue() -> dict:
+    """Число кадров в обработке не превышает INFERENCE_QUEUE_LIMIT"""
+    depth = manager.frames_in_progress
+    status = FAIL if depth >= INFERENCE_QUEUE_LIMIT else OK
+    return {"status": status, "depth": depth, "limit": INFERENCE_QUEUE_LIMIT}
+
+
+def check_rabbitmq() -> dict:
+    """
+    Состояние соединения с RabbitMQ.
+
+    Соединение открывается при первой публикации, а события без брокера теряются только
+    для внешних подписчиков, поэтому отсутствие соединения не снимает готовность.
+    """
+    if not event_publisher.enabled:
+        return {"status": OK, "detail": "Disabled"}
+    if event_publisher.is_connected:
+        return {"status": OK}
+    return {"status": DEGRADED, "detail": "Not connected"}
+
+
+CHECKS = {
+    "database": check_database,
+    "models": check_models,
+    "inference_queue": check_inference_queue,
+    "rabbitmq": check_rabbitmq,
+}
+
+
+def run_checks() -> Tuple[bool, dict]:
+    checks = {name: check() for name, check in CHECKS.items()}
+    ready = all(check["status"] != FAIL for check in checks.values())
+    return ready, {
+        "status": "ready" if ready else "not_ready",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "checks": checks,
+    }
+
+
+class ReadinessCache:
+    """
+    Результат проверки готовности, кэшируемый на HEALTH_CACHE_TTL_SECONDS.
+
+    Частые пробы оркестратора с нескольких узлов не создают нагрузку на БД:
+    проверка выполняется не чаще раза в ttl, одновременные пробы ждут одну проверку.
+    """
+
+    def __init__(self, ttl: float = HEALTH_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock: Optional[asyncio.Lock] = None
+        self._result: Optional[Tuple[bool, dict]] = None
+        self._expires_at = 0.0
+
+    async def get(self) -> Tuple[bool, dict]:
+        if self._result is not None and time.monotonic() < self._expires_at:
+            return self._result
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._result is None or time.monotonic() >= self._expires_at:
+                # Проверка БД блокирующая - выполняем вне event loop
+                self._result = await run_in_threadpool(run_checks)
+                self._expires_at = time.monotonic() + self.ttl
+            return self._result
+
+    def clear(self):
+        self._lock = None
+        self._result = None
+        self._expires_at = 0.0
+
+
+readiness_cache = ReadinessCache()
@@ -1,15 +1,34 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends
 from .database import database, engine
 from app.models import models
 from app.api.main import router as api_router
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from fastapi.responses import JSONResponse
+from app.metrics import MetricsMiddleware, REGISTRY, CONTENT_TYPE
+from app.health import liveness, readiness_cache
+from app.ml.predict_yolo_seg_prod import model_registry
+from app.config import ML_WARMUP_ON_STARTUP
+from app.api.dependencies import get_metrics_access
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.api.main import router as api_router
 from app.database import engine, Base
 
 Base.metadata.create_all(bind=engine)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Модели грузятся и прогреваются в фоне: liveness отвечает сразу, readiness - после прогрева.
+    # Без прогрева при старте он запускается первой проверкой готовности
+    if ML_WARMUP_ON_STARTUP:
+        model_registry.start_warmup()
+    yield
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title="Aviation Maintenance API",
     description="""
     API системы управления техническим обслуживанием авиационной техники.
@@ -48,6 +67,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 models.Base.metadata.create_all(bind=engine)
 
@@ -63,9 +83,46 @@ async def root():
         "redoc": "/redoc"
     }
 
-@app.get("/health", summary="Проверка здоровья системы", description="Проверяет статус работы API и базы данных")
+@app.get("/health", summary="Проверка жизнеспособности", description="Процесс жив; зависимости не проверяются")
+@app.get("/health/live", summary="Проверка жизнеспособности (liveness)", description="Процесс жив; зависимости не проверяются")
 async def health_check():
-    return {"status": "healthy", "timestamp": "2024-01-01T10:00:00Z"}
+    """
+    Liveness-проба: отвечает, пока работает event loop.
+
+    Не обращается к БД и моделям, чтобы оркестратор не перезапускал процесс
+    из-за недоступности внешних зависимостей или во время прогрева моделей.
+    """
+    return liveness()
+
+@app.get(
+    "/health/ready",
+    summary="Проверка готовности (readiness)",
+    description="Проверяет БД, загрузку и прогрев моделей, очередь инференса и RabbitMQ"
+)
+async def readiness_check():
+    """
+    Readiness-проба: 200, если процесс готов принимать трафик, иначе 503.
+
+    - **database**: пул соединений не исчерпан, БД отвечает на `SELECT 1`
+    - **models**: модели загружены и прогреты
+    - **inference_queue**: кадров в обработке меньше `INFERENCE_QUEUE_LIMIT`
+    - **rabbitmq**: соединение с брокером (`degraded` не снимает готовность)
+
+    Результат кэшируется на `HEALTH_CACHE_TTL_SECONDS`.
+    """
+    ready, report = await readiness_cache.get()
+    return JSONResponse(report, status_code=200 if ready else 503)
+
+@app.get(
+    "/metrics",
+    summary="Метрики в формате Prometheus",
+    description="Латентность HTTP по маршрутам, SQL-запросы на запрос, этапы инференса, очереди и пулы. "
+                "Требуется JWT администратора или METRICS_TOKEN",
+    include_in_schema=False,
+    dependencies=[Depends(get_metrics_access)]
+)
+async def metrics():
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
 
 if __name__ == "__main__":
     import uvicorn
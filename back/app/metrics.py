@@ -0,0 +1,293 @@
+import abc
+import contextvars
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+# Формат выдачи /metrics - текстовый формат экспозиции Prometheus 0.0.4
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+class Metric(abc.ABC):
+    """Метрика с набором меток; значения хранятся по кортежу значений меток"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[tuple, object] = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    @abc.abstractmethod
+    def samples(self) -> List[str]:
+        """Строки выборок в текстовом формате экспозиции"""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, ([*state[0]], state[1], state[2])) for key, state in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """
+    Набор метрик процесса.
+
+    Счетчики и гистограммы обновляются по месту событий; показатели состояния (размеры очередей,
+    пулов) заполняются коллекторами непосредственно перед выдачей /metrics.
+    """
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Длительность HTTP-запросов по маршруту", ("method", "route", "status")
+))
+HTTP_REQUEST_DB_QUERIES = REGISTRY.register(Histogram(
+    "http_request_db_queries", "Количество SQL-запросов на один HTTP-запрос", ("method", "route"),
+    buckets=QUERY_COUNT_BUCKETS
+))
+HTTP_REQUEST_DB_SECONDS = REGISTRY.register(Histogram(
+    "http_request_db_seconds", "Суммарное время SQL-запросов на один HTTP-запрос", ("method", "route")
+))
+DB_QUERY_DURATION = REGISTRY.register(Histogram(
+    "db_query_duration_seconds", "Длительность SQL-запросов", ("engine",), buckets=DB_QUERY_BUCKETS
+))
+INFERENCE_STAGE_DURATION = REGISTRY.register(Histogram(
+    "inference_stage_duration_seconds", "Длительность этапов обработки кадра/фото моделью", ("stage",)
+))
+INFERENCE_MODEL_LOADS = REGISTRY.register(Counter(
+    "inference_model_loads_total", "Загрузки моделей (создание SegmentModel/OverlapClassifier)", ("model", "backend")
+))
+OVERLAP_CASCADE_DECISIONS = REGISTRY.register(Counter(
+    "inference_overlap_cascade_total", "Вердикты перекрытия: по геометрии (clean, overlap) или классификатором", ("decision",)
+))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "queue_depth", "Текущая глубина очередей и число операций в работе", ("queue",)
+))
+DB_POOL_CONNECTIONS = REGISTRY.register(Gauge(
+    "db_pool_connections", "Состояние пула соединений с БД", ("engine", "state")
+))
+PROCESS_CPU_SECONDS = REGISTRY.register(Gauge(
+    "process_cpu_seconds_total", "Процессорное время процесса (user + system), секунды"
+))
+
+
+def collect_process_metrics():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    PROCESS_CPU_SECONDS.set(usage.ru_utime + usage.ru_stime)
+
+
+REGISTRY.add_collector(collect_process_metrics)
+
+
+class QueryStats:
+    """SQL-запросы, выполненные в рамках одного HTTP-запроса"""
+
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+# Статистика запросов текущего HTTP-запроса. Объект изменяемый, поэтому его видят и
+# синхронные обработчики в threadpool, и асинхронный движок (контекст копируется со ссылкой)
+current_query_stats: contextvars.ContextVar[Optional[QueryStats]] = contextvars.ContextVar(
+    "current_query_stats", default=None
+)
+
+
+def attach_query_listeners(sync_engine, engine_name: str):
+    """Замер длительности SQL-запросов движка и учет их в статистике текущего HTTP-запроса"""
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+        DB_QUERY_DURATION.observe(elapsed, engine=engine_name)
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.count += 1
+            stats.seconds += elapsed
+
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", after_cursor_execute)
+
+
+def route_template(scope) -> str:
+    """
+    Шаблон маршрута запроса с префиксом подключения роутера (`/api/aircraft/{aircraft_id}`).
+
+    В scope["route"] путь указан относительно роутера, подключенного через include_router,
+    поэтому префикс восстанавливается по той части пути, с которой совпадает шаблон маршрута.
+    """
+    route = scope.get("route")
+    path_regex = getattr(route, "path_regex", None)
+    if path_regex is None:
+        return "unmatched"
+    path = scope.get("path", "")
+    for index, char in enumerate(path):
+        if char == "/" and path_regex.match(path[index:]):
+            return path[:index] + route.path
+    return route.path
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: длительность и число SQL-запросов каждого HTTP-запроса по шаблону маршрута.
+
+    Метка route - шаблон маршрута после маршрутизации (`/api/aircraft/{aircraft_id}`),
+    поэтому число серий не растет с числом разных ID. Запросы без маршрута - route="unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            current_query_stats.reset(token)
+            route = route_template(scope)
+            method = scope.get("method", "")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start, method=method, route=route, status=status_code
+            )
+            HTTP_REQUEST_DB_QUERIES.observe(stats.count, method=method, route=route)
+            HTTP_REQUEST_DB_SECONDS.observe(stats.seconds, method=method, route=route)
@@ -0,0 +1,342 @@
+"""
+Бенчмарк инференса SegmentModel и OverlapClassifier по бэкендам, размерам батча и imgsz.
+
+Каждая конфигурация запускается в отдельном процессе (spawn): пиковый RSS и время загрузки
+модели не зависят от предыдущих конфигураций. Изображения корпуса декодируются заранее,
+в латентность входит только predict. Точность бэкендов сравнивается с эталоном prefer="torch"
+при том же imgsz: совпадение детекций по классу и IoU, разница уверенностей и оценок перекрытия.
+
+Запуск на CPU (из каталога back):
+
+    CUDA_VISIBLE_DEVICES= python -m app.ml.benchmark --images app/ml/img \\
+        --backends torch openvino onnx-cpu --batch-sizes 1 4 --imgsz 640 --output bench.json
+
+Экспорты ONNX/OpenVINO создаются во временном каталоге (или в --export-dir, чтобы переиспользовать
+их между запусками) рядом с копией весов: бенчмарк не пишет в ml/weights, откуда модель грузит сервис.
+
+С --baseline предыдущий JSON сравнивается с текущим: падение пропускной способности больше
+--tolerance для совпадающих конфигураций дает код возврата 1.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+SCRIPT_DIR = Path(__file__).parent.absolute()
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+SEGMENT_BACKENDS = ("torch", "openvino", "onnx-cpu", "onnx-gpu")
+BASELINE_BACKEND = "torch"
+MATCH_IOU = 0.5
+
+
+def collect_images(images_dir: Path, limit: Optional[int] = None) -> List[Path]:
+    """Изображения корпуса в фиксированном (отсортированном) порядке"""
+    paths = sorted(p for p in Path(images_dir).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    return paths[:limit] if limit else paths
+
+
+def latency_summary(latencies_ms: List[float]) -> Dict[str, float]:
+    values = np.asarray(latencies_ms, dtype=np.float64)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "mean": round(float(values.mean()), 3),
+        "p50": round(float(p50), 3),
+        "p95": round(float(p95), 3),
+        "p99": round(float(p99), 3),
+        "max": round(float(values.max()), 3),
+    }
+
+
+def peak_rss_mb() -> float:
+    """Пиковый RSS процесса (ru_maxrss: КБ в Linux, байты в macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _box_iou(box, boxes: np.ndarray) -> np.ndarray:
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / np.maximum(area + areas - inter, 1e-9)
+
+
+def match_detections(baseline: dict, candidate: dict, iou_threshold: float = MATCH_IOU) -> dict:
+    """
+    Жадное сопоставление детекций кандидата с эталонными (тот же класс, IoU >= порога).
+
+    Детекции - {"boxes": [[x1, y1, x2, y2], ...], "classes": [...], "confs": [...]}.
+    """
+    base_boxes = np.asarray(baseline["boxes"], dtype=np.float64).reshape(-1, 4)
+    cand_boxes = np.asarray(candidate["boxes"], dtype=np.float64).reshape(-1, 4)
+    used = np.zeros(len(cand_boxes), dtype=bool)
+    matched, ious, conf_deltas = 0, [], []
+
+    for i in np.argsort(baseline["confs"])[::-1] if len(base_boxes) else []:
+        if not len(cand_boxes):
+            break
+        iou = _box_iou(base_boxes[i], cand_boxes)
+        iou[used | (np.asarray(candidate["classes"]) != baseline["classes"][i])] = -1
+        j = int(np.argmax(iou))
+        if iou[j] >= iou_threshold:
+            used[j] = True
+            matched += 1
+            ious.append(float(iou[j]))
+            conf_deltas.append(abs(candidate["confs"][j] - baseline["confs"][i]))
+
+    return {
+        "baseline": len(base_boxes),
+        "candidate": len(cand_boxes),
+        "matched": matched,
+        "ious": ious,
+        "conf_deltas": conf_deltas,
+    }
+
+
+def accuracy_delta(baseline: List[dict], candidate: List[dict]) -> dict:
+    """Расхождение предсказаний бэкенда с эталоном по всему корпусу"""
+    if "score" in baseline[0]:
+        deltas = [abs(c["score"] - b["score"]) for b, c in zip(baseline, candidate)]
+        flips = sum(c["verdict"] != b["verdict"] for b, c in zip(baseline, candidate))
+        return {
+            "score_delta_mean": round(float(np.mean(deltas)), 6),
+            "score_delta_max": round(float(np.max(deltas)), 6),
+            "verdict_flips": int(flips),
+        }
+
+    totals = {"baseline": 0, "candidate": 0, "matched": 0, "ious": [], "conf_deltas": []}
+    for b, c in zip(baseline, candidate):
+        for key, value in match_detections(b, c).items():
+            totals[key] += value
+    return {
+        "recall": round(totals["matched"] / totals["baseline"], 4) if totals["baseline"] else 1.0,
+        "precision": round(totals["matched"] / totals["candidate"], 4) if totals["candidate"] else 1.0,
+        "mean_iou": round(float(np.mean(totals["ious"])), 4) if totals["ious"] else None,
+        "conf_delta_mean": round(float(np.mean(totals["conf_deltas"])), 6) if totals["conf_deltas"] else None,
+    }
+
+
+def _segment_outputs(results) -> List[dict]:
+    outputs = []
+    for r in results:
+        boxes = r.boxes
+        outputs.append({
+            "boxes": boxes.xyxy.cpu().numpy().tolist() if boxes is not None else [],
+            "classes": boxes.cls.cpu().numpy().astype(int).tolist() if boxes is not None else [],
+            "confs": boxes.conf.cpu().numpy().tolist() if boxes is not None else [],
+        })
+    return outputs
+
+
+def run_config(config: dict) -> dict:
+    """Прогон одной конфигурации; выполняется в отдельном процессе"""
+    import cv2
+    from app.ml.predict_yolo_seg_prod import SegmentModel, OverlapClassifier
+
+    result = {**config, "backend": None, "error": None}
+    try:
+        images = [cv2.imread(str(path)) for path in config["images"]]
+        batch_size = config["batch_size"]
+        batches = [images[i:i + batch_size] for i in range(0, len(images), batch_size)]
+
+        start = time.perf_counter()
+        if config["model"] == "segment":
+            model = SegmentModel(
+                model_path=config["model_path"], conf_threshold=config["conf"],
+                imgsz=config["imgsz"], prefer=config["prefer"], verbose=False,
+            )
+            result["backend"] = model.backend
+            infer = lambda batch: _segment_outputs(model.predict_images(batch, batch=len(batch)))
+        else:
+            model = OverlapClassifier(model_path=config["model_path"], imgsz=config["imgsz"])
+            result["backend"] = "torch"
+            infer = lambda batch: [
+                {"verdict": bool(verdict), "score": score} for verdict, score, _ in model.predict_many(batch)
+            ]
+        result["load_seconds"] = round(time.perf_counter() - start, 3)
+
+        for _ in range(config["warmup"]):
+            infer(batches[0])
+
+        latencies, outputs = [], []
+        start = time.perf_counter()
+        for repeat in range(config["repeats"]):
+            for batch in batches:
+                batch_start = time.perf_counter()
+                batch_outputs = infer(batch)
+                latencies.append((time.perf_counter() - batch_start) * 1000)
+                if repeat == 0:
+                    outputs.extend(batch_outputs)
+        elapsed = time.perf_counter() - start
+
+        result["throughput_ips"] = round(len(images) * config["repeats"] / elapsed, 3)
+        result["latency_ms"] = latency_summary(latencies)
+        result["latency_per_image_ms"] = round(elapsed * 1000 / (len(images) * config["repeats"]), 3)
+        result["outputs"] = outputs
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def stage_weights(model_path: Path, export_dir: Path) -> Path:
+    """
+    Копия весов .pt в export_dir: SegmentModel экспортирует ONNX/OpenVINO рядом с весами,
+    поэтому экспорты бенчмарка остаются в export_dir. Готовые .onnx/OpenVINO не копируются.
+    """
+    if model_path.suffix != ".pt":
+        return model_path
+    export_dir.mkdir(parents=True, exist_ok=True)
+    staged = export_dir / model_path.name
+    if not staged.exists():
+        shutil.copy2(model_path, staged)
+    return staged
+
+
+def build_configs(args) -> List[dict]:
+    images = [str(path) for path in collect_images(args.images, args.limit)]
+    if not images:
+        raise SystemExit(f"Нет изображений в {args.images}")
+    common = {"images": images, "warmup": args.warmup, "repeats": args.repeats, "conf": args.conf}
+    configs = []
+    for imgsz in args.imgsz:
+        for batch_size in args.batch_sizes:
+            # Эталон идет первым, чтобы расхождения остальных бэкендов считались относительно него
+            backends = [BASELINE_BACKEND] + [b for b in args.backends if b != BASELINE_BACKEND]
+            for prefer in backends:
+                configs.append({**common, "model": "segment", "model_path": str(args.segment_model),
+                                "prefer": prefer, "imgsz": imgsz, "batch_size": batch_size})
+            if not args.skip_overlap:
+                configs.append({**common, "model": "overlap", "model_path": str(args.overlap_model),
+                                "prefer": BASELINE_BACKEND, "imgsz": imgsz, "batch_size": batch_size})
+    return configs
+
+
+def run_benchmark(configs: List[dict]) -> List[dict]:
+    results = []
+    baselines = {}
+    for config in configs:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+            result = executor.submit(run_config, config).result()
+
+        outputs = result.pop("outputs", None)
+        result.pop("images")
+        key = (result["model"], result["imgsz"], result["batch_size"])
+        if result["prefer"] == BASELINE_BACKEND:
+            if outputs is not None:
+                baselines[key] = outputs
+        elif outputs is not None and key in baselines:
+            result["accuracy"] = accuracy_delta(baselines[key], outputs)
+
+        status = result["error"] or f"{result['throughput_ips']} img/s, p95 {result['latency_ms']['p95']} ms"
+        print(f"[{result['model']} {result['prefer']}->{result['backend']} imgsz={result['imgsz']} "
+              f"batch={result['batch_size']}] {status}", file=sys.stderr)
+        results.append(result)
+    return results
+
+
+def environment() -> dict:
+    import torch
+    import ultralytics
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+        "ultralytics": ultralytics.__version__,
+        "cuda": torch.cuda.is_available(),
+    }
+
+
+def config_key(result: dict) -> tuple:
+    return result["model"], result["prefer"], result["imgsz"], result["batch_size"]
+
+
+def compare_with_baseline(results: List[dict], baseline: List[dict], tolerance: float) -> List[dict]:
+    """Конфигурации, у которых пропускная способность упала больше чем на tolerance (доля)"""
+    previous = {config_key(r): r for r in baseline if not r.get("error")}
+    regressions = []
+    for result in results:
+        before = previous.get(config_key(result))
+        if before is None or result.get("error"):
+            continue
+        change = result["throughput_ips"] / before["throughput_ips"] - 1
+        if change < -tolerance:
+            regressions.append({
+                "model": result["model"], "prefer": result["prefer"],
+                "imgsz": result["imgsz"], "batch_size": result["batch_size"],
+                "throughput_before": before["throughput_ips"], "throughput_after": result["throughput_ips"],
+                "change": round(change, 4),
+            })
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк инференса SegmentModel/OverlapClassifier")
+    parser.add_argument("--images", type=Path, default=SCRIPT_DIR / "img", help="Каталог с корпусом изображений")
+    parser.add_argument("--limit", type=int, default=None, help="Взять первые N изображений корпуса")
+    parser.add_argument("--segment-model", type=Path, default=SCRIPT_DIR / "weights/yolo11s-seg-tools.pt")
+    parser.add_argument("--overlap-model", type=Path, default=SCRIPT_DIR / "weights/yolo11s-classify-overlap.pt")
+    parser.add_argument(
+        "--export-dir", type=Path, default=None,
+        help="Каталог для экспортов ONNX/OpenVINO (по умолчанию временный, удаляется после запуска)"
+    )
+    parser.add_argument("--skip-overlap", action="store_true", help="Не измерять OverlapClassifier")
+    parser.add_argument("--backends", nargs="+", default=["torch", "openvino", "onnx-cpu"], choices=SEGMENT_BACKENDS)
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1])
+    parser.add_argument("--imgsz", nargs="+", type=int, default=[640])
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--warmup", type=int, default=2, help="Прогревочные батчи (не учитываются)")
+    parser.add_argument("--repeats", type=int, default=3, help="Проходы по корпусу")
+    parser.add_argument("--output", type=Path, default=None, help="Файл для JSON-отчета (по умолчанию stdout)")
+    parser.add_argument("--baseline", type=Path, default=None, help="Предыдущий JSON-отчет для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Допустимое падение пропускной способности")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        args.segment_model = stage_weights(args.segment_model, args.export_dir or Path(tmp_dir))
+        configs = build_configs(args)
+        report = {
+            "environment": environment(),
+            "corpus": {"path": str(args.images), "images": len(configs[0]["images"])},
+            "results": run_benchmark(configs),
+        }
+
+    exit_code = 0
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        report["regressions"] = compare_with_baseline(report["results"], baseline["results"], args.tolerance)
+        exit_code = 1 if report["regressions"] else 0
+
+    payload = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output is not None:
+        args.output.write_text(payload, encoding="utf-8")
+    else:
+        print(payload)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
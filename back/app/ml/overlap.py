@@ -0,0 +1,253 @@
+"""
+Геометрическая оценка перекрытия инструментов по результатам сегментации.
+
+Для всех пар инстансов кадра одновременно (numpy, без циклов по парам) считаются матрицы (N, N):
+  - пересечения OBB (повернутых прямоугольников) - по формуле Грина: сумма частей границы
+    каждого OBB, лежащих внутри другого; ловит и перекрытие, при котором маска нижнего
+    инструмента разрезана верхним;
+  - пересечения масок, уменьшенных до сетки MASK_GRID и упакованных в биты (uint64):
+    площадь пересечения - число единичных бит в AND пары.
+Из них получаются IoU и доля пересечения от площади меньшего инстанса (overlap): мелкий
+инструмент, лежащий на крупном, дает малый IoU при полном перекрытии.
+
+OverlapCascade по этим оценкам решает, нужен ли классификатор перекрытия: если OBB не пересекаются,
+перекрытия нет; если маски пересекаются существенно - оно есть; иначе решает классификатор.
+При 0-1 инстансе геометрии недостаточно (перекрывающиеся инструменты могут сегментироваться
+одной маской) - тоже решает классификатор.
+"""
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Длинная сторона сетки, до которой уменьшаются маски перед упаковкой в биты
+MASK_GRID = 96
+
+# Индекс следующей вершины четырехугольника (np.roll на малых массивах заметно медленнее)
+_NEXT_VERTEX = np.array([1, 2, 3, 0])
+
+if hasattr(np, "bitwise_count"):
+    def _popcount(words: np.ndarray) -> np.ndarray:
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+else:
+    _POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(words: np.ndarray) -> np.ndarray:
+        return _POPCOUNT_TABLE[words.view(np.uint8)].sum(axis=-1, dtype=np.int64)
+
+
+def obb_polygons(obb_rows: Sequence[Sequence[float]], image_hw: Tuple[int, int]) -> np.ndarray:
+    """Строки [class, x1, y1, ..., x4, y4] в нормированных координатах -> (N, 4, 2) в пикселях"""
+    if not len(obb_rows):
+        return np.zeros((0, 4, 2), dtype=np.float64)
+    h, w = image_hw
+    points = np.asarray(obb_rows, dtype=np.float64)[:, 1:9].reshape(-1, 4, 2)
+    return points * np.array([w, h], dtype=np.float64)
+
+
+def _signed_area(points: np.ndarray) -> np.ndarray:
+    """Ориентированные площади четырехугольников (P, 4, 2): > 0 - обход против часовой стрелки"""
+    following = points[:, _NEXT_VERTEX]
+    return 0.5 * (points[..., 0] * following[..., 1] - following[..., 0] * points[..., 1]).sum(axis=1)
+
+
+def _boundary_inside(points: np.ndarray, clip: np.ndarray, strict: bool) -> np.ndarray:
+    """
+    Вклад частей ребер points, лежащих внутри clip, в удвоенную площадь пересечения (формула Грина).
+
+    Ребро p(t) = p_k + t * d_k лежит внутри полуплоскости ребра j многоугольника clip при
+    c0 + t * c1 >= 0 - пересечение ограничений по всем ребрам clip дает отрезок [t0, t1].
+    Общие участки границ учитываются один раз: при strict=False - только сонаправленные ребра,
+    при strict=True - ни одно.
+    """
+    direction = points[:, _NEXT_VERTEX] - points
+    edge = clip[:, _NEXT_VERTEX] - clip
+    rel = points[:, :, None, :] - clip[:, None, :, :]
+    ex, ey = edge[:, None, :, 0], edge[:, None, :, 1]
+    c0 = ex * rel[..., 1] - ey * rel[..., 0]
+    c1 = ex * direction[:, :, None, 1] - ey * direction[:, :, None, 0]
+    ratio = -c0 / np.where(c1 == 0, 1.0, c1)
+    t0 = np.where(c1 > 0, ratio, 0.0).max(axis=2).clip(0.0)
+    t1 = np.where(c1 < 0, ratio, 1.0).min(axis=2).clip(max=1.0)
+    if strict:
+        outside = c0 <= 0
+    else:
+        along = direction[:, :, None, 0] * ex + direction[:, :, None, 1] * ey > 0
+        outside = (c0 < 0) | ((c0 == 0) & ~along)
+    blocked = ((c1 == 0) & outside).any(axis=2)
+    start = points + t0[..., None] * direction
+    end = points + t1[..., None] * direction
+    cross = start[..., 0] * end[..., 1] - end[..., 0] * start[..., 1]
+    return np.where((t1 > t0) & ~blocked, cross, 0.0).sum(axis=1)
+
+
+def _intersection_area(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """Площади пересечения выпуклых четырехугольников first[p] и second[p], обход против часовой стрелки"""
+    return 0.5 * (_boundary_inside(first, second, strict=False) + _boundary_inside(second, first, strict=True))
+
+
+def _touching_pairs(lo: np.ndarray, hi: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Пары i < j, у которых пересекаются осевые рамки [lo, hi]"""
+    first, second = np.triu_indices(len(lo), 1)
+    touching = ((lo[first] <= hi[second]) & (lo[second] <= hi[first])).all(axis=1)
+    return first[touching], second[touching]
+
+
+def obb_intersections(polygons: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Матрица (N, N) площадей пересечения OBB и площади OBB (N,)"""
+    signed = _signed_area(polygons)
+    areas = np.abs(signed)
+    inter = np.diag(areas)
+    n = len(polygons)
+    if n < 2:
+        return inter, areas
+    polygons = np.where((signed < 0)[:, None, None], polygons[:, ::-1], polygons)
+
+    # Площадь считается только для пар с пересекающимися осевыми рамками
+    first, second = _touching_pairs(polygons.min(axis=1), polygons.max(axis=1))
+    if len(first):
+        inter[first, second] = inter[second, first] = _intersection_area(polygons[first], polygons[second])
+    return inter, areas
+
+
+def _bit_range(words: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Номера первого и последнего единичного бита в строках (N, K) uint64 (старший бит - первый)"""
+    bits = np.unpackbits(words.astype(">u8").view(np.uint8).reshape(len(words), -1), axis=1)
+    return bits.argmax(axis=1), bits.shape[1] - 1 - bits[:, ::-1].argmax(axis=1)
+
+
+def pack_masks(masks, grid: int = MASK_GRID) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Маски ultralytics (тензор или массив (N, H, W)) -> маски на сетке с длинной стороной не больше
+    grid, упакованные в биты (N, W64) uint64, и их рамки (N, 4): x1, y1, x2, y2 в ячейках сетки.
+
+    Прореживание идет до копирования с GPU. Строка сетки дополняется до целого числа слов uint64,
+    поэтому рамки считаются по словам, а не по отдельным ячейкам.
+    """
+    step = max(1, -(-max(masks.shape[1:]) // grid))
+    sampled = masks[:, ::step, ::step] > 0.5
+    if hasattr(sampled, "cpu"):
+        sampled = sampled.cpu().numpy()
+    sampled = np.asarray(sampled)
+    n, height, width = sampled.shape
+    packed = np.zeros((n, height, -(-width // 64) * 8), dtype=np.uint8)
+    packed[..., :-(-width // 8)] = np.packbits(sampled, axis=2)
+    words = packed.view(">u8").astype(np.uint64)
+
+    rows = np.bitwise_or.reduce(words, axis=2) != 0
+    x1, x2 = _bit_range(np.bitwise_or.reduce(words, axis=1))
+    y1, y2 = rows.argmax(axis=1), height - 1 - rows[:, ::-1].argmax(axis=1)
+    return words.reshape(n, -1), np.stack([x1, y1, x2, y2], axis=1)
+
+
+def mask_intersections(packed: np.ndarray, boxes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Матрица (N, N) площадей пересечения упакованных масок и площади масок (N,), в ячейках сетки"""
+    areas = _popcount(packed)
+    inter = np.diag(areas)
+    # Маски с непересекающимися рамками не пересекаются - биты сравниваются только для остальных пар
+    first, second = _touching_pairs(boxes[:, :2], boxes[:, 2:])
+    if len(first):
+        inter[first, second] = inter[second, first] = _popcount(packed[first] & packed[second])
+    return inter, areas
+
+
+def _iou(inter: np.ndarray, areas: np.ndarray) -> np.ndarray:
+    union = areas[:, None] + areas[None, :] - inter
+    return np.divide(inter, union, out=np.zeros(inter.shape), where=union > 0)
+
+
+def _of_smaller(inter: np.ndarray, areas: np.ndarray) -> np.ndarray:
+    smaller = np.minimum(areas[:, None], areas[None, :])
+    return np.divide(inter, smaller, out=np.zeros(inter.shape), where=smaller > 0)
+
+
+class PairwiseOverlap:
+    """Попарное перекрытие инстансов кадра: матрицы (N, N) IoU и overlap по OBB и маскам"""
+
+    def __init__(self, obb_inter: np.ndarray, obb_areas: np.ndarray,
+                 mask_inter: Optional[np.ndarray] = None, mask_areas: Optional[np.ndarray] = None):
+        self.obb_iou = _iou(obb_inter, obb_areas)
+        self.obb_overlap = _of_smaller(obb_inter, obb_areas)
+        self.mask_iou = _iou(mask_inter, mask_areas) if mask_inter is not None else None
+        self.mask_overlap = _of_smaller(mask_inter, mask_areas) if mask_inter is not None else None
+
+        self._upper = np.triu_indices(len(self.obb_iou), 1)
+
+    def __len__(self):
+        return len(self.obb_iou)
+
+    def _max_off_diagonal(self, matrix: Optional[np.ndarray]) -> float:
+        if matrix is None or len(matrix) < 2:
+            return 0.0
+        return float(matrix[self._upper].max())
+
+    @property
+    def max_obb_overlap(self) -> float:
+        return self._max_off_diagonal(self.obb_overlap)
+
+    @property
+    def max_mask_overlap(self) -> float:
+        return self._max_off_diagonal(self.mask_overlap)
+
+    def pairs(self) -> List[dict]:
+        """Пересекающиеся пары (i < j - индексы в obb_rows) для ответа API"""
+        if len(self) < 2:
+            return []
+        first, second = self._upper
+        touching = self.obb_iou[first, second] > 0
+        if self.mask_iou is not None:
+            touching |= self.mask_iou[first, second] > 0
+        result = []
+        for i, j in zip(first[touching].tolist(), second[touching].tolist()):
+            pair = {"pair": [i, j], "obb_iou": round(float(self.obb_iou[i, j]), 4),
+                    "obb_overlap": round(float(self.obb_overlap[i, j]), 4)}
+            if self.mask_iou is not None:
+                pair["mask_iou"] = round(float(self.mask_iou[i, j]), 4)
+                pair["mask_overlap"] = round(float(self.mask_overlap[i, j]), 4)
+            result.append(pair)
+        return result
+
+
+def pairwise_overlap(obb_rows, masks, image_hw: Tuple[int, int],
+                     mask_indices: Optional[Sequence[int]] = None) -> PairwiseOverlap:
+    """
+    Попарное перекрытие инстансов: masks (или None) - маски ultralytics, mask_indices - номера
+    масок для строк obb_rows (по умолчанию по порядку).
+    """
+    obb_inter, obb_areas = obb_intersections(obb_polygons(obb_rows, image_hw))
+    if masks is None or not len(obb_rows):
+        return PairwiseOverlap(obb_inter, obb_areas)
+    packed, boxes = pack_masks(masks)
+    if mask_indices is not None:
+        packed, boxes = packed[list(mask_indices)], boxes[list(mask_indices)]
+    if len(packed) != len(obb_rows):
+        return PairwiseOverlap(obb_inter, obb_areas)
+    mask_inter, mask_areas = mask_intersections(packed, boxes)
+    return PairwiseOverlap(obb_inter, obb_areas, mask_inter, mask_areas)
+
+
+class OverlapCascade:
+    """
+    Вердикт перекрытия по геометрии или None, если нужен классификатор.
+
+    - **clean_max**: перекрытие OBB не больше порога - инструменты лежат раздельно
+    - **mask_min**: перекрытие масок от порога - инструменты точно перекрываются
+    """
+
+    def __init__(self, enabled: bool = True, clean_max: float = 0.02, mask_min: float = 0.3):
+        self.enabled = enabled
+        self.clean_max = clean_max
+        self.mask_min = mask_min
+
+    def decide(self, overlap: PairwiseOverlap) -> Tuple[Optional[bool], float]:
+        """(вердикт, оценка): вердикт None - геометрия неоднозначна"""
+        if not self.enabled:
+            return None, 0.0
+        if len(overlap) < 2:
+            # Два перекрывающихся инструмента могли слиться в один инстанс - по парам это не видно
+            return None, 0.0
+        obb_score, mask_score = overlap.max_obb_overlap, overlap.max_mask_overlap
+        if obb_score <= self.clean_max:
+            return False, obb_score
+        if mask_score >= self.mask_min:
+            return True, mask_score
+        return None, max(obb_score, mask_score)
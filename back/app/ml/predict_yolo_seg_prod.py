@@ -1,5 +1,9 @@
 import re
 import gc
+import time
+import shutil
+import tempfile
+import threading
 import warnings
 from pathlib import Path
 import os
@@ -11,6 +15,17 @@ from paddleocr import PaddleOCR
 import cv2
 import numpy as np
 
+from app.config import (
+    INFERENCE_STUB_MS, INFERENCE_TILE_SIZE, INFERENCE_TILE_OVERLAP, INFERENCE_TILE_BATCH,
+    INFERENCE_TILE_MERGE_IOU, INFERENCE_TILE_FULL_IMAGE, INFERENCE_IMGSZ, INFERENCE_IMGSZ_OPTIONS,
+    OVERLAP_CASCADE_ENABLED, OVERLAP_CLEAN_MAX, OVERLAP_MASK_MIN, ML_WARMUP_RETRY_SECONDS,
+)
+from app.metrics import INFERENCE_MODEL_LOADS, OVERLAP_CASCADE_DECISIONS
+from app.tracing import span, record_span
+from app.ml.tiling import tiled_predict
+from app.ml.resolution import ResolutionPolicy
+from app.ml.overlap import OverlapCascade, pairwise_overlap
+
 RU_NAME_BY_EN = {
     "bokorezy": "Бокорезы",
     "key_rozgkovy_nakidnoy_3_4": "Ключ рожковый/накидной 3/4",
@@ -40,6 +55,14 @@ def _onnx_gpu_available():
         return False
 
 
+def _onnx_available():
+    try:
+        import onnxruntime  # noqa: F401
+        return True
+    except Exception:
+        return False
+
+
 def _openvino_available():
     try:
         import openvino.runtime as ov  # noqa: F401
@@ -52,6 +75,7 @@ class SegmentModel:
     """
     Автовыбор бэкенда:
       - onnx-gpu  -> ONNX Runtime (GPU, если есть CUDA и установлен onnxruntime-gpu)
+      - onnx-cpu  -> ONNX Runtime (CPU), только явным prefer (для сравнения бэкендов)
       - openvino  -> OpenVINO (CPU)
       - torch     -> PyTorch (CUDA/CPU) фолбэк
     Автоматически экспортирует .pt в .onnx и/или OpenVINO, если нужных файлов нет.
@@ -62,34 +86,56 @@ class SegmentModel:
         model_path="ml/weights/yolo11s-seg-tools.pt",
         conf_threshold=0.5,
         imgsz=640,
-        prefer="auto",  # "auto" | "onnx-gpu" | "openvino" | "torch"
+        prefer="auto",  # "auto" | "onnx-gpu" | "onnx-cpu" | "openvino" | "torch"
         verbose=True,
+        imgsz_options=None,  # дополнительные размеры входа, см. app.ml.resolution
     ):
         self.model_path = Path(model_path)
         self.imgsz = imgsz
         self.conf_threshold = conf_threshold
         self.prefer = prefer
         self.verbose = verbose
+        # Готовый .onnx/OpenVINO экспортирован под один размер, несколько размеров - только из .pt
+        if self.model_path.suffix != ".pt":
+            imgsz_options = None
+        self.resolution = ResolutionPolicy(imgsz_options or [], imgsz)
+        self.imgsz_options = self.resolution.sizes
 
-        self.backend = None      # "onnx-gpu" | "openvino" | "torch"
+        self.backend = None      # "onnx-gpu" | "onnx-cpu" | "openvino" | "torch"
         self.device_arg = None  
         self.model = None
+        self.models = {}         # imgsz -> YOLO; для torch все размеры используют одну модель
         self.r = None
+        self.obb_instance_indices = []  # индексы инстансов self.r для строк get_oriented_bboxes
 
-        self._select_and_load_model()
+        with span("model_load"):
+            self._select_and_load_model()
+        INFERENCE_MODEL_LOADS.inc(model="segment", backend=self.backend)
 
     # --------- Paths for exported models ---------
 
     @property
     def onnx_path(self) -> Path:
-        if self.model_path.suffix == ".pt":
-            return self.model_path.with_suffix(".onnx")
-        return self.model_path  
+        return self.onnx_path_for(self.imgsz)
 
     @property
     def openvino_dir(self) -> Path:
-        stem = self.model_path.stem if self.model_path.suffix else self.model_path.name
-        return self.model_path.with_name(f"{stem}_openvino_model")
+        return self.openvino_dir_for(self.imgsz)
+
+    # Экспорт статический (dynamic=False), поэтому размер входа входит в имя каждого экспорта:
+    # после смены INFERENCE_IMGSZ или прогона бенчмарка с другим --imgsz не загрузится экспорт
+    # под другой размер. Готовый .onnx/OpenVINO (не .pt) используется как есть.
+
+    def onnx_path_for(self, imgsz) -> Path:
+        if self.model_path.suffix != ".pt":
+            return self.model_path
+        return self.model_path.with_name(f"{self.model_path.stem}_{imgsz}.onnx")
+
+    def openvino_dir_for(self, imgsz) -> Path:
+        if self.model_path.suffix != ".pt":
+            stem = self.model_path.stem if self.model_path.suffix else self.model_path.name
+            return self.model_path.with_name(f"{stem}_openvino_model")
+        return self.model_path.with_name(f"{self.model_path.stem}_{imgsz}_openvino_model")
 
     # --------- Backend selection ---------
 
@@ -97,6 +143,8 @@ class SegmentModel:
         if self.prefer != "auto":
             if self.prefer == "onnx-gpu":
                 return "onnx-gpu" if _onnx_gpu_available() else "torch"
+            if self.prefer == "onnx-cpu":
+                return "onnx-cpu" if _onnx_available() else "torch"
             if self.prefer == "openvino":
                 return "openvino" if _openvino_available() else "torch"
             return "torch"
@@ -107,37 +155,35 @@ class SegmentModel:
             return "openvino"
         return "torch"
 
+    def _export(self, fmt, imgsz, target: Path, **kwargs):
+        """
+        Экспорт .pt под размер imgsz в target.
 
-    def _ensure_onnx(self):
-        if self.onnx_path.exists():
-            return
+        ultralytics пишет результат рядом с весами под фиксированным именем, поэтому экспорт
+        идет из копии весов во временном каталоге - иначе размеры перезаписывали бы друг друга.
+        """
         if self.verbose:
-            print("Экспорт в ONNX…")
-        base_model = YOLO(str(self.model_path))
-        onnx_fp16 = torch.cuda.is_available() 
-        exported = base_model.export(
-            format="onnx",
-            half=onnx_fp16,
-            dynamic=False,
-        )
+            print(f"Экспорт в {fmt} (imgsz={imgsz})…")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            weights = Path(tmp_dir) / self.model_path.name
+            shutil.copy2(self.model_path, weights)
+            exported = YOLO(str(weights)).export(format=fmt, imgsz=imgsz, dynamic=False, **kwargs)
+            shutil.move(str(exported), str(target))
         if self.verbose:
-            print(f"ONNX экспортирован: {exported}")
+            print(f"{fmt} экспортирован: {target}")
         free_memory()
 
-    def _ensure_openvino(self):
-        if self.openvino_dir.exists():
+    def _ensure_onnx(self, imgsz=None):
+        imgsz = imgsz or self.imgsz
+        if self.onnx_path_for(imgsz).exists():
             return
-        if self.verbose:
-            print("Экспорт в OpenVINO…")
-        base_model = YOLO(str(self.model_path))
-        exported = base_model.export(
-            format="openvino",
-            half=False,  
-            dynamic=False,
-        )
-        if self.verbose:
-            print(f"OpenVINO экспортирован: {exported}")
-        free_memory()
+        self._export("onnx", imgsz, self.onnx_path_for(imgsz), half=torch.cuda.is_available())
+
+    def _ensure_openvino(self, imgsz=None):
+        imgsz = imgsz or self.imgsz
+        if self.openvino_dir_for(imgsz).exists():
+            return
+        self._export("openvino", imgsz, self.openvino_dir_for(imgsz), half=False)
 
 
     def _select_and_load_model(self):
@@ -146,35 +192,41 @@ class SegmentModel:
 
         backend = self._decide_backend()
 
-        if backend == "onnx-gpu":
+        if backend in ("onnx-gpu", "onnx-cpu"):
             try:
-                self._ensure_onnx()
+                for size in self.imgsz_options:
+                    self._ensure_onnx(size)
             except Exception as e:
                 warnings.warn(f"Не удалось экспортировать в ONNX, откат к PyTorch. Причина: {e}")
                 backend = "torch"
             else:
-                self.model = YOLO(str(self.onnx_path))
-                self.device_arg = 0 
-                self.backend = "onnx-gpu"
+                self.models = {size: YOLO(str(self.onnx_path_for(size))) for size in self.imgsz_options}
+                self.model = self.models[self.imgsz]
+                self.device_arg = 0 if backend == "onnx-gpu" else "cpu"
+                self.backend = backend
                 if self.verbose:
-                    print(f"Модель загружена (ONNX Runtime GPU): {self.onnx_path}")
+                    device = "GPU" if backend == "onnx-gpu" else "CPU"
+                    print(f"Модель загружена (ONNX Runtime {device}, imgsz {self.imgsz_options}): {self.onnx_path}")
                 return
 
         if backend == "openvino":
             try:
-                self._ensure_openvino()
+                for size in self.imgsz_options:
+                    self._ensure_openvino(size)
             except Exception as e:
                 warnings.warn(f"Не удалось экспортировать в OpenVINO, откат к PyTorch. Причина: {e}")
                 backend = "torch"
             else:
-                self.model = YOLO(str(self.openvino_dir))
+                self.models = {size: YOLO(str(self.openvino_dir_for(size))) for size in self.imgsz_options}
+                self.model = self.models[self.imgsz]
                 self.device_arg = "CPU"
                 self.backend = "openvino"
                 if self.verbose:
-                    print(f"Модель загружена (OpenVINO CPU): {self.openvino_dir}")
+                    print(f"Модель загружена (OpenVINO CPU, imgsz {self.imgsz_options}): {self.openvino_dir}")
                 return
 
         self.model = YOLO(str(self.model_path))
+        self.models = {size: self.model for size in self.imgsz_options}
         self.backend = "torch"
         self.device_arg = 0 if torch.cuda.is_available() else "cpu"
         if self.verbose:
@@ -184,26 +236,88 @@ class SegmentModel:
     # --------- Public API ---------
 
     def export_to_onnx(self):
-        self._ensure_onnx()
+        for size in self.imgsz_options:
+            self._ensure_onnx(size)
 
     def export_to_openvino(self):
-        self._ensure_openvino()
+        for size in self.imgsz_options:
+            self._ensure_openvino(size)
 
-    def predict_image(self, img_path):
+    def _predict(self, source, batch=1, imgsz=None):
+        imgsz = imgsz or self.imgsz
+        if imgsz not in self.models:
+            raise ValueError(f"Размер входа {imgsz} не загружен, доступно: {self.imgsz_options}")
         half_flag = True if (self.backend == "torch" and torch.cuda.is_available()) else False
 
-        results_list = self.model.predict(
-            source=str(img_path),
-            imgsz=self.imgsz,
+        results = self.models[imgsz].predict(
+            source=source,
+            imgsz=imgsz,
             conf=self.conf_threshold,
             device=self.device_arg,
             workers=0,
-            batch=1,
+            batch=batch,
             half=half_flag,
             verbose=False,
             save=False
         )
+        if len(results) == 1:
+            speed = results[0].speed or {}
+            self.resolution.observe(imgsz, sum(value for value in speed.values() if value is not None))
+        return results
+
+    def predict_image(self, img_path, imgsz=None):
+        results_list = self._predict(img_path if isinstance(img_path, np.ndarray) else str(img_path), imgsz=imgsz)
         self.r = results_list[0]
+        self._record_speed_spans()
+
+    def predict_image_tiled(
+        self,
+        img_path,
+        tile_size=INFERENCE_TILE_SIZE,
+        overlap=INFERENCE_TILE_OVERLAP,
+        batch=INFERENCE_TILE_BATCH,
+        include_full_image=INFERENCE_TILE_FULL_IMAGE,
+        merge_iou=INFERENCE_TILE_MERGE_IOU,
+    ):
+        """
+        Тайловый инференс для фото высокого разрешения (см. app.ml.tiling).
+
+        self.r - объединенный результат для всего изображения, остальные методы работают как после predict_image.
+        """
+        image = img_path if isinstance(img_path, np.ndarray) else cv2.imread(str(img_path))
+        if image is None:
+            raise FileNotFoundError(f"Не удалось прочитать изображение: {img_path}")
+        self.r = tiled_predict(
+            self, image, tile_size=tile_size, overlap=overlap, batch=batch,
+            include_full_image=include_full_image, merge_iou=merge_iou,
+        )
+        self._record_speed_spans()
+
+    def predict_images(self, images, batch=None):
+        """
+        Предсказание для списка изображений (пути или BGR-массивы) одним вызовом predict.
+
+        Возвращает список результатов ultralytics; self.r - результат последнего изображения.
+        """
+        images = [img if isinstance(img, np.ndarray) else str(img) for img in images]
+        results_list = self._predict(images, batch=batch or len(images))
+        self.r = results_list[-1]
+        return results_list
+
+    def _record_speed_spans(self):
+        """
+        Этапы внутри predict по замерам ultralytics (r.speed, мс): letterbox, forward, mask_postprocess.
+
+        Спаны выстраиваются подряд и заканчиваются в момент возврата predict; оставшееся
+        время спана segment - чтение и декодирование изображения.
+        """
+        speed = getattr(self.r, "speed", None) or {}
+        stages = (("letterbox", "preprocess"), ("forward", "inference"), ("mask_postprocess", "postprocess"))
+        durations = [(stage, speed[key] / 1000) for stage, key in stages if speed.get(key) is not None]
+        start = time.perf_counter() - sum(duration for _, duration in durations)
+        for stage, duration in durations:
+            record_span(stage, start, duration)
+            start += duration
 
     def get_probs(self):
         return getattr(self.r.boxes, "conf", None)
@@ -221,7 +335,9 @@ class SegmentModel:
             Координаты по умолчанию в пикселях. Если normalized=True, то в [0,1].
 
             Требует, чтобы self.r был заполнен (после predict_image).
+            Инстансы без полигона пропускаются, индексы остальных - в self.obb_instance_indices.
             """
+            self.obb_instance_indices = []
             if self.r is None or getattr(self.r, "masks", None) is None:
                 return []
 
@@ -258,6 +374,7 @@ class SegmentModel:
 
                 row = [cls_ids[i]] + coords
                 obb_rows.append(row)
+                self.obb_instance_indices.append(i)
 
             return obb_rows
 
@@ -627,96 +744,140 @@ class SegmentModel:
         hsv[0, 0] = (h, s, v)
         out = cv2.cvtColor(hsv.astype(np.uint8), cv2.COLOR_HSV2BGR)[0, 0]
         return (int(out[0]), int(out[1]), int(out[2]))
-def get_prediction_results(model, img_path):
-    script_dir = Path(__file__).parent.absolute()
-    model_path = script_dir / "weights/yolo11s-classify-overlap.pt"
-    overlap_model = OverlapClassifier(
-        model_path=model_path, 
-        positive_label="overlap",
-        threshold=0.5, 
-        imgsz=640,
-        device=0 if torch.cuda.is_available() else "cpu",
-        verbose=False
-    )
+overlap_cascade = OverlapCascade(enabled=OVERLAP_CASCADE_ENABLED, clean_max=OVERLAP_CLEAN_MAX, mask_min=OVERLAP_MASK_MIN)
 
-    model.predict_image(img_path)
-    # OBB в формате [class_index, x1, y1, x2, y2, x3, y3, x4, y4]
-    obb_rows = model.get_oriented_bboxes(normalized=True)
-    classes = [obb[0] for obb in obb_rows]
-    masks = model.get_masks()
 
-    overlap_flag, overlap_score = None, None
-    if overlap_model is not None:
+def predict_overlap(model, overlap_model, img_path, obb_rows):
+    """
+    Перекрытие инструментов для последнего predict модели сегментации: (вердикт, оценка, пары).
+
+    Попарное перекрытие инстансов считается по OBB и маскам (app.ml.overlap), пары - пересекающиеся
+    инстансы с индексами в obb_rows. Классификатор запускается, только если геометрия неоднозначна;
+    при вердикте по геометрии overlap_score - геометрическая оценка перекрытия.
+    """
+    with span("overlap_geometry"):
+        masks = getattr(getattr(model.r, "masks", None), "data", None)
+        geometry = pairwise_overlap(obb_rows, masks, model._get_img_hw(), mask_indices=model.obb_instance_indices)
+        verdict, score = overlap_cascade.decide(geometry)
+        overlap_pairs = geometry.pairs()
+    if overlap_model is None:
+        return None, None, overlap_pairs
+    if verdict is not None:
+        OVERLAP_CASCADE_DECISIONS.inc(decision="overlap" if verdict else "clean")
+        return verdict, score, overlap_pairs
+
+    OVERLAP_CASCADE_DECISIONS.inc(decision="classifier")
+    with span("overlap_classifier"):
         overlap_flag, overlap_score, _ = overlap_model.predict(img_path, threshold=None)
+    return overlap_flag, overlap_score, overlap_pairs
 
-    img = cv2.imread(img_path)
-    obb_texts = []
-    for i, obb in enumerate(obb_rows):
-        obb_img = img.copy()
-        obb_img = crop_obb(obb, obb_img)
-        text_list = []
-        unique_texts = set(text_list)
-        if len(list(unique_texts))>0:
-            obb_texts.append(list(unique_texts)[0])
-        else: obb_texts.append(None)
+def get_prediction_results(model, img_path, tiled=False, imgsz=None):
+    overlap_model = model_registry.get_overlap_model()
+
+    with span("segment"):
+        if tiled:
+            model.predict_image_tiled(img_path)
+        else:
+            model.predict_image(img_path, imgsz=imgsz)
+    with span("obb_extraction"):
+        # OBB в формате [class_index, x1, y1, x2, y2, x3, y3, x4, y4]
+        obb_rows = model.get_oriented_bboxes(normalized=True)
+        classes = [obb[0] for obb in obb_rows]
+        masks = model.get_masks()
+
+    overlap_flag, overlap_score, overlap_pairs = predict_overlap(model, overlap_model, img_path, obb_rows)
+
+    with span("crop_loop"):
+        img = cv2.imread(img_path)
+        obb_texts = []
+        for i, obb in enumerate(obb_rows):
+            obb_img = img.copy()
+            obb_img = crop_obb(obb, obb_img)
+            text_list = []
+            unique_texts = set(text_list)
+            if len(list(unique_texts))>0:
+                obb_texts.append(list(unique_texts)[0])
+            else: obb_texts.append(None)
 
     probs  = model.get_probs()
 
-    return classes, obb_rows, masks, probs, overlap_flag, overlap_score
+    return classes, obb_rows, masks, probs, overlap_flag, overlap_score, overlap_pairs
 
-def run(img_path):
-    script_dir = Path(__file__).parent.absolute()
-    model_path = script_dir / "weights/yolo11s-seg-tools.pt"
+def _stub_latency_ms(imgsz):
+    """Задержка заглушки: INFERENCE_STUB_MS на INFERENCE_IMGSZ, на других размерах - пропорционально площади"""
+    return INFERENCE_STUB_MS * (imgsz / INFERENCE_IMGSZ) ** 2
 
-    model = SegmentModel(
-        model_path=model_path,
-        conf_threshold=0.5,
-        imgsz=640,
-        prefer="auto",   #  "onnx-gpu" | "openvino" | "torch"
-        verbose=True
-    )
-    classes, obb_rows, masks, probs, overlap_flag, overlap_score = get_prediction_results(model, img_path)
+def select_imgsz(quality=None, latency_budget_ms=None, queue_depth=1):
+    """
+    Размер входа SegmentModel для запроса (см. app.ml.resolution).
+
+    Вызывается из event loop, поэтому модель не загружает и не ждет ее загрузки: пока модель
+    не загружена (прогрев или первый кадр без прогрева), возвращается INFERENCE_IMGSZ.
+    """
+    if INFERENCE_STUB_MS is not None:
+        # Заглушка выбирает разрешение по той же политике, что и модель, - по своей задержке
+        policy = ResolutionPolicy(INFERENCE_IMGSZ_OPTIONS, INFERENCE_IMGSZ)
+        policy.observe(INFERENCE_IMGSZ, _stub_latency_ms(INFERENCE_IMGSZ))
+        return policy.select(quality, latency_budget_ms, queue_depth)
+    model = model_registry.loaded_segment_model
+    # Политика только из размера по умолчанию: та же проверка параметров, результат - INFERENCE_IMGSZ
+    policy = model.resolution if model is not None else ResolutionPolicy([], INFERENCE_IMGSZ)
+    return policy.select(quality, latency_budget_ms, queue_depth)
+
+def run(img_path, imgsz=None):
+    """
+    Инференс кадра на общих моделях процесса.
+
+    Блокирующий: из async-кода вызывается через run_in_threadpool, чтобы не останавливать event loop.
+    """
+    if INFERENCE_STUB_MS is not None:
+        # Заглушка для нагрузочного тестования без весов/GPU: задержка по размеру входа и пустой результат
+        with span("segment"):
+            time.sleep(_stub_latency_ms(imgsz or INFERENCE_IMGSZ) / 1000)
+        return [], [], None, None, False, 0.0, []
+
+    model = model_registry.get_segment_model()
+    with model_registry.inference_lock:
+        classes, obb_rows, masks, probs, overlap_flag, overlap_score, overlap_pairs = get_prediction_results(
+            model, img_path, imgsz=imgsz
+        )
     
-    return classes, obb_rows, masks, probs, overlap_flag, overlap_score
+    return classes, obb_rows, masks, probs, overlap_flag, overlap_score, overlap_pairs
 
-def get_prediction_results_with_img(model, img_path):
-    script_dir = Path(__file__).parent.absolute()
-    model_path = script_dir / "weights/yolo11s-classify-overlap.pt"
-    overlap_model = OverlapClassifier(
-        model_path=model_path, 
-        positive_label="overlap",
-        threshold=0.5, 
-        imgsz=640,
-        device=0 if torch.cuda.is_available() else "cpu",
-        verbose=False
-    )
+def get_prediction_results_with_img(model, img_path, tiled=False, imgsz=None):
+    overlap_model = model_registry.get_overlap_model()
 
-    model.predict_image(img_path)
-    obb_rows = model.get_oriented_bboxes(normalized=True)
-    classes = [obb[0] for obb in obb_rows]
-    masks = model.get_masks()
+    with span("segment"):
+        if tiled:
+            model.predict_image_tiled(img_path)
+        else:
+            model.predict_image(img_path, imgsz=imgsz)
+    with span("obb_extraction"):
+        obb_rows = model.get_oriented_bboxes(normalized=True)
+        classes = [obb[0] for obb in obb_rows]
+        masks = model.get_masks()
 
 
-    overlap_flag, overlap_score = None, None
-    if overlap_model is not None:
-        overlap_flag, overlap_score, _ = overlap_model.predict(img_path, threshold=None)
+    overlap_flag, overlap_score, overlap_pairs = predict_overlap(model, overlap_model, img_path, obb_rows)
 
 
-    img = cv2.imread(img_path)
-    obb_texts = []
-    for i, obb in enumerate(obb_rows):
-        obb_img = img.copy()
-        obb_img = crop_obb(obb, obb_img)
-        text_list = []
-        unique_texts = set(text_list)
-        if len(list(unique_texts))>0:
-            obb_texts.append(list(unique_texts)[0])
-        else: obb_texts.append(None)
+    with span("crop_loop"):
+        img = cv2.imread(img_path)
+        obb_texts = []
+        for i, obb in enumerate(obb_rows):
+            obb_img = img.copy()
+            obb_img = crop_obb(obb, obb_img)
+            text_list = []
+            unique_texts = set(text_list)
+            if len(list(unique_texts))>0:
+                obb_texts.append(list(unique_texts)[0])
+            else: obb_texts.append(None)
 
     probs  = model.get_probs()
-    img = model.visualize_oriented_bboxes(img_path=img_path)
+    with span("visualization"):
+        img = model.visualize_oriented_bboxes(img_path=img_path)
 
-    return classes, obb_rows, masks, probs, img, overlap_flag, overlap_score
+    return classes, obb_rows, masks, probs, img, overlap_flag, overlap_score, overlap_pairs
 
 
 class OverlapClassifier:
@@ -748,7 +909,9 @@ class OverlapClassifier:
         else:
             self.device = device
 
-        self.model = YOLO(self.model_path)  # Классификационная модель
+        with span("model_load"):
+            self.model = YOLO(self.model_path)  # Классификационная модель
+        INFERENCE_MODEL_LOADS.inc(model="overlap", backend="torch")
         # Имена классов
         self.names = getattr(self.model, "names", None)
 
@@ -785,17 +948,25 @@ class OverlapClassifier:
           - score (float): вероятность позитивного класса
           - label (str): имя позитивного класса ('overlap'), на всякий
         """
-        thr = float(threshold) if threshold is not None else self.threshold
+        return self.predict_many([img_or_path], threshold=threshold)[0]
+
+    def predict_many(self, images, threshold=None):
+        """Вердикты для списка изображений одним вызовом predict (батчем)"""
         half_flag = True if (isinstance(self.device, int) and torch.cuda.is_available()) else False
 
-        res = self.model.predict(
-            source=img_or_path,
+        results = self.model.predict(
+            source=list(images) if len(images) > 1 else images[0],
             imgsz=self.imgsz,
             device=self.device,
             half=half_flag,
+            batch=len(images),
             verbose=self.verbose,
             conf=None 
-        )[0]
+        )
+        return [self._verdict(res, threshold) for res in results]
+
+    def _verdict(self, res, threshold=None):
+        thr = float(threshold) if threshold is not None else self.threshold
 
         # Вектор вероятностей
         probs = getattr(res, "probs", None)
@@ -816,6 +987,132 @@ class OverlapClassifier:
         verdict = score >= thr
         return verdict, score, self.positive_label
 
+SCRIPT_DIR = Path(__file__).parent.absolute()
+SEGMENT_MODEL_PATH = SCRIPT_DIR / "weights/yolo11s-seg-tools.pt"
+OVERLAP_MODEL_PATH = SCRIPT_DIR / "weights/yolo11s-classify-overlap.pt"
+
+
+class ModelRegistry:
+    """
+    Модели процесса: загружаются один раз и переиспользуются между запросами.
+
+    warmup() загружает обе модели и прогоняет через них пустой кадр (инициализация бэкенда,
+    выделение памяти, JIT OpenVINO/ONNX), после чего процесс готов принимать трафик.
+    start_warmup() запускает прогрев в фоновом потоке: при старте приложения и из проверки
+    готовности /health/ready, пока модели не прогреты (прогрев при старте выключен или не удался).
+    SegmentModel хранит результат последнего predict в self.r, поэтому инференс
+    на общих моделях выполняется под inference_lock.
+    """
+
+    def __init__(self, segment_model_path=SEGMENT_MODEL_PATH, overlap_model_path=OVERLAP_MODEL_PATH):
+        self.segment_model_path = segment_model_path
+        self.overlap_model_path = overlap_model_path
+        self._lock = threading.Lock()
+        self.inference_lock = threading.Lock()
+        self._segment_model = None
+        self._overlap_model = None
+        self.warmed = False
+        self.warmup_seconds = None
+        self.error = None
+        self._warmup_lock = threading.Lock()
+        self._warmup_thread = None
+        self._failed_at = None
+
+    def get_segment_model(self) -> "SegmentModel":
+        with self._lock:
+            if self._segment_model is None:
+                self._segment_model = SegmentModel(
+                    model_path=self.segment_model_path,
+                    conf_threshold=0.5,
+                    imgsz=INFERENCE_IMGSZ,
+                    imgsz_options=INFERENCE_IMGSZ_OPTIONS,
+                    prefer="auto",   #  "onnx-gpu" | "openvino" | "torch"
+                    verbose=False
+                )
+            return self._segment_model
+
+    @property
+    def loaded_segment_model(self) -> "SegmentModel | None":
+        """SegmentModel, если уже загружена; не берет _lock и не ждет загрузки в другом потоке"""
+        return self._segment_model
+
+    def get_overlap_model(self) -> "OverlapClassifier":
+        with self._lock:
+            if self._overlap_model is None:
+                self._overlap_model = OverlapClassifier(
+                    model_path=self.overlap_model_path,
+                    positive_label="overlap",
+                    threshold=0.5,
+                    imgsz=640,
+                    device=0 if torch.cuda.is_available() else "cpu",
+                    verbose=False
+                )
+            return self._overlap_model
+
+    def warmup(self):
+        """Загрузка моделей и прогон пустого кадра; ошибка сохраняется в error и не пробрасывается"""
+        start = time.perf_counter()
+        if INFERENCE_STUB_MS is not None:
+            self.warmed = True
+            self.warmup_seconds = 0.0
+            return
+        try:
+            segment_model = self.get_segment_model()
+            overlap_model = self.get_overlap_model()
+            with self.inference_lock, span("warmup"):
+                blank = np.zeros((segment_model.imgsz, segment_model.imgsz, 3), dtype=np.uint8)
+                for size in segment_model.imgsz_options:
+                    segment_model.predict_image(blank, imgsz=size)
+                overlap_model.predict(blank)
+                # Первый прогон включает инициализацию бэкенда - задержки для выбора разрешения
+                # замеряются повторным прогоном
+                segment_model.resolution.reset()
+                for size in segment_model.imgsz_options:
+                    segment_model.predict_image(blank, imgsz=size)
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self._failed_at = time.monotonic()
+            print(f"Model warmup failed: {self.error}")
+            return
+        self.error = None
+        self.warmed = True
+        self.warmup_seconds = time.perf_counter() - start
+
+    @property
+    def warming(self) -> bool:
+        return self._warmup_thread is not None and self._warmup_thread.is_alive()
+
+    def start_warmup(self) -> bool:
+        """
+        Запуск warmup() в фоновом потоке, если модели не прогреты и прогрев еще не идет.
+
+        После неудачного прогрева повтор не раньше чем через ML_WARMUP_RETRY_SECONDS.
+        Возвращает True, если прогрев запущен.
+        """
+        with self._warmup_lock:
+            if self.warmed or self.warming:
+                return False
+            if self._failed_at is not None and time.monotonic() - self._failed_at < ML_WARMUP_RETRY_SECONDS:
+                return False
+            self._warmup_thread = threading.Thread(target=self.warmup, name="model-warmup", daemon=True)
+            self._warmup_thread.start()
+            return True
+
+    def status(self) -> dict:
+        return {
+            "segment_loaded": self._segment_model is not None,
+            "overlap_loaded": self._overlap_model is not None,
+            "warmed": self.warmed,
+            "warming": self.warming,
+            "warmup_seconds": self.warmup_seconds,
+            "error": self.error,
+            "resolution": self._segment_model.resolution.status() if self._segment_model is not None else None,
+        }
+
+
+model_registry = ModelRegistry()
+
+
 def order_points(pts):
     # pts: numpy array shape (4,2)
     rect = np.zeros((4, 2), dtype="float32")
@@ -0,0 +1,80 @@
+"""
+Выбор входного разрешения SegmentModel для каждого запроса.
+
+SegmentModel держит модели для нескольких imgsz (для ONNX/OpenVINO - отдельный экспорт на каждый
+размер) и перед инференсом выбирает один из них:
+  - по явному качеству: fast - наименьший размер, balanced - размер по умолчанию, accurate - наибольший;
+  - по бюджету задержки: наибольший размер, оценка задержки которого укладывается в бюджет.
+
+Оценка задержки - экспоненциальное скользящее среднее r.speed (letterbox + forward + постобработка)
+по каждому размеру; для размеров без замеров - пересчет с ближайшего замеренного пропорционально
+площади входа. При глубине очереди инференса queue_depth кадр ждет еще queue_depth - 1 кадров,
+поэтому бюджет делится на queue_depth - под нагрузкой видеопоток переходит на меньшее разрешение
+вместо того, чтобы отставать.
+"""
+import threading
+from typing import Dict, Iterable, Optional
+
+QUALITY_LEVELS = ("fast", "balanced", "accurate")
+
+
+class ResolutionPolicy:
+    def __init__(self, sizes: Iterable[int], default: int, smoothing: float = 0.2):
+        self.default = int(default)
+        self.sizes = sorted({int(size) for size in sizes} | {self.default})
+        self.smoothing = smoothing
+        self._latency_ms: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, imgsz: int, latency_ms: float):
+        """Замер задержки инференса одного изображения на размере imgsz"""
+        with self._lock:
+            previous = self._latency_ms.get(imgsz)
+            if previous is None:
+                self._latency_ms[imgsz] = latency_ms
+            else:
+                self._latency_ms[imgsz] = previous + self.smoothing * (latency_ms - previous)
+
+    def reset(self):
+        with self._lock:
+            self._latency_ms.clear()
+
+    def estimate_ms(self, imgsz: int) -> Optional[float]:
+        """Оценка задержки на размере imgsz; None, пока нет ни одного замера"""
+        with self._lock:
+            if imgsz in self._latency_ms:
+                return self._latency_ms[imgsz]
+            if not self._latency_ms:
+                return None
+            reference = min(self._latency_ms, key=lambda size: abs(size - imgsz))
+            return self._latency_ms[reference] * (imgsz / reference) ** 2
+
+    def select(self, quality: Optional[str] = None, latency_budget_ms: Optional[float] = None,
+               queue_depth: int = 1) -> int:
+        """Размер входа для запроса; без параметров - размер по умолчанию"""
+        if quality is not None:
+            if quality not in QUALITY_LEVELS:
+                raise ValueError(f"Неизвестное качество: {quality}, допустимо: {', '.join(QUALITY_LEVELS)}")
+            if quality == "fast":
+                return self.sizes[0]
+            if quality == "accurate":
+                return self.sizes[-1]
+            return self.default
+        if latency_budget_ms is None:
+            return self.default
+
+        budget = latency_budget_ms / max(1, queue_depth)
+        estimates = {size: self.estimate_ms(size) for size in self.sizes}
+        if all(estimate is None for estimate in estimates.values()):
+            return self.default
+        fitting = [size for size, estimate in estimates.items() if estimate <= budget]
+        return max(fitting) if fitting else self.sizes[0]
+
+    def status(self) -> dict:
+        with self._lock:
+            latency = dict(self._latency_ms)
+        return {
+            "sizes": self.sizes,
+            "default": self.default,
+            "latency_ms": {size: round(value, 2) for size, value in sorted(latency.items())},
+        }
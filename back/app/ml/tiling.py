@@ -0,0 +1,202 @@
+"""
+Тайловый инференс сегментации для фото высокого разрешения.
+
+Изображение режется на перекрывающиеся тайлы (и, опционально, целиком уменьшается до imgsz -
+для инструментов крупнее тайла), тайлы одним батчем проходят через модель. Инстансы разных
+тайлов объединяются с учетом масок: два инстанса одного класса считаются одним объектом,
+если их маски совпадают (IoU >= merge_iou) в области пересечения их тайлов. Так склеиваются
+и дубликаты из зоны перекрытия, и части длинного инструмента, разрезанного границей тайла.
+
+Маски собираются на уменьшенном холсте (длинная сторона не больше mask_max_side), результат -
+обычный ultralytics Results для исходного изображения, поэтому get_masks/get_oriented_bboxes/
+visualize_oriented_bboxes работают без изменений.
+"""
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+Rect = Tuple[int, int, int, int]
+
+
+def _axis_starts(length: int, tile: int, stride: int) -> List[int]:
+    if length <= tile:
+        return [0]
+    starts = list(range(0, length - tile, stride))
+    starts.append(length - tile)
+    return starts
+
+
+def tile_grid(height: int, width: int, tile_size: int, overlap: float) -> List[Rect]:
+    """
+    Тайлы (x1, y1, x2, y2), покрывающие изображение с перекрытием overlap (доля размера тайла).
+
+    Последний тайл в ряду прижимается к краю изображения, поэтому все тайлы одного размера.
+    """
+    if not 0 <= overlap < 1:
+        raise ValueError("overlap должен быть в диапазоне [0, 1)")
+    stride = max(1, int(round(tile_size * (1 - overlap))))
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in _axis_starts(height, tile_size, stride)
+        for x in _axis_starts(width, tile_size, stride)
+    ]
+
+
+def _intersect(a: Rect, b: Rect) -> Optional[Rect]:
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    return (x1, y1, x2, y2) if x1 < x2 and y1 < y2 else None
+
+
+class _Instance:
+    """Инстанс одного тайла: box в пикселях изображения, маска на холсте, обрезанная по extent"""
+
+    __slots__ = ("tile", "cls", "conf", "box", "extent", "mask")
+
+    def __init__(self, tile: int, cls: int, conf: float, box: np.ndarray, extent: Rect, mask: np.ndarray):
+        self.tile = tile
+        self.cls = cls
+        self.conf = conf
+        self.box = box
+        self.extent = extent
+        self.mask = mask
+
+    def window(self, rect: Rect) -> np.ndarray:
+        x0, y0 = self.extent[:2]
+        return self.mask[rect[1] - y0:rect[3] - y0, rect[0] - x0:rect[2] - x0]
+
+
+def _rasterize(polygons: Sequence[np.ndarray], offset: Tuple[int, int], scale: float,
+               canvas_hw: Tuple[int, int]) -> Optional[Tuple[Rect, np.ndarray]]:
+    """Полигоны тайла -> bool-маска на холсте в пределах ограничивающего прямоугольника"""
+    points = [np.asarray(p, dtype=np.float32) for p in polygons if p is not None and len(p) >= 3]
+    if not points:
+        return None
+    points = [(p + np.asarray(offset, dtype=np.float32)) * scale for p in points]
+    stacked = np.concatenate(points)
+    x1, y1 = np.floor(stacked.min(axis=0)).astype(int)
+    x2, y2 = np.ceil(stacked.max(axis=0)).astype(int) + 1
+    x1, y1 = max(x1, 0), max(y1, 0)
+    x2, y2 = min(x2, canvas_hw[1]), min(y2, canvas_hw[0])
+    if x1 >= x2 or y1 >= y2:
+        return None
+    mask = np.zeros((y2 - y1, x2 - x1), dtype=np.uint8)
+    cv2.fillPoly(mask, [np.round(p - (x1, y1)).astype(np.int32) for p in points], 1)
+    return (x1, y1, x2, y2), mask.astype(bool)
+
+
+def _same_object(a: _Instance, b: _Instance, region: Rect, merge_iou: float) -> bool:
+    """IoU масок двух инстансов в области region (пересечение их тайлов на холсте)"""
+    area_a_rect = _intersect(a.extent, region)
+    area_b_rect = _intersect(b.extent, region)
+    if area_a_rect is None or area_b_rect is None:
+        return False
+    area_a = int(a.window(area_a_rect).sum())
+    area_b = int(b.window(area_b_rect).sum())
+    if not area_a or not area_b:
+        return False
+    common = _intersect(area_a_rect, area_b_rect)
+    inter = int((a.window(common) & b.window(common)).sum()) if common else 0
+    return inter / (area_a + area_b - inter) >= merge_iou
+
+
+def merge_instances(instances: List[_Instance], tiles_on_canvas: List[Rect], merge_iou: float,
+                    class_agnostic: bool = False) -> List[List[int]]:
+    """Группы индексов инстансов, относящихся к одному объекту (union-find по парам разных тайлов)"""
+    parent = list(range(len(instances)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, a in enumerate(instances):
+        for j in range(i + 1, len(instances)):
+            b = instances[j]
+            if a.tile == b.tile or (not class_agnostic and a.cls != b.cls):
+                continue
+            region = _intersect(tiles_on_canvas[a.tile], tiles_on_canvas[b.tile])
+            if region is None or _intersect(a.extent, b.extent) is None:
+                continue
+            if _same_object(a, b, region, merge_iou):
+                parent[find(j)] = find(i)
+
+    groups = {}
+    for i in range(len(instances)):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values())
+
+
+def tiled_predict(model, image: np.ndarray, tile_size: int = 1024, overlap: float = 0.2, batch: int = 8,
+                  include_full_image: bool = True, merge_iou: float = 0.5, class_agnostic: bool = False,
+                  mask_max_side: int = 1280) -> Results:
+    """
+    Тайловый инференс SegmentModel для BGR-изображения, результат - Results для всего изображения.
+
+    - **tile_size**: сторона тайла в пикселях исходного изображения
+    - **overlap**: перекрытие соседних тайлов (доля tile_size)
+    - **batch**: размер батча при прогоне тайлов через модель
+    - **include_full_image**: дополнительно прогнать изображение целиком (крупные инструменты)
+    - **merge_iou**: порог IoU масок в общей области тайлов для объединения инстансов
+    """
+    height, width = image.shape[:2]
+    tiles = tile_grid(height, width, tile_size, overlap)
+    if include_full_image and len(tiles) > 1:
+        tiles.append((0, 0, width, height))
+    crops = [image[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles]
+    results = model.predict_images(crops, batch=batch)
+
+    scale = min(1.0, mask_max_side / max(height, width))
+    canvas_hw = (max(1, int(round(height * scale))), max(1, int(round(width * scale))))
+    tiles_on_canvas = [
+        (int(x1 * scale), int(y1 * scale), int(np.ceil(x2 * scale)), int(np.ceil(y2 * scale)))
+        for x1, y1, x2, y2 in tiles
+    ]
+
+    instances = []
+    for tile_index, (r, (x1, y1, _, _)) in enumerate(zip(results, tiles)):
+        if r.boxes is None or r.masks is None or not len(r.boxes):
+            continue
+        boxes = r.boxes.xyxy.cpu().numpy() + np.array([x1, y1, x1, y1], dtype=np.float32)
+        classes = r.boxes.cls.cpu().numpy().astype(int)
+        confs = r.boxes.conf.cpu().numpy()
+        for i, polygon in enumerate(r.masks.xy):
+            raster = _rasterize([polygon], (x1, y1), scale, canvas_hw)
+            if raster is not None:
+                instances.append(_Instance(tile_index, int(classes[i]), float(confs[i]), boxes[i], *raster))
+
+    merged_boxes, merged_masks = [], []
+    groups = merge_instances(instances, tiles_on_canvas, merge_iou, class_agnostic)
+    # Как и в обычном predict - по убыванию уверенности
+    groups.sort(key=lambda group: -max(instances[i].conf for i in group))
+    for group in groups:
+        members = [instances[i] for i in group]
+        best = max(members, key=lambda instance: instance.conf)
+        mask = np.zeros(canvas_hw, dtype=bool)
+        for member in members:
+            ex1, ey1, ex2, ey2 = member.extent
+            mask[ey1:ey2, ex1:ex2] |= member.mask
+        box = np.array([
+            min(m.box[0] for m in members), min(m.box[1] for m in members),
+            max(m.box[2] for m in members), max(m.box[3] for m in members),
+        ], dtype=np.float32)
+        merged_boxes.append([*box, best.conf, best.cls])
+        merged_masks.append(mask)
+
+    speed = {
+        key: sum((r.speed or {}).get(key) or 0.0 for r in results)
+        for key in ("preprocess", "inference", "postprocess")
+    }
+    names = results[0].names if results else getattr(model.model, "names", {})
+    if not merged_boxes:
+        return Results(image, path="", names=names, speed=speed)
+    return Results(
+        image, path="", names=names,
+        boxes=torch.tensor(merged_boxes, dtype=torch.float32),
+        masks=torch.from_numpy(np.stack(merged_masks).astype(np.uint8)),
+        speed=speed,
+    )
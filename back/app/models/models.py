@@ -1,5 +1,7 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Enum, DateTime, func, JSON, Boolean, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, ForeignKey, Enum, DateTime, func, JSON, Boolean, Table, Index, text, Date, Float, UniqueConstraint
+from sqlalchemy import event
+from sqlalchemy.orm import relationship, Session
+from sqlalchemy.orm.attributes import get_history
 from ..database import Base
 import enum
 from enum import Enum as PyEnum
@@ -10,7 +12,9 @@ tool_set_type_tool_types = Table(
     'tool_set_type_tool_types',
     Base.metadata,
     Column('tool_set_type_id', Integer, ForeignKey('tool_set_types.id'), primary_key=True),
-    Column('tool_type_id', Integer, ForeignKey('tool_types.id'), primary_key=True)
+    Column('tool_type_id', Integer, ForeignKey('tool_types.id'), primary_key=True),
+    # Обратный поиск наборов по типу инструмента (PK начинается с tool_set_type_id)
+    Index('ix_tool_set_type_tool_types_tool_type_id', 'tool_type_id'),
 )
 
 class Role(PyEnum):
@@ -82,6 +86,7 @@ class ToolSetType(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False, unique=True)
     description = Column(String)
+    # Проекция состава набора для API (порядок как в запросе); источник истины - tool_set_type_tool_types
     tool_type_ids = Column(JSON, nullable=False, default=list)
 
     tool_sets = relationship("ToolSet", back_populates="tool_set_type")
@@ -98,9 +103,37 @@ class ToolSet(Base):
     tool_set_type = relationship("ToolSetType", back_populates="tool_sets")
     incidents = relationship("Incident", back_populates="tool_set")
     maintenance_requests = relationship("MaintenanceRequest", back_populates="tool_set")
+    items = relationship("ToolSetItem", back_populates="tool_set", cascade="all, delete-orphan")
+
+class ToolSetItem(Base):
+    """Партийный номер инструмента в наборе - нормализованная копия ToolSet.batch_map для поиска по номеру"""
+    __tablename__ = "tool_set_items"
+    __table_args__ = (
+        UniqueConstraint("tool_set_id", "tool_type_id", name="uq_tool_set_items_tool_set_id_tool_type_id"),
+        Index("ix_tool_set_items_batch_number", "batch_number"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    tool_set_id = Column(Integer, ForeignKey('tool_sets.id'), nullable=False)
+    tool_type_id = Column(Integer, ForeignKey('tool_types.id'), nullable=False)
+    batch_number = Column(String, nullable=False)
+
+    tool_set = relationship("ToolSet", back_populates="items")
 
 class MaintenanceRequest(Base):
     __tablename__ = "maintenance_requests"
+    # Индексы под фильтры списка заявок: фильтр по равенству + сортировка/keyset по (created_at, id)
+    __table_args__ = (
+        Index("ix_maintenance_requests_created_at_id", "created_at", "id"),
+        Index("ix_maintenance_requests_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_maintenance_requests_aircraft_id_created_at_id", "aircraft_id", "created_at", "id"),
+        # Частичный: неназначенные заявки (aviation_engineer_id IS NULL) по инженеру не ищутся
+        Index(
+            "ix_maintenance_requests_aviation_engineer_id_created_at_id",
+            "aviation_engineer_id", "created_at", "id",
+            postgresql_where=text("aviation_engineer_id IS NOT NULL"),
+            sqlite_where=text("aviation_engineer_id IS NOT NULL"),
+        ),
+    )
     id = Column(Integer, primary_key=True, index=True)
     aircraft_id = Column(Integer, ForeignKey('aircrafts.id'), nullable=False)
     created_at = Column(DateTime, server_default=func.now())
@@ -124,11 +157,23 @@ class IncidentStatus(enum.Enum):
 
 class Incident(Base):
     __tablename__ = "incidents"
+    # Индексы под фильтры списка инцидентов: фильтр по равенству + сортировка/keyset по (created_at, id)
+    __table_args__ = (
+        Index("ix_incidents_created_at_id", "created_at", "id"),
+        Index("ix_incidents_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_incidents_aviation_engineer_id_created_at_id", "aviation_engineer_id", "created_at", "id"),
+        Index(
+            "ix_incidents_quality_control_specialist_id_created_at_id",
+            "quality_control_specialist_id", "created_at", "id",
+        ),
+    )
     id = Column(Integer, primary_key=True, index=True)
     aviation_engineer_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     quality_control_specialist_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     aircraft_id = Column(Integer, ForeignKey('aircrafts.id'), nullable=False)
     created_at = Column(DateTime, server_default=func.now())
+    # Момент перевода в RESOLVED/CLOSED (сбрасывается при возврате в работу)
+    resolved_at = Column(DateTime, nullable=True)
     tool_set_id = Column(Integer, ForeignKey('tool_sets.id'), nullable=False)
     annotated_image = Column(String)
     raw_image = Column(String)
@@ -141,4 +186,84 @@ class Incident(Base):
     quality_control_specialist = relationship("User", foreign_keys=[quality_control_specialist_id])
     aircraft = relationship("Aircraft", back_populates="incidents")
     tool_set = relationship("ToolSet", back_populates="incidents")
-    maintenance_request = relationship("MaintenanceRequest", back_populates="incident")
\ No newline at end of file
+    maintenance_request = relationship("MaintenanceRequest", back_populates="incident")
+
+
+class DailyRollup(Base):
+    """
+    Дневные агрегаты для аналитики, пересчитываются по затронутым дням при изменении заявок и инцидентов.
+
+    metric - вид показателя, dimension - значение разреза (статус, ID самолета, ID специалиста КК),
+    count - количество строк за день, value_sum - сумма значений (например, секунд до разрешения).
+    """
+    __tablename__ = "daily_rollups"
+    __table_args__ = (
+        UniqueConstraint("day", "metric", "dimension", name="uq_daily_rollups_day_metric_dimension"),
+        Index("ix_daily_rollups_metric_day", "metric", "day"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)
+    metric = Column(String, nullable=False)
+    dimension = Column(String, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    value_sum = Column(Float, nullable=False, default=0.0)
+
+
+@event.listens_for(Session, "before_flush")
+def sync_tool_set_type_tool_types(session, flush_context, instances):
+    """
+    Держит согласованными состав набора в tool_set_type_tool_types и JSON-проекцию tool_type_ids.
+
+    Запись tool_type_ids (API, старый код) переносится в таблицу связей, а изменение связей
+    через tool_types - в проекцию. Несуществующие ID в связи не попадают.
+    """
+    for obj in (*session.new, *session.dirty):
+        if not isinstance(obj, ToolSetType):
+            continue
+        is_new = obj in session.new
+        ids = list(dict.fromkeys(obj.tool_type_ids or []))
+        if (is_new and ids) or (not is_new and get_history(obj, "tool_type_ids").has_changes()):
+            found = {}
+            if ids:
+                with session.no_autoflush:
+                    found = {t.id: t for t in session.query(ToolType).filter(ToolType.id.in_(ids))}
+            obj.tool_types = [found[i] for i in ids if i in found]
+        elif get_history(obj, "tool_types").has_changes():
+            obj.tool_type_ids = [t.id for t in obj.tool_types]
+
+
+def batch_map_items(batch_map) -> dict:
+    """batch_map {"<tool_type_id>": "<номер>"} -> {tool_type_id: номер} (нечисловые ключи пропускаются)"""
+    items = {}
+    for tool_type_id, batch_number in (batch_map or {}).items():
+        try:
+            items[int(tool_type_id)] = batch_number
+        except (TypeError, ValueError):
+            continue
+    return items
+
+
+@event.listens_for(Session, "before_flush")
+def sync_tool_set_items(session, flush_context, instances):
+    """
+    Переносит изменения ToolSet.batch_map в tool_set_items.
+
+    Строки обновляются по месту (а не удаляются и вставляются заново), чтобы не нарушать
+    уникальность (tool_set_id, tool_type_id) в пределах одного flush.
+    """
+    for obj in (*session.new, *session.dirty):
+        if not isinstance(obj, ToolSet):
+            continue
+        if obj not in session.new and not get_history(obj, "batch_map").has_changes():
+            continue
+        wanted = batch_map_items(obj.batch_map)
+        with session.no_autoflush:
+            current = {item.tool_type_id: item for item in obj.items}
+        for tool_type_id, item in current.items():
+            if tool_type_id not in wanted:
+                obj.items.remove(item)
+            elif item.batch_number != wanted[tool_type_id]:
+                item.batch_number = wanted[tool_type_id]
+        for tool_type_id, batch_number in wanted.items():
+            if tool_type_id not in current:
+                obj.items.append(ToolSetItem(tool_type_id=tool_type_id, batch_number=batch_number))
@@ -0,0 +1,49 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import tuple_
+
+# Заголовок ответа с курсором следующей страницы
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, item_id: int) -> str:
+    """Курсор - позиция последней записи страницы: (created_at, id) в base64"""
+    raw = f"{created_at.isoformat()}|{item_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, item_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), int(item_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def paginate(query, model, skip: int, limit: int, cursor: Optional[str] = None):
+    """
+    Сортировка (новые сначала) и выборка страницы.
+
+    С курсором используется keyset-пагинация: условие `(created_at, id) < курсор` по
+    составному индексу (created_at, id), стоимость не зависит от глубины страницы.
+    Без курсора - прежняя пагинация через skip/limit.
+    """
+    query = query.order_by(model.created_at.desc(), model.id.desc())
+    if cursor:
+        created_at, item_id = decode_cursor(cursor)
+        return query.where(tuple_(model.created_at, model.id) < (created_at, item_id)).limit(limit)
+    return query.offset(skip).limit(limit)
+
+
+def set_next_cursor(response: Response, items: Sequence, limit: int):
+    """Добавляет курсор следующей страницы, если текущая страница заполнена полностью"""
+    if items and len(items) == limit and items[-1].created_at is not None:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(items[-1].created_at, items[-1].id)
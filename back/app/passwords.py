@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from .config import PASSWORD_HASH_ROUNDS, PASSWORD_HASH_WORKERS
+
+
+class LoginMetrics:
+    """Счетчики входов и работы пула хэширования паролей"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.logins = 0
+        self.login_failures = 0
+        self.rehashes = 0
+        self.in_flight = 0
+        self.hash_operations = 0
+        self.hash_seconds_total = 0.0
+        self.hash_seconds_max = 0.0
+        self.queue_wait_seconds_max = 0.0
+
+    def increment(self, counter: str, amount: int = 1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def observe_hash(self, queue_wait: float, seconds: float):
+        with self._lock:
+            self.hash_operations += 1
+            self.hash_seconds_total += seconds
+            self.hash_seconds_max = max(self.hash_seconds_max, seconds)
+            self.queue_wait_seconds_max = max(self.queue_wait_seconds_max, queue_wait)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "logins": self.logins,
+                "login_failures": self.login_failures,
+                "rehashes": self.rehashes,
+                "in_flight": self.in_flight,
+                "hash_operations": self.hash_operations,
+                "hash_seconds_avg": self.hash_seconds_total / self.hash_operations if self.hash_operations else 0.0,
+                "hash_seconds_max": self.hash_seconds_max,
+                "queue_wait_seconds_max": self.queue_wait_seconds_max,
+                "workers": PASSWORD_HASH_WORKERS,
+                "rounds": PASSWORD_HASH_ROUNDS,
+            }
+
+
+login_metrics = LoginMetrics()
+
+# bcrypt отпускает GIL, поэтому потоков достаточно; размер пула ограничивает число одновременных
+# хэширований, остальные запросы ждут в очереди пула, не занимая потоки threadpool FastAPI
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+
+def hash_password(password: str) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=PASSWORD_HASH_ROUNDS)).decode('ascii')
+
+
+def check_password(password: str, hashed_password: str) -> bool:
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('ascii'))
+    except Exception:
+        return False
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """Хэш создан с другим cost factor, чем PASSWORD_HASH_ROUNDS ($2b$<rounds>$...)"""
+    try:
+        return int(hashed_password.split("$")[2]) != PASSWORD_HASH_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+
+async def _run_in_pool(func, *args):
+    submitted = time.perf_counter()
+
+    def timed():
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            login_metrics.observe_hash(started - submitted, time.perf_counter() - started)
+
+    login_metrics.increment("in_flight")
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, timed)
+    finally:
+        login_metrics.increment("in_flight", -1)
+
+
+async def hash_password_async(password: str) -> str:
+    """Хэширование пароля в пуле хэширования"""
+    return await _run_in_pool(hash_password, password)
+
+
+async def check_password_async(password: str, hashed_password: str) -> bool:
+    """Проверка пароля в пуле хэширования"""
+    return await _run_in_pool(check_password, password, hashed_password)
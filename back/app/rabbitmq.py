@@ -1,5 +1,9 @@
+import json
+import threading
+import time
+
 import pika
-from .config import RABBITMQ_URL
+from .config import RABBITMQ_URL, EVENTS_EXCHANGE, RABBITMQ_RETRY_INTERVAL
 
 def send_message(message):
     try:
@@ -15,3 +19,84 @@ def send_message(message):
 
     except pika.exceptions.AMQPConnectionError as e:
         print(f"Error connecting to RabbitMQ: {e}")
+
+
+class EventPublisher:
+    """
+    Публикация событий в topic-exchange RabbitMQ.
+
+    Соединение открывается один раз и переиспользуется между публикациями.
+    Ключ маршрутизации совпадает с типом события (например, `incident.resolved`),
+    поэтому подписчики могут слушать как все события (`#`), так и отдельную сущность (`incident.*`).
+    После ошибки подключения повторная попытка делается не раньше, чем через retry_interval секунд.
+    """
+
+    def __init__(self, url=RABBITMQ_URL, exchange=EVENTS_EXCHANGE, retry_interval=RABBITMQ_RETRY_INTERVAL):
+        self.url = url
+        self.exchange = exchange
+        self.retry_interval = retry_interval
+        self._connection = None
+        self._channel = None
+        self._lock = threading.Lock()
+        self._retry_after = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.url)
+
+    @property
+    def is_connected(self) -> bool:
+        return self._channel is not None and self._channel.is_open
+
+    def _ensure_channel(self):
+        if self.is_connected:
+            return self._channel
+        self._connection = pika.BlockingConnection(pika.URLParameters(self.url))
+        self._channel = self._connection.channel()
+        self._channel.exchange_declare(exchange=self.exchange, exchange_type='topic', durable=True)
+        return self._channel
+
+    def _reset(self):
+        try:
+            if self._connection is not None and self._connection.is_open:
+                self._connection.close()
+        except Exception:
+            pass
+        self._connection = None
+        self._channel = None
+
+    def publish(self, event: dict) -> bool:
+        """Публикует событие, возвращает True при успехе"""
+        if not self.enabled:
+            return False
+
+        with self._lock:
+            if not self.is_connected and time.monotonic() < self._retry_after:
+                return False
+            for _ in range(2):
+                reused = self.is_connected
+                try:
+                    channel = self._ensure_channel()
+                    channel.basic_publish(
+                        exchange=self.exchange,
+                        routing_key=event['type'],
+                        body=json.dumps(event, default=str),
+                        properties=pika.BasicProperties(content_type='application/json'),
+                    )
+                    return True
+                except pika.exceptions.AMQPError as e:
+                    self._reset()
+                    if reused:
+                        # Брокер мог закрыть простаивающее соединение - пробуем еще раз с новым
+                        continue
+                    print(f"Error publishing event to RabbitMQ: {e}")
+                    self._retry_after = time.monotonic() + self.retry_interval
+                    return False
+        return False
+
+    def close(self):
+        with self._lock:
+            self._reset()
+
+
+event_publisher = EventPublisher()
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
+from app.schemas.bulk_schema import BulkItemError
 
 # Aircraft схемы
 class AircraftBase(BaseModel):
@@ -23,4 +24,12 @@ class Aircraft(AircraftBase):
     updated_at: datetime = Field(..., example="2024-01-01T10:00:00Z", description="Дата последнего обновления")
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+# Массовое создание
+class AircraftBulkCreate(BaseModel):
+    items: List[AircraftCreate] = Field(..., description="Самолеты для создания")
+
+class AircraftBulkResult(BaseModel):
+    created: List[Aircraft] = Field(..., description="Созданные самолеты")
+    errors: List[BulkItemError] = Field(default=[], description="Элементы, которые не прошли проверку и не созданы")
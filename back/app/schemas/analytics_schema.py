@@ -0,0 +1,21 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import date
+
+from app.schemas.maintenance_request_schema import MaintenanceRequestStatus
+
+
+class DailyStatusCount(BaseModel):
+    day: date = Field(..., description="День")
+    status: MaintenanceRequestStatus = Field(..., description="Статус, в который перешли заявки")
+    count: int = Field(..., description="Количество переходов заявок в статус за день")
+
+class WeeklyAircraftIncidents(BaseModel):
+    week_start: date = Field(..., description="Понедельник недели")
+    aircraft_id: int = Field(..., description="ID самолета")
+    count: int = Field(..., description="Количество инцидентов за неделю")
+
+class QualityControlResolution(BaseModel):
+    quality_control_specialist_id: int = Field(..., description="ID специалиста КК")
+    resolved_count: int = Field(..., description="Количество разрешенных инцидентов")
+    avg_resolution_time_seconds: Optional[float] = Field(None, description="Среднее время разрешения в секундах")
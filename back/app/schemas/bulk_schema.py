@@ -0,0 +1,6 @@
+from pydantic import BaseModel, Field
+
+
+class BulkItemError(BaseModel):
+    index: int = Field(..., example=0, description="Позиция элемента в запросе")
+    detail: str = Field(..., example="Tool type with this name already exists", description="Причина, по которой элемент не создан (не обновлен)")
@@ -36,6 +36,7 @@ class Incident(IncidentBase):
     id: int = Field(..., description="ID инцидента")
     status: IncidentStatus = Field(..., description="Статус инцидента")
     created_at: datetime = Field(..., description="Дата создания")
+    resolved_at: Optional[datetime] = Field(None, description="Дата разрешения")
     
     class Config:
         from_attributes = True
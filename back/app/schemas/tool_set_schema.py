@@ -2,6 +2,7 @@ from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from enum import Enum
 from datetime import datetime
+from app.schemas.bulk_schema import BulkItemError
 
 class ToolClass(str, Enum):
     """Классы инструментов"""
@@ -75,3 +76,24 @@ class ToolSetUpdate(BaseModel):
     batch_number: Optional[str] = Field(None, example="BATCH-001-UPDATED", description="Новый партийный номер")
     description: Optional[str] = Field(None, example="Обновленное описание", description="Новое описание")
     batch_map: Optional[Dict[str, str]] = Field(None, example={"1": "SN-001", "2": "SN-002", "3": "SN-003"}, description="Обновленная мапа партийных номеров")
+
+# Массовое создание
+class ToolSetBulkCreate(BaseModel):
+    items: List[ToolSetCreate] = Field(..., description="Наборы инструментов для создания")
+
+class ToolSetBulkResult(BaseModel):
+    created: List[ToolSet] = Field(..., description="Созданные наборы инструментов")
+    errors: List[BulkItemError] = Field(default=[], description="Элементы, которые не прошли проверку и не созданы")
+
+# Схемы поиска наборов по партийным номерам инструментов
+class SerialResolveRequest(BaseModel):
+    serials: List[str] = Field(..., example=["AT-288293-1", "AT-389759"], description="Партийные номера инструментов")
+
+class SerialMatch(BaseModel):
+    tool_set_id: int = Field(..., description="ID набора инструментов")
+    tool_set_batch_number: str = Field(..., description="Партийный номер набора")
+    tool_type_id: int = Field(..., description="ID типа инструмента")
+
+class SerialResolution(BaseModel):
+    serial: str = Field(..., description="Партийный номер инструмента из запроса")
+    matches: List[SerialMatch] = Field(default=[], description="Наборы, в которых есть инструмент с этим номером")
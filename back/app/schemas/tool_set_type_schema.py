@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
+from app.schemas.bulk_schema import BulkItemError
 
 
 # Сначала определяем базовые схемы без рекурсивных ссылок
@@ -37,6 +38,14 @@ class ToolSetType(ToolSetTypeBase):
         orm_mode = True
         from_attributes=True
 
+# Массовое создание
+class ToolSetTypeBulkCreate(BaseModel):
+    items: List[ToolSetTypeCreate] = Field(..., description="Типы наборов для создания")
+
+class ToolSetTypeBulkResult(BaseModel):
+    created: List[ToolSetType] = Field(..., description="Созданные типы наборов")
+    errors: List[BulkItemError] = Field(default=[], description="Элементы, которые не прошли проверку и не созданы")
+
 # Упрощенная схема без рекурсивных ссылок
 class ToolSetTypeWithTools(ToolSetType):
     tool_types: List[ToolType] = Field(default=[], description="Подробная информация о инструментах в наборе")
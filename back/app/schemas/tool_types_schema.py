@@ -2,6 +2,7 @@ from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
 from enum import Enum
+from app.schemas.bulk_schema import BulkItemError
 
 # ToolType схемы
 
@@ -35,6 +36,18 @@ class ToolType(ToolTypeBase):
         orm_mode = True
         from_attributes=True
 
+# Массовое создание
+class ToolTypeBulkItem(ToolTypeCreate):
+    ref: Optional[str] = Field(None, example="hand-tools", description="Ключ элемента, на который ссылаются parent_ref других элементов запроса")
+    parent_ref: Optional[str] = Field(None, example="hand-tools", description="ref родительской категории из этого же запроса (вместо category_id)")
+
+class ToolTypeBulkCreate(BaseModel):
+    items: List[ToolTypeBulkItem] = Field(..., description="Типы инструментов и категории для создания")
+
+class ToolTypeBulkResult(BaseModel):
+    created: List[ToolType] = Field(..., description="Созданные типы инструментов")
+    errors: List[BulkItemError] = Field(default=[], description="Элементы, которые не прошли проверку и не созданы")
+
 # Схема для дерева категорий
 class ToolTypeTree(BaseModel):
     id: int
@@ -66,6 +79,17 @@ class ToolTypeUpdate(BaseModel):
     is_item: Optional[bool] = Field(None, example=True, description="Изменение типа элемента")
     tool_class: Optional[ToolClass] = Field(None, example=ToolClass.OTVERTKA_PLUS, description="Новый класс инструмента")
 
+# Массовое обновление
+class ToolTypeBulkUpdateItem(ToolTypeUpdate):
+    id: int = Field(..., example=1, description="ID обновляемого типа инструмента")
+
+class ToolTypeBulkUpdate(BaseModel):
+    items: List[ToolTypeBulkUpdateItem] = Field(..., description="Изменения типов инструментов и категорий")
+
+class ToolTypeBulkUpdateResult(BaseModel):
+    updated: List[ToolType] = Field(..., description="Обновленные типы инструментов")
+    errors: List[BulkItemError] = Field(default=[], description="Элементы, которые не прошли проверку и не обновлены")
+
 # Остальные схемы остаются без изменений, но наследуют новое поле
 class ToolTypeWithChildren(ToolType):
     children: List['ToolTypeWithChildren'] = Field(default=[], description="Дочерние элементы")
@@ -1,24 +1,60 @@
+import os
+import tempfile
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 
 from app.main import app, database
 from app.database import Base
-from app.api.dependencies import get_db
+from app.api.dependencies import get_db, get_async_db
+from app.api.tool_types import tool_type_tree_cache
+from app.api.dependencies import user_cache
+from app.health import readiness_cache
 from app.models.models import User, Role, ToolType, ToolSet, ToolSetType, ToolType, User, Role, Aircraft, MaintenanceRequest, Incident
 
-# Тестовая база данных в памяти
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# Тестовая база данных во временном файле: синхронная и асинхронная сессии должны видеть одни и те же данные
+# Тесты с порогами по времени (@pytest.mark.perf) зависят от загрузки машины и в обычном прогоне
+# пропускаются; запуск: PERF_TESTS=1 pytest -m perf
+RUN_PERF_TESTS = os.getenv("PERF_TESTS") == "1"
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "perf: проверка времени выполнения (только при PERF_TESTS=1)")
+
+
+def pytest_collection_modifyitems(config, items):
+    if RUN_PERF_TESTS:
+        return
+    skip_perf = pytest.mark.skip(reason="Проверка времени выполнения: запуск с PERF_TESTS=1")
+    for item in items:
+        if "perf" in item.keywords:
+            item.add_marker(skip_perf)
+
+TEST_DATABASE_PATH = os.path.join(tempfile.gettempdir(), f"aflt_tooltrack_test_{os.getpid()}.db")
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{TEST_DATABASE_PATH}"
+ASYNC_SQLALCHEMY_DATABASE_URL = f"sqlite+aiosqlite:///{TEST_DATABASE_PATH}"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
 )
 
+# TestClient запускает каждый запрос в отдельном event loop, поэтому асинхронные соединения не переиспользуем
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+@pytest.fixture(scope="session", autouse=True)
+def test_database_file():
+    yield
+    engine.dispose()
+    if os.path.exists(TEST_DATABASE_PATH):
+        os.remove(TEST_DATABASE_PATH)
 
 @pytest.fixture(scope="function")
 def db_session():
@@ -40,11 +76,35 @@ def client(db_session):
             yield db_session
         finally:
             pass
+
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as session:
+            yield session
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    # База пересоздается для каждого теста - дерево типов из предыдущего теста не должно отдаваться из кэша
+    tool_type_tree_cache.invalidate()
+    user_cache.clear()
+    readiness_cache.clear()
     client = TestClient(app)
     return client
 
+@pytest.fixture
+def query_counter():
+    """Собирает SQL-запросы, выполненные через тестовые движки (синхронный и асинхронный)"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engines = (engine, async_engine.sync_engine)
+    for test_engine in engines:
+        event.listen(test_engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    for test_engine in engines:
+        event.remove(test_engine, "before_cursor_execute", before_cursor_execute)
+
 @pytest.fixture
 def test_user(db_session):
     """Создает тестового пользователя"""
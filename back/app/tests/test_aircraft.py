@@ -38,6 +38,24 @@ class TestAircraft:
         assert response.status_code == 400
         assert "already exists" in response.json()["detail"]
 
+    def test_bulk_create_aircrafts(self, client, auth_headers, test_aircraft):
+        """Тест массового создания самолетов"""
+        response = client.post("/api/aircraft/bulk", json={"items": [
+            {"tail_number": "RA-10001", "model": "Sukhoi Superjet 100", "year_of_manufacture": 2020},
+            {"tail_number": test_aircraft.tail_number, "model": "Boeing 737-800", "year_of_manufacture": 2020},
+            {"tail_number": "RA-10002", "model": "Airbus A320", "year_of_manufacture": 2020},
+            {"tail_number": "RA-10002", "model": "Airbus A321", "year_of_manufacture": 2020},
+        ]}, headers=auth_headers)
+
+        assert response.status_code == 201
+        data = response.json()
+        assert [item["tail_number"] for item in data["created"]] == ["RA-10001"]
+        assert data["errors"] == [
+            {"index": 1, "detail": "Aircraft with this tail number already exists"},
+            {"index": 2, "detail": "Duplicate tail number in request"},
+            {"index": 3, "detail": "Duplicate tail number in request"},
+        ]
+
     def test_get_all_aircrafts(self, client, auth_headers):
         """Тест получения списка самолетов"""
         # Создаем несколько самолетов
@@ -0,0 +1,97 @@
+from datetime import date, timedelta
+
+from app.models.models import DailyRollup
+
+
+class TestAnalytics:
+    # Агрегаты пишутся по дате БД (в SQLite - UTC), поэтому берем период с запасом в день
+    period = f"date_from={date.today() - timedelta(days=1)}&date_to={date.today() + timedelta(days=1)}"
+
+    def test_maintenance_request_status_changes_are_rolled_up(self, client, auth_headers, test_maintenance_request):
+        """Тест агрегатов по статусам заявок: заявка учитывается один раз - в текущем статусе на день создания"""
+        client.put(
+            f"/api/maintenance-requests/{test_maintenance_request.id}",
+            json={"status": "IN_PROGRESS"},
+            headers=auth_headers
+        )
+        client.put(f"/api/maintenance-requests/{test_maintenance_request.id}/complete", headers=auth_headers)
+
+        response = client.get(f"/api/analytics/maintenance-requests/daily?{self.period}", headers=auth_headers)
+
+        assert response.status_code == 200
+        counts = {item["status"]: item["count"] for item in response.json()}
+        assert counts == {"COMPLETED": 1}
+
+    def test_deleted_maintenance_request_leaves_rollups(self, client, auth_headers, test_maintenance_request):
+        """Тест: удаление заявки убирает ее из агрегатов"""
+        client.delete(f"/api/maintenance-requests/{test_maintenance_request.id}", headers=auth_headers)
+
+        response = client.get(f"/api/analytics/maintenance-requests/daily?{self.period}", headers=auth_headers)
+
+        assert response.json() == []
+
+    def test_incident_rollups(self, client, auth_headers, test_incident):
+        """Тест агрегатов по инцидентам: количество по самолету и время разрешения по специалисту КК"""
+        aircraft_id = test_incident.aircraft_id
+        qc_id = test_incident.quality_control_specialist_id
+        client.put(
+            f"/api/incidents/{test_incident.id}/resolve",
+            json={"resolution_summary": "Инструмент найден"},
+            headers=auth_headers
+        )
+
+        weekly = client.get(f"/api/analytics/incidents/weekly-by-aircraft?{self.period}", headers=auth_headers).json()
+        assert sum(item["count"] for item in weekly if item["aircraft_id"] == aircraft_id) == 1
+
+        resolution = client.get(f"/api/analytics/incidents/resolution-by-qc?{self.period}", headers=auth_headers).json()
+        assert resolution[0]["quality_control_specialist_id"] == qc_id
+        assert resolution[0]["resolved_count"] == 1
+        assert resolution[0]["avg_resolution_time_seconds"] >= 0
+
+    def test_reopened_incident_resolution_counted_once(self, client, auth_headers, test_incident):
+        """Тест: повторное разрешение после возврата в работу не учитывается дважды"""
+        client.put(
+            f"/api/incidents/{test_incident.id}/resolve",
+            json={"resolution_summary": "Инструмент найден"},
+            headers=auth_headers
+        )
+        client.put(f"/api/incidents/{test_incident.id}", json={"status": "INVESTIGATING"}, headers=auth_headers)
+        reopened = client.get(f"/api/analytics/incidents/resolution-by-qc?{self.period}", headers=auth_headers).json()
+        assert reopened == []
+
+        client.put(
+            f"/api/incidents/{test_incident.id}/resolve",
+            json={"resolution_summary": "Инструмент найден повторно"},
+            headers=auth_headers
+        )
+        resolution = client.get(f"/api/analytics/incidents/resolution-by-qc?{self.period}", headers=auth_headers).json()
+        assert resolution[0]["resolved_count"] == 1
+
+    def test_deleted_incident_leaves_rollups(self, client, auth_headers, test_incident):
+        """Тест: удаление инцидента убирает его из агрегатов по самолетам и по специалистам КК"""
+        client.put(
+            f"/api/incidents/{test_incident.id}/resolve",
+            json={"resolution_summary": "Инструмент найден"},
+            headers=auth_headers
+        )
+        client.delete(f"/api/incidents/{test_incident.id}", headers=auth_headers)
+
+        weekly = client.get(f"/api/analytics/incidents/weekly-by-aircraft?{self.period}", headers=auth_headers).json()
+        resolution = client.get(f"/api/analytics/incidents/resolution-by-qc?{self.period}", headers=auth_headers).json()
+        assert weekly == []
+        assert resolution == []
+
+    def test_rollups_are_upserted_per_day(self, db_session, test_maintenance_request, test_maintenance_request_with_relations):
+        """Тест: на день и разрез хранится одна строка агрегата"""
+        rollups = db_session.query(DailyRollup).filter(DailyRollup.metric == "maintenance_requests.status").all()
+
+        assert sorted((r.dimension, r.count) for r in rollups) == [("CREATED", 1), ("IN_PROGRESS", 1)]
+
+    def test_invalid_period(self, client, auth_headers):
+        """Тест некорректного периода"""
+        response = client.get(
+            "/api/analytics/maintenance-requests/daily?date_from=2024-02-01&date_to=2024-01-01",
+            headers=auth_headers
+        )
+
+        assert response.status_code == 400
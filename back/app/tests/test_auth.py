@@ -1,5 +1,6 @@
 import pytest
 from app.models import models
+from app.passwords import login_metrics
 
 class TestAuth:
     def test_register_success(self, client):
@@ -44,6 +45,29 @@ class TestAuth:
         assert "access_token" in data
         assert data["token_type"] == "bearer"
 
+    def test_login_rehashes_password_on_cost_change(self, client, db_session, test_user, monkeypatch):
+        """Тест пересчета хэша пароля при входе после смены cost factor"""
+        monkeypatch.setattr("app.passwords.PASSWORD_HASH_ROUNDS", 4)
+        rehashes = login_metrics.rehashes
+
+        response = client.post("/api/auth/login", json={
+            "tab_number": test_user.tab_number,
+            "password": "secret"
+        })
+
+        assert response.status_code == 200
+        db_session.refresh(test_user)
+        assert test_user.password.startswith("$2b$04$")
+        assert login_metrics.rehashes == rehashes + 1
+
+        # Повторный вход проходит по новому хэшу без пересчета
+        response = client.post("/api/auth/login", json={
+            "tab_number": test_user.tab_number,
+            "password": "secret"
+        })
+        assert response.status_code == 200
+        assert login_metrics.rehashes == rehashes + 1
+
     def test_login_wrong_password(self, client, test_user):
         """Тест входа с неправильным паролем"""
         response = client.post("/api/auth/login", json={
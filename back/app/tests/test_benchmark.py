@@ -0,0 +1,47 @@
+from app.ml.benchmark import latency_summary, match_detections, accuracy_delta, compare_with_baseline, stage_weights
+
+
+class TestBenchmark:
+    def test_latency_summary(self):
+        """Тест перцентилей латентности"""
+        summary = latency_summary([float(value) for value in range(1, 101)])
+        assert summary["p50"] == 50.5
+        assert summary["p99"] >= summary["p95"] >= summary["p50"]
+        assert summary["max"] == 100.0
+
+    def test_match_detections(self):
+        """Тест сопоставления детекций с эталоном: учитываются класс и IoU"""
+        baseline = {"boxes": [[0, 0, 10, 10], [20, 20, 30, 30]], "classes": [1, 2], "confs": [0.9, 0.8]}
+        candidate = {"boxes": [[0, 0, 10, 11], [20, 20, 30, 30]], "classes": [1, 3], "confs": [0.85, 0.8]}
+
+        match = match_detections(baseline, candidate)
+        assert match["matched"] == 1
+        assert round(match["conf_deltas"][0], 6) == 0.05
+
+        accuracy = accuracy_delta([baseline], [candidate])
+        assert accuracy["recall"] == 0.5
+        assert accuracy["precision"] == 0.5
+
+    def test_compare_with_baseline(self):
+        """Тест: падение пропускной способности больше допуска считается регрессией"""
+        key = {"model": "segment", "prefer": "openvino", "imgsz": 640, "batch_size": 1}
+        baseline = [{**key, "throughput_ips": 10.0}]
+
+        assert compare_with_baseline([{**key, "throughput_ips": 9.5}], baseline, 0.1) == []
+        regressions = compare_with_baseline([{**key, "throughput_ips": 8.0}], baseline, 0.1)
+        assert regressions[0]["change"] == -0.2
+
+    def test_stage_weights(self, tmp_path):
+        """Тест: веса .pt копируются в каталог экспортов, готовые экспорты используются как есть"""
+        weights = tmp_path / "weights" / "seg.pt"
+        weights.parent.mkdir()
+        weights.write_bytes(b"pt")
+
+        staged = stage_weights(weights, tmp_path / "exports")
+        assert staged == tmp_path / "exports" / "seg.pt"
+        assert staged.read_bytes() == b"pt"
+        assert stage_weights(weights, tmp_path / "exports") == staged
+
+        onnx = tmp_path / "weights" / "seg_640.onnx"
+        assert stage_weights(onnx, tmp_path / "exports") == onnx
+
@@ -1,3 +1,6 @@
+from app.models.models import DailyRollup
+
+
 class TestIncidents:
     def test_mark_request_as_incident(self, client, auth_headers, test_maintenance_request_with_relations):
         """Тест пометки заявки как инцидента через API заявок"""
@@ -92,6 +95,30 @@ class TestIncidents:
         assert "tool_set" in data
         assert "maintenance_request" in data
 
+    def test_get_incident_with_relations_single_query(self, client, auth_headers, test_incident_with_relations, query_counter):
+        """Тест загрузки инцидента со связями одним запросом"""
+        incident_id = test_incident_with_relations.id
+        query_counter.clear()
+        response = client.get(f"/api/incidents/{incident_id}/with-relations", headers=auth_headers)
+        queries_count = len(query_counter)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["maintenance_request"]["id"] == test_incident_with_relations.maintenance_request_id
+        assert data["quality_control_specialist"]["id"] == test_incident_with_relations.quality_control_specialist_id
+        assert queries_count <= 2
+
+    def test_get_all_incidents_with_relations(self, client, auth_headers, test_incident_with_relations):
+        """Тест получения списка инцидентов со связями"""
+        response = client.get("/api/incidents/with-relations", headers=auth_headers)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) == 1
+        assert data[0]["id"] == test_incident_with_relations.id
+        assert data[0]["aircraft"]["id"] == test_incident_with_relations.aircraft_id
+        assert data[0]["tool_set"]["id"] == test_incident_with_relations.tool_set_id
+
     def test_update_incident(self, client, auth_headers, test_incident):
         """Тест обновления инцидента"""
         update_data = {
@@ -138,6 +165,29 @@ class TestIncidents:
         maintenance_request_data = maintenance_request_response.json()
         assert maintenance_request_data["status"] == "COMPLETED"
 
+    def test_resolve_incident_publishes_events(self, client, auth_headers, test_incident):
+        """Тест событий при разрешении инцидента: инцидент и связанная заявка"""
+        resolve_data = {"resolution_summary": "Инструменты заменены"}
+
+        with client.websocket_connect("/api/ws/events", headers=auth_headers) as websocket:
+            assert websocket.receive_json()["type"] == "subscribed"
+
+            response = client.put(
+                f"/api/incidents/{test_incident.id}/resolve",
+                json=resolve_data,
+                headers=auth_headers
+            )
+            assert response.status_code == 200
+
+            incident_event = websocket.receive_json()
+            assert incident_event["type"] == "incident.resolved"
+            assert incident_event["data"]["id"] == test_incident.id
+            assert incident_event["data"]["status"] == "RESOLVED"
+
+            request_event = websocket.receive_json()
+            assert request_event["type"] == "maintenance_request.completed"
+            assert request_event["data"]["id"] == test_incident.maintenance_request_id
+
     def test_close_incident(self, client, auth_headers, test_incident):
         """Тест закрытия инцидента"""
         close_data = {
@@ -167,6 +217,80 @@ class TestIncidents:
         assert "recent_count" in data
         assert isinstance(data["by_status"], dict)
 
+    def test_get_incidents_stats_single_query(self, client, auth_headers, test_incident, query_counter):
+        """Тест статистики: счетчики и среднее время разрешения считаются одним запросом"""
+        resolve_response = client.put(
+            f"/api/incidents/{test_incident.id}/resolve",
+            json={"resolution_summary": "Инструмент найден"},
+            headers=auth_headers
+        )
+        assert resolve_response.json()["resolved_at"] is not None
+
+        query_counter.clear()
+        response = client.get("/api/incidents/stats/summary", headers=auth_headers)
+        queries_count = len(query_counter)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 1
+        assert data["by_status"]["RESOLVED"] == 1
+        assert data["by_status"]["OPEN"] == 0
+        assert data["recent_count"] == 1
+        assert data["avg_resolution_time_seconds"] >= 0
+        # Пользователь из токена + один агрегирующий запрос
+        assert queries_count <= 2
+
+    def test_reopen_incident_clears_resolved_at(self, client, auth_headers, test_incident):
+        """Тест сброса даты разрешения при возврате инцидента в работу"""
+        client.put(
+            f"/api/incidents/{test_incident.id}/resolve",
+            json={"resolution_summary": "Инструмент найден"},
+            headers=auth_headers
+        )
+        response = client.put(
+            f"/api/incidents/{test_incident.id}",
+            json={"status": "INVESTIGATING"},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        assert response.json()["resolved_at"] is None
+
+    def test_update_legacy_resolved_incident_keeps_resolved_at_empty(self, client, auth_headers, db_session, test_incident):
+        """Тест: правка инцидента, разрешенного до появления resolved_at, не придумывает дату разрешения"""
+        test_incident.status = "RESOLVED"
+        db_session.commit()
+
+        for payload in ({"comments": "Уточнение"}, {"status": "RESOLVED"}):
+            response = client.put(f"/api/incidents/{test_incident.id}", json=payload, headers=auth_headers)
+            assert response.status_code == 200
+            assert response.json()["resolved_at"] is None
+        closed = client.put(
+            f"/api/incidents/{test_incident.id}/close",
+            json={"resolution_summary": "Закрыт"},
+            headers=auth_headers
+        )
+        assert closed.json()["resolved_at"] is None
+
+        stats = client.get("/api/incidents/stats/summary", headers=auth_headers).json()
+        assert stats["avg_resolution_time_seconds"] is None
+        assert db_session.query(DailyRollup).filter(DailyRollup.metric == "incidents.resolved").count() == 0
+
+    def test_close_resolved_incident_keeps_resolved_at(self, client, auth_headers, test_incident):
+        """Тест: закрытие разрешенного инцидента не сдвигает дату разрешения"""
+        resolved = client.put(
+            f"/api/incidents/{test_incident.id}/resolve",
+            json={"resolution_summary": "Инструмент найден"},
+            headers=auth_headers
+        ).json()
+        closed = client.put(
+            f"/api/incidents/{test_incident.id}/close",
+            json={"resolution_summary": "Закрыт"},
+            headers=auth_headers
+        ).json()
+
+        assert closed["resolved_at"] == resolved["resolved_at"]
+
     def test_incidents_unauthorized_access(self, client):
         """Тест доступа к API без аутентификации"""
         responses = [
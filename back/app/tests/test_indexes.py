@@ -0,0 +1,64 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select, text
+
+from app.api.incidents import _filter_incidents
+from app.api.maintenance_requests import _filter_maintenance_requests
+from app.models.models import MaintenanceRequest, Incident, MaintenanceRequestStatus, IncidentStatus
+from app.pagination import paginate, encode_cursor
+
+
+def explain(db_session, query) -> str:
+    """План SQLite для запроса (EXPLAIN QUERY PLAN), одной строкой"""
+    connection = db_session.connection()
+    compiled = query.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True})
+    rows = connection.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).fetchall()
+    return "\n".join(row[-1] for row in rows)
+
+
+def assert_uses_index(plan: str, table: str, index_name: str):
+    assert f"{table} USING INDEX {index_name}" in plan or f"{table} USING COVERING INDEX {index_name}" in plan, plan
+
+
+class TestListIndexes:
+    @pytest.mark.parametrize("filters, index_name", [
+        ({}, "ix_maintenance_requests_created_at_id"),
+        ({"status": MaintenanceRequestStatus.CREATED}, "ix_maintenance_requests_status_created_at_id"),
+        ({"aircraft_id": 1}, "ix_maintenance_requests_aircraft_id_created_at_id"),
+        ({"aviation_engineer_id": 1}, "ix_maintenance_requests_aviation_engineer_id_created_at_id"),
+        ({"date_from": datetime(2024, 1, 1), "date_to": datetime(2024, 2, 1)}, "ix_maintenance_requests_created_at_id"),
+    ])
+    def test_maintenance_request_list_filters_use_index(self, db_session, filters, index_name):
+        """Тест: каждый фильтр списка заявок обслуживается индексом"""
+        params = {"status": None, "aircraft_id": None, "aviation_engineer_id": None, "date_from": None, "date_to": None}
+        params.update(filters)
+        query = paginate(
+            _filter_maintenance_requests(select(MaintenanceRequest), **params),
+            MaintenanceRequest, skip=0, limit=100
+        )
+
+        assert_uses_index(explain(db_session, query), "maintenance_requests", index_name)
+
+    @pytest.mark.parametrize("filters, index_name", [
+        ({}, "ix_incidents_created_at_id"),
+        ({"status": IncidentStatus.OPEN}, "ix_incidents_status_created_at_id"),
+        ({"aviation_engineer_id": 1}, "ix_incidents_aviation_engineer_id_created_at_id"),
+        ({"quality_control_specialist_id": 1}, "ix_incidents_quality_control_specialist_id_created_at_id"),
+    ])
+    def test_incident_list_filters_use_index(self, db_session, filters, index_name):
+        """Тест: каждый фильтр списка инцидентов обслуживается индексом"""
+        params = {"status": None, "aviation_engineer_id": None, "quality_control_specialist_id": None}
+        params.update(filters)
+        query = paginate(_filter_incidents(select(Incident), **params), Incident, skip=0, limit=100)
+
+        assert_uses_index(explain(db_session, query), "incidents", index_name)
+
+    def test_cursor_page_uses_index(self, db_session):
+        """Тест: страница по курсору ищется по индексу (created_at, id), без полного сканирования"""
+        cursor = encode_cursor(datetime(2024, 1, 1, 10, 0, 0), 42)
+        query = paginate(select(MaintenanceRequest), MaintenanceRequest, skip=0, limit=20, cursor=cursor)
+
+        plan = explain(db_session, query)
+        assert_uses_index(plan, "maintenance_requests", "ix_maintenance_requests_created_at_id")
+        assert "TEMP B-TREE" not in plan
@@ -1,4 +1,8 @@
 import pytest
+from datetime import datetime, timedelta
+from starlette.websockets import WebSocketDisconnect
+
+from app.models.models import MaintenanceRequest
 
 class TestMaintenanceRequests:
     def test_create_maintenance_request_success(self, client, auth_headers, test_aircraft, test_warehouse_employee):
@@ -66,6 +70,37 @@ class TestMaintenanceRequests:
         assert response.status_code == 400
         assert "not an aviation engineer" in response.json()["detail"]
 
+    def test_create_maintenance_request_validates_in_one_query(self, client, auth_headers, test_aircraft, test_warehouse_employee, test_aviation_engineer, test_tool_set, query_counter):
+        """Тест: все ссылки заявки проверяются одним запросом"""
+        maintenance_request_data = {
+            "aircraft_id": test_aircraft.id,
+            "warehouse_employee_id": test_warehouse_employee.id,
+            "aviation_engineer_id": test_aviation_engineer.id,
+            "tool_set_id": test_tool_set.id,
+            "description": "ТО в начале смены",
+            "status": "CREATED"
+        }
+        query_counter.clear()
+
+        response = client.post("/api/maintenance-requests/", json=maintenance_request_data, headers=auth_headers)
+
+        assert response.status_code == 201
+        validation_queries = [statement for statement in query_counter if "FROM aircraft" in statement]
+        assert len(validation_queries) == 1
+        assert "FROM tool_sets" in validation_queries[0]
+        assert not any("FROM tool_sets" in statement for statement in query_counter if statement not in validation_queries)
+
+    def test_update_maintenance_request_invalid_tool_set(self, client, auth_headers, test_maintenance_request):
+        """Тест обновления заявки с несуществующим набором инструментов"""
+        response = client.put(
+            f"/api/maintenance-requests/{test_maintenance_request.id}",
+            json={"tool_set_id": 9999},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Tool set not found"
+
     def test_get_all_maintenance_requests(self, client, auth_headers, test_maintenance_request):
         """Тест получения всех заявок на ТО"""
         response = client.get("/api/maintenance-requests/", headers=auth_headers)
@@ -75,6 +110,40 @@ class TestMaintenanceRequests:
         assert isinstance(data, list)
         assert len(data) >= 1
 
+    def test_get_maintenance_requests_cursor_pagination(self, client, auth_headers, db_session, test_aircraft, test_warehouse_employee):
+        """Тест keyset-пагинации: страницы по курсору без пропусков и повторов при одинаковом created_at"""
+        same_time = datetime(2024, 1, 1, 10, 0, 0)
+        for i in range(5):
+            db_session.add(MaintenanceRequest(
+                aircraft_id=test_aircraft.id,
+                warehouse_employee_id=test_warehouse_employee.id,
+                description=f"Заявка {i}",
+                created_at=same_time if i < 3 else same_time + timedelta(days=i)
+            ))
+        db_session.commit()
+
+        all_response = client.get("/api/maintenance-requests/", headers=auth_headers)
+        expected_ids = [item["id"] for item in all_response.json()]
+        assert len(expected_ids) == 5
+
+        ids, cursor = [], None
+        while True:
+            url = "/api/maintenance-requests/?limit=2" + (f"&cursor={cursor}" if cursor else "")
+            response = client.get(url, headers=auth_headers)
+            assert response.status_code == 200
+            ids.extend(item["id"] for item in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+
+        assert ids == expected_ids
+
+    def test_get_maintenance_requests_invalid_cursor(self, client, auth_headers):
+        """Тест передачи некорректного курсора"""
+        response = client.get("/api/maintenance-requests/?cursor=not-a-cursor", headers=auth_headers)
+
+        assert response.status_code == 400
+
     def test_get_maintenance_requests_with_filters(self, client, auth_headers, test_maintenance_request):
         """Тест получения заявок с фильтрами"""
         # Фильтр по статусу - используем строковое значение enum
@@ -204,6 +273,80 @@ class TestMaintenanceRequests:
         assert response.status_code == 400
         assert "associated incident" in response.json()["detail"]
 
+    def test_get_maintenance_request_with_relations_single_query(self, client, auth_headers, test_maintenance_request_with_relations, query_counter):
+        """Тест загрузки заявки со связями одним запросом"""
+        request_id = test_maintenance_request_with_relations.id
+        query_counter.clear()
+        response = client.get(f"/api/maintenance-requests/{request_id}/with-relations", headers=auth_headers)
+        queries_count = len(query_counter)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["aircraft"]["id"] == test_maintenance_request_with_relations.aircraft_id
+        assert data["warehouse_employee"]["id"] == test_maintenance_request_with_relations.warehouse_employee_id
+        assert data["aviation_engineer"]["id"] == test_maintenance_request_with_relations.aviation_engineer_id
+        assert data["tool_set"]["id"] == test_maintenance_request_with_relations.tool_set_id
+        # Пользователь из токена + заявка со всеми связями
+        assert queries_count <= 2
+
+    def test_get_all_maintenance_requests_with_relations(self, client, auth_headers, db_session, test_maintenance_request_with_relations, query_counter):
+        """Тест списка заявок со связями: число запросов не зависит от размера страницы"""
+        for i in range(5):
+            db_session.add(MaintenanceRequest(
+                aircraft_id=test_maintenance_request_with_relations.aircraft_id,
+                warehouse_employee_id=test_maintenance_request_with_relations.warehouse_employee_id,
+                aviation_engineer_id=test_maintenance_request_with_relations.aviation_engineer_id,
+                tool_set_id=test_maintenance_request_with_relations.tool_set_id,
+                description=f"Заявка {i}",
+                status="IN_PROGRESS"
+            ))
+        db_session.commit()
+        aircraft_id = test_maintenance_request_with_relations.aircraft_id
+
+        query_counter.clear()
+        response = client.get("/api/maintenance-requests/with-relations", headers=auth_headers)
+        queries_count = len(query_counter)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) == 6
+        for item in data:
+            assert item["aircraft"]["id"] == aircraft_id
+            assert item["aviation_engineer"] is not None
+            assert item["tool_set"] is not None
+        # Пользователь из токена + один запрос с JOIN вместо 1 + 4N
+        assert queries_count <= 2
+
+    def test_create_maintenance_request_publishes_event(self, client, auth_headers, test_aircraft, test_warehouse_employee):
+        """Тест рассылки события о создании заявки подписчикам WebSocket"""
+        maintenance_request_data = {
+            "aircraft_id": test_aircraft.id,
+            "warehouse_employee_id": test_warehouse_employee.id,
+            "description": "Заявка для проверки событий",
+            "status": "CREATED"
+        }
+
+        token = auth_headers["Authorization"].split()[1]
+        with client.websocket_connect(f"/api/ws/events?entities=maintenance_request&token={token}") as websocket:
+            assert websocket.receive_json()["type"] == "subscribed"
+
+            response = client.post("/api/maintenance-requests/", json=maintenance_request_data, headers=auth_headers)
+            assert response.status_code == 201
+
+            event = websocket.receive_json()
+            assert event["type"] == "maintenance_request.created"
+            assert event["entity"] == "maintenance_request"
+            assert event["data"]["id"] == response.json()["id"]
+            assert event["data"]["status"] == "CREATED"
+
+    def test_events_websocket_requires_token(self, client):
+        """Тест: канал событий без действительного токена закрывается с кодом 1008"""
+        for url in ("/api/ws/events", "/api/ws/events?token=invalid"):
+            with pytest.raises(WebSocketDisconnect) as disconnect:
+                with client.websocket_connect(url) as websocket:
+                    websocket.receive_json()
+            assert disconnect.value.code == 1008
+
     def test_maintenance_requests_unauthorized_access(self, client):
         """Тест доступа к API без аутентификации"""
         responses = [
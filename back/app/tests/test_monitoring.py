@@ -0,0 +1,155 @@
+import asyncio
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine, exc
+from sqlalchemy.pool import QueuePool
+
+from app.database import PoolMetrics, make_instrumented_pool, attach_pool_listeners, get_pool_stats
+from app.api import dependencies, monitoring, websocket
+from app.metrics import Histogram, Counter, Metric, QUEUE_DEPTH
+from app.ml import predict_yolo_seg_prod
+from app.ws_loadtest import load_frames
+
+class TestMonitoring:
+    def test_get_db_pool_stats(self, client, admin_headers):
+        """Тест получения статистики пула соединений"""
+        response = client.get("/api/monitoring/db-pool", headers=admin_headers)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert "sync" in data
+        assert "async" in data
+        assert "checkouts" in data["sync"]
+        assert "timeouts" in data["async"]
+        assert "statement_timeout_ms" in data["settings"]
+
+    def test_get_auth_stats(self, client, test_user, admin_headers):
+        """Тест статистики входов и пула хэширования паролей"""
+        client.post("/api/auth/login", json={"tab_number": test_user.tab_number, "password": "wrong"})
+
+        response = client.get("/api/monitoring/auth", headers=admin_headers)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["login_failures"] >= 1
+        assert data["hash_operations"] >= 1
+        assert data["in_flight"] == 0
+        assert data["workers"] > 0
+
+    def test_metrics_endpoint(self, client, auth_headers, admin_headers, test_aircraft):
+        """Тест выдачи метрик: латентность по шаблону маршрута и SQL-запросы на запрос"""
+        client.get(f"/api/aircraft/{test_aircraft.id}", headers=auth_headers)
+
+        response = client.get("/metrics", headers=admin_headers)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        body = response.text
+        assert 'http_request_duration_seconds_count{method="GET",route="/api/aircraft/{aircraft_id}",status="200"}' in body
+        assert 'http_request_db_queries_bucket{method="GET",route="/api/aircraft/{aircraft_id}",le="+Inf"}' in body
+        assert 'db_query_duration_seconds_count{engine="sync"}' in body
+        assert 'queue_depth{queue="ws_video_frames"} 0' in body
+        assert "# TYPE inference_stage_duration_seconds histogram" in body
+        assert "process_cpu_seconds_total " in body
+
+    def test_queue_depth_counts_frames_in_flight(self, tmp_path, monkeypatch):
+        """Тест: gauge очереди кадров видит кадры, которые обрабатываются в этот момент"""
+        monkeypatch.setattr(predict_yolo_seg_prod, "INFERENCE_STUB_MS", 100.0)
+        monkeypatch.setattr(websocket, "FRAME_PATH", tmp_path / "output.jpg")
+        video_manager = websocket.ConnectionManager()
+        monkeypatch.setattr(monitoring, "manager", video_manager)
+        frame = load_frames(None, 64, 48, 90)[0]
+
+        class FakeWebSocket:
+            async def accept(self):
+                pass
+
+            async def send_text(self, payload):
+                pass
+
+        async def scenario():
+            for client_id in ("first", "second"):
+                await video_manager.connect(FakeWebSocket(), client_id)
+            message = {"type": "video_frame", "frame": frame}
+            frames = [asyncio.create_task(video_manager.handle_video_frame(client_id, message))
+                      for client_id in ("first", "second")]
+            await asyncio.sleep(0.05)
+            monitoring.collect_state_metrics()
+            during = QUEUE_DEPTH.samples()
+            await asyncio.gather(*frames)
+            return during
+
+        assert 'queue_depth{queue="ws_video_frames"} 2' in asyncio.run(scenario())
+
+    def test_monitoring_requires_admin(self, client, auth_headers):
+        """Тест закрытия статистики и метрик от анонимных и обычных пользователей"""
+        for path in ("/api/monitoring/db-pool", "/api/monitoring/auth", "/metrics"):
+            assert client.get(path).status_code == 401
+            response = client.get(path, headers=auth_headers)
+            assert response.status_code == 403
+            assert response.json()["detail"] == "Not enough permissions"
+
+    def test_metrics_token(self, client, monkeypatch):
+        """Тест доступа сборщика метрик по METRICS_TOKEN"""
+        monkeypatch.setattr(dependencies, "METRICS_TOKEN", "scrape-secret")
+
+        assert client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"}).status_code == 200
+        assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+        assert client.get("/api/monitoring/auth", headers={"Authorization": "Bearer scrape-secret"}).status_code == 401
+
+    def test_incomplete_metric_fails_on_creation(self):
+        """Тест: подкласс Metric без samples не создается"""
+        class Incomplete(Metric):
+            type = "gauge"
+
+        with pytest.raises(TypeError):
+            Incomplete("incomplete", "Метрика без samples")
+
+    def test_histogram_and_counter_exposition(self):
+        """Тест текстового формата гистограммы и счетчика"""
+        histogram = Histogram("test_seconds", "Тестовая гистограмма", ("stage",), buckets=(0.1, 1.0))
+        histogram.observe(0.05, stage="decode")
+        histogram.observe(0.5, stage="decode")
+        histogram.observe(5, stage="decode")
+        counter = Counter("test_total", "Тестовый счетчик", ("model",))
+        counter.inc(model='seg"ment')
+
+        assert histogram.samples() == [
+            'test_seconds_bucket{stage="decode",le="0.1"} 1',
+            'test_seconds_bucket{stage="decode",le="1.0"} 2',
+            'test_seconds_bucket{stage="decode",le="+Inf"} 3',
+            'test_seconds_sum{stage="decode"} 5.55',
+            'test_seconds_count{stage="decode"} 3',
+        ]
+        assert counter.samples() == ['test_total{model="seg\\"ment"} 1']
+
+    def test_instrumented_pool_counts_waits_and_timeouts(self):
+        """Тест учета ожидания и таймаутов пула при исчерпании соединений"""
+        metrics = PoolMetrics()
+        path = os.path.join(tempfile.gettempdir(), f"aflt_pool_test_{os.getpid()}.db")
+        pool_engine = create_engine(
+            f"sqlite:///{path}",
+            poolclass=make_instrumented_pool(QueuePool, metrics),
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.05
+        )
+        attach_pool_listeners(pool_engine, metrics)
+        try:
+            connection = pool_engine.connect()
+            with pytest.raises(exc.TimeoutError):
+                pool_engine.connect()
+            connection.close()
+
+            stats = get_pool_stats(pool_engine, metrics)
+            assert stats["pool_class"] == "InstrumentedQueuePool"
+            assert stats["checkouts"] == 1
+            assert stats["checkins"] == 1
+            assert stats["timeouts"] == 1
+            assert stats["wait_seconds_max"] >= 0.05
+        finally:
+            pool_engine.dispose()
+            if os.path.exists(path):
+                os.remove(path)
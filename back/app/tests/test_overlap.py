@@ -0,0 +1,152 @@
+import time
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+
+from app.ml import predict_yolo_seg_prod
+from app.ml.overlap import OverlapCascade, obb_intersections, pack_masks, mask_intersections, pairwise_overlap
+
+
+def obb_row(x1, y1, x2, y2, size=100):
+    """Осевой прямоугольник в формате строки OBB (нормированные координаты)"""
+    return [0] + [value / size for value in (x1, y1, x2, y1, x2, y2, x1, y2)]
+
+
+def masks_for(rects, size=100):
+    masks = np.zeros((len(rects), size, size), dtype=np.uint8)
+    for mask, (x1, y1, x2, y2) in zip(masks, rects):
+        mask[y1:y2, x1:x2] = 1
+    return masks
+
+
+def random_scene(count, size=1000, seed=0):
+    """Повернутые прямоугольники и их маски на сетке 640x640"""
+    rng = np.random.default_rng(seed)
+    polygons = np.array([
+        cv2.boxPoints((tuple(rng.uniform(100, size - 100, 2)), tuple(rng.uniform(30, 300, 2)), rng.uniform(0, 180)))
+        for _ in range(count)
+    ], dtype=np.float64)
+    masks = np.zeros((count, 640, 640), dtype=np.uint8)
+    for mask, polygon in zip(masks, polygons):
+        cv2.fillPoly(mask, [np.round(polygon * 640 / size).astype(np.int32)], 1)
+    rows = [[0, *(polygon / size).reshape(-1)] for polygon in polygons]
+    return polygons, rows, masks
+
+
+class TestOverlapGeometry:
+    def test_obb_intersections_match_opencv(self):
+        """Тест: векторизованные площади пересечения OBB совпадают с cv2.intersectConvexConvex"""
+        polygons, _, _ = random_scene(30)
+        inter, areas = obb_intersections(polygons)
+
+        expected = np.diag(areas)
+        for i in range(len(polygons)):
+            for j in range(i + 1, len(polygons)):
+                area, _ = cv2.intersectConvexConvex(polygons[i].astype(np.float32), polygons[j].astype(np.float32))
+                expected[i, j] = expected[j, i] = area
+        assert np.allclose(inter, expected, rtol=1e-4, atol=1e-3)
+        assert (inter > 0).sum() > len(polygons)
+
+    def test_obb_shared_edges(self):
+        """Тест: совпадающие OBB, соседние по ребру и вложенные"""
+        square = np.array([[[0, 0], [10, 0], [10, 10], [0, 10]]], dtype=np.float64)
+        polygons = np.concatenate([square, square, square + [10, 0], square * 0.5 + 2])
+        inter, _ = obb_intersections(polygons)
+
+        assert inter[0, 1] == 100.0
+        assert inter[0, 2] == 0.0
+        assert inter[0, 3] == 25.0
+
+    def test_mask_intersections_exact(self):
+        """Тест: пересечения упакованных масок равны числу общих ячеек сетки"""
+        _, _, masks = random_scene(30)
+        packed, boxes = pack_masks(masks)
+        inter, areas = mask_intersections(packed, boxes)
+
+        sampled = (masks[:, ::7, ::7] > 0).reshape(len(masks), -1).astype(np.int64)
+        assert (inter == sampled @ sampled.T).all()
+        assert (areas == sampled.sum(axis=1)).all()
+
+    def test_pairs(self):
+        """Тест: пары пересекающихся инстансов с IoU и долей пересечения от меньшего"""
+        rects = [(0, 0, 60, 60), (40, 40, 60, 60), (80, 80, 90, 90)]
+        overlap = pairwise_overlap([obb_row(*r) for r in rects], masks_for(rects), (100, 100))
+
+        assert overlap.mask_iou[0, 0] == 1.0
+        [pair] = overlap.pairs()
+        assert pair["pair"] == [0, 1]
+        assert pair["obb_overlap"] == pair["mask_overlap"] == 1.0
+        assert pair["obb_iou"] == round(400 / 3600, 4)
+
+    def test_cascade_decisions(self):
+        """Тест: раздельные инструменты и явное пересечение масок решаются без классификатора"""
+        cascade = OverlapCascade(clean_max=0.02, mask_min=0.3)
+        separate = [(0, 0, 20, 20), (50, 50, 70, 70)]
+        crossing = [(0, 0, 60, 60), (20, 20, 80, 80)]
+
+        def decide(rects, masks):
+            return cascade.decide(pairwise_overlap([obb_row(*r) for r in rects], masks, (100, 100)))
+
+        assert decide(separate, masks_for(separate)) == (False, 0.0)
+        verdict, score = decide(crossing, masks_for(crossing))
+        assert verdict is True and score > 0.3
+
+        # OBB пересекаются, маски - нет (нижний инструмент закрыт верхним): решает классификатор
+        assert decide(crossing, masks_for([(0, 0, 60, 60), (64, 64, 80, 80)]))[0] is None
+        assert OverlapCascade(enabled=False).decide(pairwise_overlap([], None, (100, 100))) == (None, 0.0)
+
+    def test_single_instance(self):
+        """Тест: один инстанс - пар нет, вердикт за классификатором (инструменты могли слиться в одну маску)"""
+        overlap = pairwise_overlap([obb_row(0, 0, 10, 10)], masks_for([(0, 0, 10, 10)]), (100, 100))
+
+        assert overlap.max_obb_overlap == overlap.max_mask_overlap == 0.0
+        assert overlap.pairs() == []
+        assert OverlapCascade().decide(overlap) == (None, 0.0)
+        assert OverlapCascade().decide(pairwise_overlap([], None, (100, 100))) == (None, 0.0)
+
+    @pytest.mark.perf
+    def test_pairwise_overlap_latency(self):
+        """Тест: попарное перекрытие 30 инстансов с масками 640x640 (как в API) считается быстрее 3 мс"""
+        _, rows, masks = random_scene(30)
+
+        timings = []
+        for _ in range(50):
+            start = time.perf_counter()
+            pairwise_overlap(rows, masks, (640, 640))
+            timings.append(time.perf_counter() - start)
+        # Измерено на одном ядре CPU: ~1.6-2 мс на 30 инстансов (~2.7-3 мс на 40), из них около
+        # 0.5 мс - прореживание масок до сетки и около 0.5 мс - пересечения OBB. Порог с запасом,
+        # зависит от загрузки машины - только при PERF_TESTS=1
+        assert np.median(timings) < 0.003
+
+    def test_classifier_only_for_ambiguous(self):
+        """Тест: классификатор перекрытия вызывается только при неоднозначной геометрии"""
+        calls = []
+        classifier = SimpleNamespace(predict=lambda img, threshold=None: calls.append(img) or (True, 0.9, "overlap"))
+
+        def segmenter(rects):
+            result = SimpleNamespace(masks=SimpleNamespace(data=masks_for(rects)))
+            return SimpleNamespace(r=result, _get_img_hw=lambda: (100, 100), obb_instance_indices=list(range(len(rects))))
+
+        separate = [(0, 0, 20, 20), (50, 50, 70, 70)]
+        assert predict_yolo_seg_prod.predict_overlap(
+            segmenter(separate), classifier, "tray.jpg", [obb_row(*r) for r in separate]
+        ) == (False, 0.0, [])
+        assert calls == []
+
+        rows = [obb_row(0, 0, 60, 60), obb_row(20, 20, 80, 80)]
+        flag, score, pairs = predict_yolo_seg_prod.predict_overlap(
+            segmenter([(0, 0, 60, 60), (64, 64, 80, 80)]), classifier, "tray.jpg", rows
+        )
+        assert (flag, score) == (True, 0.9)
+        assert pairs[0]["pair"] == [0, 1] and pairs[0]["mask_iou"] == 0.0
+        assert calls == ["tray.jpg"]
+
+        # Один инстанс (два инструмента, сегментированные одной маской) - решает классификатор
+        blob = [(0, 0, 80, 60)]
+        assert predict_yolo_seg_prod.predict_overlap(
+            segmenter(blob), classifier, "blob.jpg", [obb_row(*r) for r in blob]
+        ) == (True, 0.9, [])
+        assert calls == ["tray.jpg", "blob.jpg"]
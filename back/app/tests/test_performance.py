@@ -0,0 +1,213 @@
+import time
+
+import pytest
+from sqlalchemy import insert
+
+from app.api.tool_types import tool_type_tree_cache
+from app.models import models
+
+# Объемы данных, близкие к рабочим
+AIRCRAFT_COUNT = 2000
+MAINTENANCE_REQUEST_COUNT = 3000
+INCIDENT_COUNT = 1500
+TOOL_SET_COUNT = 500
+TOOL_SET_TYPE_COUNT = 600
+USERS_PER_ROLE = 20
+
+SMALL_PAGE = 10
+LARGE_PAGE = 500
+
+# Верхняя граница времени ответа на SQLite - ловит деградации на порядок, а не колебания
+# (проверяется только в тестах @pytest.mark.perf, см. conftest.py)
+LATENCY_LIMIT_SECONDS = 2.0
+
+LIST_ENDPOINTS = [
+    # (URL, максимальное число SQL-запросов на страницу любого размера)
+    ("/api/aircraft/", 1),
+    ("/api/maintenance-requests/", 1),
+    ("/api/maintenance-requests/with-relations", 1),
+    ("/api/incidents/", 1),
+    ("/api/incidents/with-relations", 1),
+    ("/api/tool-types/", 1),
+    ("/api/tool-set-types/", 1),
+    ("/api/tool-sets/", 1),
+]
+
+SUMMARY_ENDPOINTS = [
+    ("/api/maintenance-requests/stats/summary", 1),
+    ("/api/incidents/stats/summary", 1),
+    ("/api/analytics/maintenance-requests/daily", 1),
+    ("/api/analytics/incidents/weekly-by-aircraft", 1),
+    ("/api/analytics/incidents/resolution-by-qc", 1),
+]
+
+
+def _insert(db_session, model, rows):
+    """Массовая вставка без ORM: заполнение тысяч строк занимает доли секунды"""
+    result = db_session.execute(insert(model).returning(model.id), rows)
+    return [row.id for row in result]
+
+
+def _seed_tool_type_tree(db_session, depth: int, breadth: int, prefix: str):
+    """Дерево категорий заданной глубины: на каждом уровне breadth категорий и breadth инструментов"""
+    parents = [None]
+    item_ids = []
+    for level in range(depth):
+        next_parents = []
+        for parent_index, parent_id in enumerate(parents):
+            categories = [
+                {"name": f"{prefix}-cat-{level}-{parent_index}-{i}", "category_id": parent_id, "is_item": False}
+                for i in range(breadth)
+            ]
+            items = [
+                {"name": f"{prefix}-item-{level}-{parent_index}-{i}", "category_id": parent_id, "is_item": True,
+                 "tool_class": models.ToolClass.OTVERTKA_PLUS}
+                for i in range(breadth)
+            ]
+            next_parents.extend(_insert(db_session, models.ToolType, categories))
+            item_ids.extend(_insert(db_session, models.ToolType, items))
+        # Вглубь продолжаем только первую ветку, чтобы объем рос линейно с глубиной
+        parents = next_parents[:1]
+    db_session.commit()
+    return item_ids
+
+
+@pytest.fixture
+def perf_data(db_session):
+    """Тысячи самолетов, заявок, инцидентов и наборов инструментов"""
+    users = {}
+    for role in (models.Role.WAREHOUSE_EMPLOYEE, models.Role.AVIATION_ENGINEER, models.Role.QUALITY_CONTROL_SPECIALIST):
+        users[role] = _insert(db_session, models.User, [
+            {"tab_number": f"{role.value}-{i}", "full_name": f"User {i}", "password": "x", "role": role}
+            for i in range(USERS_PER_ROLE)
+        ])
+
+    aircraft_ids = _insert(db_session, models.Aircraft, [
+        {"tail_number": f"RA-{i:05d}", "model": "A320", "year_of_manufacture": 2000 + i % 25}
+        for i in range(AIRCRAFT_COUNT)
+    ])
+
+    tool_type_ids = _seed_tool_type_tree(db_session, depth=10, breadth=30, prefix="perf")
+    tool_set_type_ids = _insert(db_session, models.ToolSetType, [
+        {"name": f"Набор {i}", "tool_type_ids": tool_type_ids[i % 10:i % 10 + 10]}
+        for i in range(TOOL_SET_TYPE_COUNT)
+    ])
+    db_session.execute(insert(models.tool_set_type_tool_types), [
+        {"tool_set_type_id": tool_set_type_id, "tool_type_id": tool_type_id}
+        for i, tool_set_type_id in enumerate(tool_set_type_ids)
+        for tool_type_id in tool_type_ids[i % 10:i % 10 + 10]
+    ])
+    tool_set_ids = _insert(db_session, models.ToolSet, [
+        {"tool_set_type_id": tool_set_type_ids[i % TOOL_SET_TYPE_COUNT], "batch_number": f"B-{i:05d}", "batch_map": {}}
+        for i in range(TOOL_SET_COUNT)
+    ])
+
+    statuses = list(models.MaintenanceRequestStatus)
+    request_ids = _insert(db_session, models.MaintenanceRequest, [
+        {
+            "aircraft_id": aircraft_ids[i % AIRCRAFT_COUNT],
+            "warehouse_employee_id": users[models.Role.WAREHOUSE_EMPLOYEE][i % USERS_PER_ROLE],
+            "aviation_engineer_id": users[models.Role.AVIATION_ENGINEER][i % USERS_PER_ROLE],
+            "tool_set_id": tool_set_ids[i % TOOL_SET_COUNT],
+            "description": f"Заявка {i}",
+            "status": statuses[i % len(statuses)],
+        }
+        for i in range(MAINTENANCE_REQUEST_COUNT)
+    ])
+    _insert(db_session, models.Incident, [
+        {
+            "aviation_engineer_id": users[models.Role.AVIATION_ENGINEER][i % USERS_PER_ROLE],
+            "quality_control_specialist_id": users[models.Role.QUALITY_CONTROL_SPECIALIST][i % USERS_PER_ROLE],
+            "aircraft_id": aircraft_ids[i % AIRCRAFT_COUNT],
+            "tool_set_id": tool_set_ids[i % TOOL_SET_COUNT],
+            "maintenance_request_id": request_ids[i],
+        }
+        for i in range(INCIDENT_COUNT)
+    ])
+    db_session.commit()
+    return {"tool_set_type_ids": tool_set_type_ids, "tool_type_ids": tool_type_ids}
+
+
+def measure(client, query_counter, url, headers):
+    """Число SQL-запросов и время ответа; первый запрос прогревает кэш пользователя"""
+    client.get("/api/users/me", headers=headers)
+    tool_type_tree_cache.invalidate()
+    query_counter.clear()
+    start = time.perf_counter()
+    response = client.get(url, headers=headers)
+    elapsed = time.perf_counter() - start
+    assert response.status_code == 200, response.text
+    return len(query_counter), elapsed, response
+
+
+class TestQueryCounts:
+    @pytest.mark.parametrize("url,max_queries", LIST_ENDPOINTS)
+    def test_list_query_count_independent_of_page_size(self, client, auth_headers, perf_data, query_counter, url, max_queries):
+        """Тест: число запросов списка не зависит от размера страницы (нет N+1)"""
+        small_count, _, small = measure(client, query_counter, f"{url}?limit={SMALL_PAGE}", auth_headers)
+        large_count, _, large = measure(client, query_counter, f"{url}?limit={LARGE_PAGE}", auth_headers)
+
+        assert len(small.json()) == SMALL_PAGE
+        assert len(large.json()) == LARGE_PAGE
+        assert large_count == small_count
+        assert large_count <= max_queries
+
+    @pytest.mark.parametrize("url,max_queries", SUMMARY_ENDPOINTS)
+    def test_summary_query_count(self, client, auth_headers, perf_data, query_counter, url, max_queries):
+        """Тест: сводки и аналитика считаются фиксированным числом запросов"""
+        count, _, _ = measure(client, query_counter, url, auth_headers)
+
+        assert count <= max_queries
+
+    def test_tool_type_tree_query_count_independent_of_depth(self, client, auth_headers, db_session, query_counter):
+        """Тест: дерево типов строится одним запросом при любой глубине"""
+        _seed_tool_type_tree(db_session, depth=2, breadth=5, prefix="shallow")
+        shallow_count, _, shallow = measure(client, query_counter, "/api/tool-types/tree/root", auth_headers)
+
+        _seed_tool_type_tree(db_session, depth=12, breadth=5, prefix="deep")
+        deep_count, _, _ = measure(client, query_counter, "/api/tool-types/tree/root", auth_headers)
+
+        assert shallow.json()
+        assert deep_count == shallow_count == 1
+
+    def test_tool_set_type_with_tools_query_count(self, client, auth_headers, db_session, perf_data, query_counter):
+        """Тест: число запросов типа набора с инструментами не зависит от числа инструментов"""
+        small_id, large_id = perf_data["tool_set_type_ids"][:2]
+        tool_type_ids = perf_data["tool_type_ids"]
+        db_session.execute(insert(models.tool_set_type_tool_types), [
+            {"tool_set_type_id": large_id, "tool_type_id": tool_type_id}
+            for tool_type_id in tool_type_ids[20:]
+        ])
+        db_session.commit()
+
+        small_count, _, small = measure(client, query_counter, f"/api/tool-set-types/{small_id}/with-tools", auth_headers)
+        large_count, _, large = measure(client, query_counter, f"/api/tool-set-types/{large_id}/with-tools", auth_headers)
+
+        assert len(large.json()["tool_types"]) > len(small.json()["tool_types"])
+        assert large_count == small_count
+        assert large_count <= 2
+
+
+@pytest.mark.perf
+class TestLatency:
+    @pytest.mark.parametrize("url", [f"{url}?limit={LARGE_PAGE}" for url, _ in LIST_ENDPOINTS]
+                             + [url for url, _ in SUMMARY_ENDPOINTS])
+    def test_endpoint_latency(self, client, auth_headers, perf_data, query_counter, url):
+        """Тест: большая страница списка и сводки отвечают быстрее LATENCY_LIMIT_SECONDS"""
+        _, elapsed, _ = measure(client, query_counter, url, auth_headers)
+
+        assert elapsed < LATENCY_LIMIT_SECONDS
+
+    def test_tool_type_tree_latency(self, client, auth_headers, db_session, query_counter):
+        """Тест: глубокое дерево типов строится быстрее LATENCY_LIMIT_SECONDS"""
+        _seed_tool_type_tree(db_session, depth=12, breadth=5, prefix="deep")
+        _, elapsed, _ = measure(client, query_counter, "/api/tool-types/tree/root", auth_headers)
+
+        assert elapsed < LATENCY_LIMIT_SECONDS
+
+    def test_tool_set_type_with_tools_latency(self, client, auth_headers, perf_data, query_counter):
+        """Тест: тип набора с инструментами отдается быстрее LATENCY_LIMIT_SECONDS"""
+        tool_set_type_id = perf_data["tool_set_type_ids"][0]
+        _, elapsed, _ = measure(client, query_counter, f"/api/tool-set-types/{tool_set_type_id}/with-tools", auth_headers)
+
+        assert elapsed < LATENCY_LIMIT_SECONDS
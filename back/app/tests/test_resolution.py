@@ -0,0 +1,65 @@
+import pytest
+
+from app.ml.predict_yolo_seg_prod import SegmentModel
+from app.ml.resolution import ResolutionPolicy
+
+
+class TestResolutionPolicy:
+    def test_quality_levels(self):
+        """Тест: качество задает наименьший, стандартный или наибольший размер входа"""
+        policy = ResolutionPolicy([960, 480], default=640)
+
+        assert policy.sizes == [480, 640, 960]
+        assert policy.select() == 640
+        assert policy.select(quality="fast") == 480
+        assert policy.select(quality="balanced") == 640
+        assert policy.select(quality="accurate") == 960
+        with pytest.raises(ValueError):
+            policy.select(quality="ultra")
+
+    def test_latency_budget(self):
+        """Тест: по бюджету выбирается наибольший размер, укладывающийся в него"""
+        policy = ResolutionPolicy([480, 960], default=640)
+        assert policy.select(latency_budget_ms=100) == 640  # замеров еще нет
+
+        policy.observe(640, 40.0)
+        # 480 и 960 оцениваются пересчетом по площади входа
+        assert policy.estimate_ms(960) == 90.0
+        assert policy.select(latency_budget_ms=100) == 960
+        assert policy.select(latency_budget_ms=50) == 640
+        assert policy.select(latency_budget_ms=10) == 480
+
+    def test_queue_depth_downshifts(self):
+        """Тест: с ростом очереди инференса разрешение понижается"""
+        policy = ResolutionPolicy([480, 640, 960], default=640)
+        for size, latency in ((480, 20.0), (640, 40.0), (960, 90.0)):
+            policy.observe(size, latency)
+
+        selected = [policy.select(latency_budget_ms=100, queue_depth=depth) for depth in (1, 2, 4, 8)]
+        assert selected == [960, 640, 480, 480]
+
+    def test_observe_smoothing(self):
+        """Тест: задержка сглаживается скользящим средним"""
+        policy = ResolutionPolicy([640], default=640, smoothing=0.5)
+        policy.observe(640, 40.0)
+        policy.observe(640, 80.0)
+
+        assert policy.estimate_ms(640) == 60.0
+        policy.reset()
+        assert policy.estimate_ms(640) is None
+
+
+class TestExportPaths:
+    def test_export_name_includes_imgsz(self, tmp_path):
+        """Тест: у экспортов .pt размер входа в имени для любого размера, включая размер по умолчанию"""
+        model = SegmentModel.__new__(SegmentModel)
+        model.model_path = tmp_path / "seg.pt"
+        model.imgsz = 640
+
+        assert model.onnx_path == tmp_path / "seg_640.onnx"
+        assert model.onnx_path_for(960) == tmp_path / "seg_960.onnx"
+        assert model.openvino_dir == tmp_path / "seg_640_openvino_model"
+        assert model.openvino_dir_for(480) == tmp_path / "seg_480_openvino_model"
+
+        model.model_path = tmp_path / "seg.onnx"
+        assert model.onnx_path_for(960) == tmp_path / "seg.onnx"
@@ -0,0 +1,73 @@
+import cv2
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+from app.ml.tiling import tile_grid, tiled_predict
+
+
+class WhiteObjectsModel:
+    """Модель для тестов: каждый белый связный объект кадра - инстанс класса 0"""
+
+    def predict_images(self, images, batch=None):
+        results = []
+        for image in images:
+            binary = (image[..., 0] > 127).astype(np.uint8)
+            count, labels, stats, _ = cv2.connectedComponentsWithStats(binary)
+            boxes, masks = [], []
+            for label in range(1, count):
+                x, y, w, h = stats[label, :4]
+                boxes.append([x, y, x + w, y + h, 0.9, 0])
+                masks.append(labels == label)
+            if not boxes:
+                results.append(Results(image, path="", names={0: "tool"}))
+                continue
+            results.append(Results(
+                image, path="", names={0: "tool"},
+                boxes=torch.tensor(boxes, dtype=torch.float32),
+                masks=torch.from_numpy(np.stack(masks).astype(np.uint8)),
+            ))
+        return results
+
+
+class TestTiling:
+    def test_tile_grid_covers_image(self):
+        """Тест: тайлы одного размера покрывают изображение и прижаты к краям"""
+        tiles = tile_grid(3000, 4000, 1024, 0.2)
+
+        assert all(x2 - x1 == 1024 and y2 - y1 == 1024 for x1, y1, x2, y2 in tiles)
+        assert max(x2 for _, _, x2, _ in tiles) == 4000
+        assert max(y2 for _, _, _, y2 in tiles) == 3000
+        assert tile_grid(500, 600, 1024, 0.2) == [(0, 0, 600, 500)]
+
+    def test_object_split_by_tiles_is_merged(self):
+        """Тест: инструмент, разрезанный границами тайлов, и дубликаты из перекрытия дают один инстанс"""
+        image = np.zeros((1200, 2000, 3), dtype=np.uint8)
+        image[500:560, 200:1800] = 255  # длинный инструмент через несколько тайлов
+        image[100:140, 1500:1540] = 255  # мелкий инструмент в зоне перекрытия
+
+        result = tiled_predict(WhiteObjectsModel(), image, tile_size=640, overlap=0.25, include_full_image=False)
+
+        assert len(result.boxes) == 2
+        boxes = sorted(result.boxes.xyxy.tolist())
+        assert np.allclose(boxes[0], [200, 500, 1800, 560], atol=2)
+        assert np.allclose(boxes[1], [1500, 100, 1540, 140], atol=2)
+        assert result.masks.xy[0].shape[1] == 2
+
+    def test_separate_objects_are_not_merged(self):
+        """Тест: соседние разные инструменты в зоне перекрытия не склеиваются"""
+        image = np.zeros((640, 1100, 3), dtype=np.uint8)
+        image[100:300, 480:520] = 255
+        image[100:300, 540:580] = 255
+
+        result = tiled_predict(WhiteObjectsModel(), image, tile_size=640, overlap=0.5)
+
+        assert len(result.boxes) == 2
+
+    def test_empty_image(self):
+        """Тест: без детекций возвращается Results без боксов"""
+        image = np.zeros((1500, 1500, 3), dtype=np.uint8)
+
+        result = tiled_predict(WhiteObjectsModel(), image, tile_size=640)
+
+        assert result.boxes is None
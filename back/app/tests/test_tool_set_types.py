@@ -1,4 +1,7 @@
 import pytest
+from sqlalchemy import select
+
+from app.models.models import tool_set_type_tool_types
 
 class TestToolSetTypes:
     def test_create_tool_set_type_success(self, client, auth_headers, test_tool_type_item):
@@ -94,6 +97,59 @@ class TestToolSetTypes:
         # Проверяем, что tool_type_id есть в tool_type_ids найденного набора
         assert tool_type_id in data[0]["tool_type_ids"]
 
+    def test_tool_type_ids_are_stored_in_association_table(self, db_session, test_tool_set_type_with_tools):
+        """Тест: состав набора из tool_type_ids переносится в таблицу связей"""
+        rows = db_session.execute(
+            select(tool_set_type_tool_types.c.tool_type_id).where(
+                tool_set_type_tool_types.c.tool_set_type_id == test_tool_set_type_with_tools.id
+            )
+        ).scalars().all()
+
+        assert sorted(rows) == sorted(test_tool_set_type_with_tools.tool_type_ids)
+
+    def test_search_by_tool_type_after_update(self, client, auth_headers, test_tool_set_type_with_tools, test_tool_type_item):
+        """Тест обратного поиска после изменения состава набора"""
+        old_tool_type_id = test_tool_set_type_with_tools.tool_type_ids[0]
+        client.put(
+            f"/api/tool-set-types/{test_tool_set_type_with_tools.id}",
+            json={"tool_type_ids": [test_tool_type_item.id]},
+            headers=auth_headers
+        )
+
+        old_search = client.get(f"/api/tool-set-types/search/by-tool-type/{old_tool_type_id}", headers=auth_headers)
+        new_search = client.get(f"/api/tool-set-types/search/by-tool-type/{test_tool_type_item.id}", headers=auth_headers)
+
+        assert old_search.json() == []
+        assert [item["id"] for item in new_search.json()] == [test_tool_set_type_with_tools.id]
+
+    def test_delete_tool_type_updates_projection(self, client, auth_headers, test_tool_set_type_with_tools):
+        """Тест: удаление типа инструмента убирает его из tool_type_ids наборов"""
+        tool_type_ids = list(test_tool_set_type_with_tools.tool_type_ids)
+
+        response = client.delete(f"/api/tool-types/{tool_type_ids[0]}", headers=auth_headers)
+        assert response.status_code == 204
+
+        data = client.get(f"/api/tool-set-types/{test_tool_set_type_with_tools.id}", headers=auth_headers).json()
+        assert data["tool_type_ids"] == tool_type_ids[1:]
+
+    def test_bulk_create_tool_set_types(self, client, auth_headers, db_session, test_tool_set_type):
+        """Тест массового создания типов наборов вместе со связями"""
+        tool_type_ids = test_tool_set_type.tool_type_ids
+        response = client.post("/api/tool-set-types/bulk", json={"items": [
+            {"name": "Набор А", "tool_type_ids": tool_type_ids},
+            {"name": test_tool_set_type.name, "tool_type_ids": []},
+            {"name": "Набор Б", "tool_type_ids": [999]},
+            {"name": "Набор В", "tool_type_ids": tool_type_ids[:1]},
+        ]}, headers=auth_headers)
+
+        assert response.status_code == 201
+        data = response.json()
+        assert [item["name"] for item in data["created"]] == ["Набор А", "Набор В"]
+        assert [error["index"] for error in data["errors"]] == [1, 2]
+
+        search = client.get(f"/api/tool-set-types/search/by-tool-type/{tool_type_ids[0]}", headers=auth_headers)
+        assert {item["name"] for item in search.json()} == {test_tool_set_type.name, "Набор А", "Набор В"}
+
     def test_search_by_nonexistent_tool_type(self, client, auth_headers):
         """Тест поиска по несуществующему типу инструмента"""
         response = client.get("/api/tool-set-types/search/by-tool-type/9999", headers=auth_headers)
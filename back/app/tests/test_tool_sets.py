@@ -1,5 +1,7 @@
 import pytest
 
+from app.models.models import ToolSetItem, ToolSetType
+
 class TestToolSets:
     def test_create_tool_set_success(self, client, auth_headers, test_tool_set_type):
         """Тест успешного создания набора инструментов"""
@@ -61,6 +63,32 @@ class TestToolSets:
         assert response.status_code == 400
         assert "is not part of the selected tool set type" in response.json()["detail"]
 
+    def test_create_tool_set_unknown_tool_type(self, client, auth_headers, db_session):
+        """Тест: ключ batch_map с несуществующим типом инструмента - 400 и для типа набора без tool_type_ids"""
+        tool_set_type = ToolSetType(name="Тип без инструментов", tool_type_ids=[])
+        db_session.add(tool_set_type)
+        db_session.commit()
+
+        response = client.post("/api/tool-sets/", json={
+            "tool_set_type_id": tool_set_type.id, "batch_number": "UNKNOWN-1", "batch_map": {"9999": "SN-001"}
+        }, headers=auth_headers)
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Tool type ID 9999 not found"
+
+        response = client.post("/api/tool-sets/", json={
+            "tool_set_type_id": tool_set_type.id, "batch_number": "UNKNOWN-2", "batch_map": {"abc": "SN-001"}
+        }, headers=auth_headers)
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid tool type ID abc"
+
+        response = client.post("/api/tool-sets/bulk", json={"items": [
+            {"tool_set_type_id": tool_set_type.id, "batch_number": "UNKNOWN-3", "batch_map": {"9999": "SN-001"}},
+        ]}, headers=auth_headers)
+        assert response.status_code == 201
+        assert response.json()["created"] == []
+        assert response.json()["errors"] == [{"index": 0, "detail": "Tool type ID 9999 not found"}]
+        assert db_session.query(ToolSetItem).count() == 0
+
     def test_get_all_tool_sets(self, client, auth_headers, test_tool_set):
         """Тест получения всех наборов инструментов"""
         response = client.get("/api/tool-sets/", headers=auth_headers)
@@ -137,6 +165,54 @@ class TestToolSets:
         assert data["description"] == update_data["description"]
         assert data["batch_map"] == update_data["batch_map"]
 
+    def test_resolve_serials(self, client, auth_headers, test_tool_set, test_tool_set_2):
+        """Тест поиска наборов по партийным номерам инструментов одним запросом"""
+        response = client.post(
+            "/api/tool-sets/resolve-serials",
+            json={"serials": ["SN-002", "SN-UNKNOWN"]},
+            headers=auth_headers
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [item["serial"] for item in data] == ["SN-002", "SN-UNKNOWN"]
+        assert {"tool_set_id": test_tool_set.id, "tool_set_batch_number": test_tool_set.batch_number, "tool_type_id": 2} in data[0]["matches"]
+        assert data[1]["matches"] == []
+
+    def test_tool_set_items_follow_batch_map(self, client, auth_headers, db_session, test_tool_set):
+        """Тест синхронизации tool_set_items при изменении и удалении набора"""
+        client.put(
+            f"/api/tool-sets/{test_tool_set.id}",
+            json={"batch_map": {"1": "SN-UPDATED"}},
+            headers=auth_headers
+        )
+        items = db_session.query(ToolSetItem).filter(ToolSetItem.tool_set_id == test_tool_set.id).all()
+        assert [(item.tool_type_id, item.batch_number) for item in items] == [(1, "SN-UPDATED")]
+
+        client.delete(f"/api/tool-sets/{test_tool_set.id}", headers=auth_headers)
+        assert db_session.query(ToolSetItem).count() == 0
+
+    def test_bulk_create_tool_sets(self, client, auth_headers, test_tool_set_type, test_tool_set):
+        """Тест массового создания наборов вместе с партийными номерами инструментов"""
+        response = client.post("/api/tool-sets/bulk", json={"items": [
+            {"tool_set_type_id": test_tool_set_type.id, "batch_number": "BULK-1", "batch_map": {"1": "SN-B1"}},
+            {"tool_set_type_id": test_tool_set_type.id, "batch_number": test_tool_set.batch_number, "batch_map": {}},
+            {"tool_set_type_id": 999, "batch_number": "BULK-2", "batch_map": {}},
+            {"tool_set_type_id": test_tool_set_type.id, "batch_number": "BULK-3", "batch_map": {"999": "SN-X"}},
+        ]}, headers=auth_headers)
+
+        assert response.status_code == 201
+        data = response.json()
+        assert [item["batch_number"] for item in data["created"]] == ["BULK-1"]
+        assert data["errors"] == [
+            {"index": 1, "detail": "Tool set with this batch number already exists"},
+            {"index": 2, "detail": "Tool set type not found"},
+            {"index": 3, "detail": "Tool type ID 999 is not part of the selected tool set type"},
+        ]
+
+        resolved = client.post("/api/tool-sets/resolve-serials", json={"serials": ["SN-B1"]}, headers=auth_headers)
+        assert resolved.json()[0]["matches"][0]["tool_set_batch_number"] == "BULK-1"
+
     def test_update_tool_set_duplicate_batch_number(self, client, auth_headers, test_tool_set, test_tool_set_2):
         """Тест обновления с дублирующимся партийным номером"""
         update_data = {
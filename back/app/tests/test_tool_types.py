@@ -220,6 +220,151 @@ class TestToolTypes:
         assert tree[0]["name"] == "Корень"
         assert len(tree[0]["children"]) >= 1
 
+    def test_get_tool_type_tree_single_query_and_etag(self, client, auth_headers, test_tool_type_hierarchy, query_counter):
+        """Тест дерева: строится одним запросом, повторный запрос с ETag возвращает 304 без обращения к БД"""
+        query_counter.clear()
+        response = client.get("/api/tool-types/tree/root", headers=auth_headers)
+        queries_count = len(query_counter)
+
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+        # Пользователь из токена + все типы одним запросом, независимо от глубины дерева
+        assert queries_count <= 2
+
+        query_counter.clear()
+        cached_response = client.get(
+            "/api/tool-types/tree/root",
+            headers={**auth_headers, "If-None-Match": etag}
+        )
+        assert cached_response.status_code == 304
+        assert not any("tool_types" in statement for statement in query_counter)
+
+    def test_get_tool_type_tree_invalidated_on_change(self, client, auth_headers):
+        """Тест сброса кэша дерева при создании и удалении типов"""
+        root_id = client.post(
+            "/api/tool-types/", json={"name": "Корень", "category_id": None, "is_item": False}, headers=auth_headers
+        ).json()["id"]
+        first = client.get("/api/tool-types/tree/root", headers=auth_headers)
+
+        client.post(
+            "/api/tool-types/", json={"name": "Ключ", "category_id": root_id, "is_item": True}, headers=auth_headers
+        )
+        second = client.get("/api/tool-types/tree/root", headers=auth_headers)
+
+        assert second.headers["ETag"] != first.headers["ETag"]
+        assert second.json()[0]["children"][0]["name"] == "Ключ"
+
+        client.delete(f"/api/tool-types/{root_id}", headers=auth_headers)
+        assert client.get("/api/tool-types/tree/root", headers=auth_headers).json() == []
+
+    def test_bulk_create_tool_types(self, client, auth_headers, test_tool_type_category):
+        """Тест массового создания типов с ошибками отдельных элементов"""
+        first = client.get("/api/tool-types/tree/root", headers=auth_headers)
+
+        response = client.post("/api/tool-types/bulk", json={"items": [
+            {"name": "Отвертка", "category_id": test_tool_type_category.id, "is_item": True},
+            {"name": test_tool_type_category.name, "category_id": None, "is_item": False},
+            {"name": "Ключ", "category_id": 999, "is_item": True},
+            {"name": "Отвертка", "category_id": test_tool_type_category.id, "is_item": True},
+        ]}, headers=auth_headers)
+
+        assert response.status_code == 201
+        data = response.json()
+        assert data["created"] == []
+        assert data["errors"] == [
+            {"index": 0, "detail": "Duplicate name in request"},
+            {"index": 1, "detail": "Tool type with this name already exists"},
+            {"index": 2, "detail": "Parent category not found"},
+            {"index": 3, "detail": "Duplicate name in request"},
+        ]
+
+        response = client.post("/api/tool-types/bulk", json={"items": [
+            {"name": "Отвертка", "category_id": test_tool_type_category.id, "is_item": True},
+            {"name": "Ключ", "category_id": test_tool_type_category.id, "is_item": True},
+        ]}, headers=auth_headers)
+        assert [item["name"] for item in response.json()["created"]] == ["Отвертка", "Ключ"]
+
+        second = client.get("/api/tool-types/tree/root", headers=auth_headers)
+        assert second.headers["ETag"] != first.headers["ETag"]
+        assert len(second.json()[0]["children"]) == 2
+
+    def test_bulk_create_tool_type_tree(self, client, auth_headers):
+        """Тест массового создания дерева категорий через ref/parent_ref"""
+        response = client.post("/api/tool-types/bulk", json={"items": [
+            {"name": "Отвертка плюс", "parent_ref": "screwdrivers", "is_item": True, "tool_class": "OTVERTKA_PLUS"},
+            {"name": "Отвертки", "ref": "screwdrivers", "parent_ref": "hand", "is_item": False},
+            {"name": "Ручной инструмент", "ref": "hand", "is_item": False},
+            {"name": "Ключ", "parent_ref": "missing", "is_item": True},
+            {"name": "Цикл 1", "ref": "a", "parent_ref": "b", "is_item": False},
+            {"name": "Цикл 2", "ref": "b", "parent_ref": "a", "is_item": False},
+            {"name": "Вложенная в цикл", "parent_ref": "a", "is_item": True},
+            {"name": "Категория в инструменте", "parent_ref": "item", "is_item": False},
+            {"name": "Инструмент", "ref": "item", "parent_ref": "hand", "is_item": True},
+        ]}, headers=auth_headers)
+
+        assert response.status_code == 201
+        data = response.json()
+        created = {item["name"]: item for item in data["created"]}
+        assert [item["name"] for item in data["created"]] == ["Отвертка плюс", "Отвертки", "Ручной инструмент", "Инструмент"]
+        assert created["Ручной инструмент"]["category_id"] is None
+        assert created["Отвертки"]["category_id"] == created["Ручной инструмент"]["id"]
+        assert created["Отвертка плюс"]["category_id"] == created["Отвертки"]["id"]
+        assert data["errors"] == [
+            {"index": 3, "detail": "Parent ref not found"},
+            {"index": 4, "detail": "Cyclic parent_ref"},
+            {"index": 5, "detail": "Cyclic parent_ref"},
+            {"index": 6, "detail": "Parent item is not created"},
+            {"index": 7, "detail": "Category cannot be nested under an item"},
+        ]
+
+        tree = client.get("/api/tool-types/tree/root", headers=auth_headers).json()
+        assert tree[0]["name"] == "Ручной инструмент"
+        assert [child["name"] for child in tree[0]["children"]] == ["Отвертки", "Инструмент"]
+
+    def test_bulk_update_tool_types(self, client, auth_headers, test_tool_type_hierarchy):
+        """Тест массового обновления типов с ошибками отдельных элементов"""
+        root, subcategory, tool = (test_tool_type_hierarchy[key] for key in ("root", "subcategory", "tool"))
+        first = client.get("/api/tool-types/tree/root", headers=auth_headers)
+
+        response = client.put("/api/tool-types/bulk", json={"items": [
+            {"id": tool.id, "name": "Отвертка обновленная", "category_id": root.id},
+            {"id": subcategory.id, "name": root.name},
+            {"id": 999, "name": "Нет такого"},
+            {"id": root.id, "category_id": root.id},
+            {"id": subcategory.id, "tool_class": "OTVERTKA_PLUS"},
+        ]}, headers=auth_headers)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [(item["id"], item["name"], item["category_id"]) for item in data["updated"]] == [
+            (tool.id, "Отвертка обновленная", root.id)
+        ]
+        assert data["errors"] == [
+            {"index": 1, "detail": "Duplicate id in request"},
+            {"index": 2, "detail": "Tool type not found"},
+            {"index": 3, "detail": "Cannot set self as parent"},
+            {"index": 4, "detail": "Duplicate id in request"},
+        ]
+
+        response = client.put("/api/tool-types/bulk", json={"items": [
+            {"id": subcategory.id, "tool_class": "OTVERTKA_PLUS"},
+        ]}, headers=auth_headers)
+        assert response.json()["updated"][0]["is_item"] is True
+
+        second = client.get("/api/tool-types/tree/root", headers=auth_headers)
+        assert second.headers["ETag"] != first.headers["ETag"]
+        assert client.get(f"/api/tool-types/{tool.id}", headers=auth_headers).json()["name"] == "Отвертка обновленная"
+
+    def test_bulk_create_too_many_items(self, client, auth_headers, monkeypatch):
+        """Тест ограничения размера массового запроса"""
+        monkeypatch.setattr("app.bulk.BULK_MAX_ITEMS", 1)
+        response = client.post("/api/tool-types/bulk", json={"items": [
+            {"name": "Корень 1", "category_id": None, "is_item": False},
+            {"name": "Корень 2", "category_id": None, "is_item": False},
+        ]}, headers=auth_headers)
+
+        assert response.status_code == 400
+
     def test_get_root_categories(self, client, auth_headers):
         """Тест получения корневых категорий"""
         # Создаем корневые категории
@@ -339,6 +484,27 @@ class TestToolTypes:
         
         assert response.status_code == 204
 
+    def test_delete_category_removes_whole_subtree(self, client, auth_headers, db_session):
+        """Тест удаления категории вместе со всеми потомками любой глубины"""
+        root_id = client.post(
+            "/api/tool-types/", json={"name": "Корень", "category_id": None, "is_item": False}, headers=auth_headers
+        ).json()["id"]
+        child_id = client.post(
+            "/api/tool-types/", json={"name": "Подкатегория", "category_id": root_id, "is_item": False}, headers=auth_headers
+        ).json()["id"]
+        client.post(
+            "/api/tool-types/", json={"name": "Инструмент", "category_id": child_id, "is_item": True}, headers=auth_headers
+        )
+        other_id = client.post(
+            "/api/tool-types/", json={"name": "Другая", "category_id": None, "is_item": False}, headers=auth_headers
+        ).json()["id"]
+
+        response = client.delete(f"/api/tool-types/{root_id}", headers=auth_headers)
+
+        assert response.status_code == 204
+        remaining = client.get("/api/tool-types/", headers=auth_headers).json()
+        assert [item["id"] for item in remaining] == [other_id]
+
     def test_tool_types_unauthorized_access(self, client):
         """Тест доступа к API типов инструментов без аутентификации"""
         # Все операции без токена должны возвращать 401
@@ -0,0 +1,42 @@
+import json
+
+from app import tracing
+from app.tracing import ChromeTraceWriter, start_trace, span, record_span
+
+
+class TestTracing:
+    def test_trace_collects_stage_timings(self):
+        """Тест: спаны этапов попадают в трассировку, повторяющиеся этапы суммируются"""
+        with start_trace("predict_file", filename="tray.jpg") as trace:
+            with span("image_decode"):
+                pass
+            record_span("forward", 0.0, 0.010)
+            record_span("forward", 0.0, 0.005)
+
+        timings = trace.timings()
+        assert set(timings) == {"image_decode", "forward", "total"}
+        assert timings["forward"] == 15.0
+        assert timings["total"] >= timings["image_decode"]
+
+    def test_span_without_trace(self):
+        """Тест: вне трассировки спан только обновляет метрику"""
+        with span("serialize"):
+            pass
+
+        assert tracing.current_trace.get() is None
+
+    def test_chrome_trace_export(self, tmp_path, monkeypatch):
+        """Тест записи трассировок в файл формата Chrome Trace"""
+        path = tmp_path / "trace.json"
+        monkeypatch.setattr(tracing, "trace_writer", ChromeTraceWriter(str(path)))
+
+        for frame_number in (1, 2):
+            with start_trace("ws_video_frame", frame_number=frame_number):
+                with span("forward"):
+                    pass
+
+        # Файл дописывается без закрывающей скобки - для проверки закрываем массив сами
+        events = json.loads(path.read_text().rstrip().rstrip(",") + "]")
+        assert [event["name"] for event in events] == ["ws_video_frame", "forward", "ws_video_frame", "forward"]
+        assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events)
+        assert events[2]["args"] == {"frame_number": 2}
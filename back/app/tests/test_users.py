@@ -1,4 +1,5 @@
 import pytest
+from app.models import models
 
 class TestUsers:
     def test_get_current_user_success(self, client, auth_headers):
@@ -35,6 +36,28 @@ class TestUsers:
         assert response.status_code == 403
         assert "Not enough permissions" in response.json()["detail"]
 
+    def test_current_user_served_from_cache(self, client, auth_headers, db_session, test_user, query_counter):
+        """Тест: пользователь запроса берется из кэша и перечитывается после изменения"""
+        query_counter.clear()
+        response = client.get("/api/users/me", headers=auth_headers)
+
+        assert response.status_code == 200
+        assert not any("FROM users" in statement for statement in query_counter)
+
+        test_user.full_name = "Renamed User"
+        db_session.commit()
+
+        assert client.get("/api/users/me", headers=auth_headers).json()["full_name"] == "Renamed User"
+
+    def test_token_rejected_after_role_change(self, client, auth_headers, db_session, test_user):
+        """Тест: токен, выданный до смены роли, больше не принимается"""
+        test_user.role = models.Role.WAREHOUSE_EMPLOYEE
+        db_session.commit()
+
+        response = client.get("/api/users/me", headers=auth_headers)
+
+        assert response.status_code == 401
+
     def test_invalid_token(self, client):
         """Тест с невалидным токеном"""
         response = client.get("/api/users/me", headers={
@@ -0,0 +1,100 @@
+import asyncio
+import base64
+import json
+
+from app.ml import predict_yolo_seg_prod
+from app.api import websocket
+from app.ws_loadtest import ClientStats, load_frames, summarize
+
+
+class TestWsLoadtest:
+    def test_results_matched_by_frame_number(self):
+        """Тест: ответы сопоставляются с кадрами по номеру, кадры без ответа считаются потерянными"""
+        stats = ClientStats(0)
+        for _ in range(3):
+            stats.on_sent()
+        stats.on_result({"type": "frame_received", "frame_number": 2, "timings": {"total": 5.0}})
+        stats.on_result({"type": "frame_received", "frame_number": 1})
+
+        summary = summarize([stats], elapsed=1.0, cpu_seconds=0.5)
+        assert summary["frames_sent"] == 3
+        assert summary["frames_received"] == 2
+        assert summary["frames_dropped"] == 1
+        assert summary["server_cpu_percent"] == 50.0
+        assert summary["server_timings_ms"]["total"]["p50"] == 5.0
+
+    def test_video_frame_protocol(self, client, tmp_path, monkeypatch):
+        """Тест протокола /api/ws/video с заглушкой инференса: кадр драйвера получает frame_received"""
+        monkeypatch.setattr(predict_yolo_seg_prod, "INFERENCE_STUB_MS", 0.0)
+        monkeypatch.setattr(websocket, "FRAME_PATH", tmp_path / "output.jpg")
+        frame = load_frames(None, 64, 48, 90)[0]
+
+        with client.websocket_connect("/api/ws/video") as ws:
+            assert ws.receive_json()["type"] == "connection_established"
+            ws.send_text(json.dumps({"type": "video_frame", "timestamp": 0, "frame": frame, "timings": True}))
+            message = ws.receive_json()
+            [frame_file] = tmp_path.glob("output_*.jpg")
+            assert frame_file.read_bytes() == base64.b64decode(frame)
+
+        assert message["type"] == "frame_received"
+        assert message["frame_number"] == 1
+        assert message["classes"] == []
+        # Заглушка с нулевой задержкой укладывается в бюджет на любом размере
+        assert message["imgsz"] == max(predict_yolo_seg_prod.INFERENCE_IMGSZ_OPTIONS)
+        assert message["overlap_pairs"] == []
+        assert "segment" in message["timings"]
+        # Файл кадра удаляется при отключении клиента
+        assert not list(tmp_path.glob("output_*.jpg"))
+
+    def test_concurrent_frames_downshift_resolution(self, tmp_path, monkeypatch):
+        """Тест: кадр, пришедший во время инференса другого кадра, обрабатывается в меньшем разрешении"""
+        monkeypatch.setattr(predict_yolo_seg_prod, "INFERENCE_STUB_MS", 200.0)
+        monkeypatch.setattr(predict_yolo_seg_prod, "INFERENCE_IMGSZ", 640)
+        monkeypatch.setattr(predict_yolo_seg_prod, "INFERENCE_IMGSZ_OPTIONS", [480, 640, 960])
+        monkeypatch.setattr(websocket, "FRAME_PATH", tmp_path / "output.jpg")
+        frame = load_frames(None, 64, 48, 90)[0]
+        manager = websocket.ConnectionManager()
+
+        class FakeWebSocket:
+            def __init__(self):
+                self.messages = []
+
+            async def accept(self):
+                pass
+
+            async def send_text(self, payload):
+                self.messages.append(json.loads(payload))
+
+        async def scenario():
+            sockets = {client_id: FakeWebSocket() for client_id in ("first", "second")}
+            for client_id, ws in sockets.items():
+                await manager.connect(ws, client_id)
+            message = {"type": "video_frame", "frame": frame, "latency_budget_ms": 300}
+            await asyncio.gather(*(manager.handle_video_frame(client_id, message) for client_id in sockets))
+            return {client_id: ws.messages[-1] for client_id, ws in sockets.items()}
+
+        results = asyncio.run(scenario())
+
+        # Бюджет 300 мс: один кадр в очереди - 640 (200 мс), два - по 150 мс на кадр, только 480
+        assert results["first"]["imgsz"] == 640
+        assert results["second"]["imgsz"] == 480
+        assert manager.frames_in_progress == 0
+
+    def test_select_imgsz_does_not_wait_for_model_load(self, monkeypatch):
+        """Тест: пока модель не загружена, разрешение выбирается без загрузки модели на event loop"""
+        registry = predict_yolo_seg_prod.ModelRegistry()
+
+        def load_model():
+            raise AssertionError("select_imgsz не должен загружать модель")
+
+        monkeypatch.setattr(registry, "get_segment_model", load_model)
+        monkeypatch.setattr(predict_yolo_seg_prod, "model_registry", registry)
+        monkeypatch.setattr(predict_yolo_seg_prod, "INFERENCE_STUB_MS", None)
+
+        assert predict_yolo_seg_prod.select_imgsz(quality="accurate") == predict_yolo_seg_prod.INFERENCE_IMGSZ
+
+        class LoadedModel:
+            resolution = predict_yolo_seg_prod.ResolutionPolicy([320, 960], 640)
+
+        registry._segment_model = LoadedModel()
+        assert predict_yolo_seg_prod.select_imgsz(quality="accurate") == 960
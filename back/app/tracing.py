@@ -0,0 +1,115 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from .config import INFERENCE_TRACE_FILE
+from .metrics import INFERENCE_STAGE_DURATION
+
+
+class Span:
+    __slots__ = ("name", "start", "duration", "thread_id")
+
+    def __init__(self, name: str, start: float, duration: float, thread_id: int):
+        self.name = name
+        self.start = start
+        self.duration = duration
+        self.thread_id = thread_id
+
+
+class Trace:
+    """Спаны этапов обработки одного кадра/фото"""
+
+    def __init__(self, name: str, **args):
+        self.name = name
+        self.args = args
+        self.start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.spans: List[Span] = []
+
+    def add(self, name: str, start: float, duration: float):
+        self.spans.append(Span(name, start, duration, threading.get_ident()))
+
+    def timings(self) -> Dict[str, float]:
+        """Длительность этапов в миллисекундах (повторяющиеся этапы суммируются) и общее время"""
+        result: Dict[str, float] = {}
+        for span in self.spans:
+            result[span.name] = result.get(span.name, 0.0) + span.duration * 1000
+        end = self.start + self.duration if self.duration is not None else time.perf_counter()
+        result["total"] = (end - self.start) * 1000
+        return {name: round(value, 3) for name, value in result.items()}
+
+    def chrome_events(self) -> List[dict]:
+        """События формата Chrome Trace (ph="X"), время в микросекундах"""
+        pid = os.getpid()
+        events = [{
+            "name": self.name, "ph": "X", "pid": pid, "tid": threading.get_ident(),
+            "ts": self.start * 1e6, "dur": (self.duration or 0.0) * 1e6, "args": self.args,
+        }]
+        events.extend({
+            "name": span.name, "ph": "X", "pid": pid, "tid": span.thread_id,
+            "ts": span.start * 1e6, "dur": span.duration * 1e6,
+        } for span in self.spans)
+        return events
+
+
+class ChromeTraceWriter:
+    """
+    Дописывает события в файл формата Chrome Trace (JSON Array Format).
+
+    Закрывающая скобка массива не пишется - chrome://tracing и Perfetto принимают такой файл,
+    поэтому события можно дописывать без перечитывания файла.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, events: List[dict]):
+        lines = "".join(json.dumps(event, ensure_ascii=False) + ",\n" for event in events)
+        with self._lock:
+            is_new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            with open(self.path, "a", encoding="utf-8") as f:
+                if is_new:
+                    f.write("[\n")
+                f.write(lines)
+
+
+trace_writer: Optional[ChromeTraceWriter] = ChromeTraceWriter(INFERENCE_TRACE_FILE) if INFERENCE_TRACE_FILE else None
+
+current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("current_trace", default=None)
+
+
+@contextmanager
+def start_trace(name: str, **args):
+    """Трассировка обработки одного кадра/фото: спаны внутри попадают в возвращаемый Trace"""
+    trace = Trace(name, **args)
+    token = current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        current_trace.reset(token)
+        trace.duration = time.perf_counter() - trace.start
+        if trace_writer is not None:
+            trace_writer.write(trace.chrome_events())
+
+
+def record_span(stage: str, start: float, duration: float):
+    """Спан с известными началом и длительностью (например, из замеров самой модели)"""
+    INFERENCE_STAGE_DURATION.observe(duration, stage=stage)
+    trace = current_trace.get()
+    if trace is not None:
+        trace.add(stage, start, duration)
+
+
+@contextmanager
+def span(stage: str):
+    """Замер этапа инференса: метрика inference_stage_duration_seconds и спан текущей трассировки"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(stage, start, time.perf_counter() - start)
@@ -0,0 +1,254 @@
+"""
+Нагрузочный тест /api/ws/video: N одновременных клиентов отправляют JPEG-кадры с заданным FPS.
+
+Протокол совпадает с экраном сканирования инструментов мобильного приложения
+(ToolsScanerScreen.js): сообщение {"type": "video_frame", "timestamp": <мс>, "frame": <base64 JPEG>}
+по таймеру, не дожидаясь ответа на предыдущий кадр. Ответ frame_received сопоставляется с кадром
+по frame_number (номер кадра в соединении), поэтому задержка считается от отправки кадра до
+получения результата, включая ожидание в очереди сервера. Кадры без ответа к концу теста
+(после --drain секунд ожидания) считаются потерянными.
+
+Загрузка CPU сервера считается по process_cpu_seconds_total из /metrics до и после теста
+(процесс, ответивший на /metrics; при нескольких воркерах uvicorn - только один из них).
+/metrics требует METRICS_TOKEN сервера или JWT администратора (--metrics-token), без него
+загрузка CPU не считается.
+
+Для проверки ConnectionManager без весов моделей сервер запускается с INFERENCE_STUB_MS:
+
+    INFERENCE_STUB_MS=50 uvicorn app.main:app --port 8000
+    python -m app.ws_loadtest --url http://localhost:8000 --clients 10 --fps 2 --duration 30
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import re
+import sys
+import time
+import urllib.request
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+import websockets
+
+from app.ml.benchmark import collect_images, latency_summary
+
+CPU_METRIC = re.compile(r"^process_cpu_seconds_total\s+(\S+)$", re.MULTILINE)
+
+
+def load_frames(images_dir: Optional[Path], width: int, height: int, quality: int) -> List[str]:
+    """
+    Кадры в base64, как их отправляет приложение (JPEG 640x480, quality 0.9).
+
+    Без каталога изображений генерируется синтетический кадр (шум с фиксированным seed).
+    """
+    if images_dir is not None:
+        images = [cv2.imread(str(path)) for path in collect_images(images_dir)]
+    else:
+        images = [np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8)]
+    frames = []
+    for image in images:
+        image = cv2.resize(image, (width, height))
+        ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise ValueError("Не удалось закодировать кадр в JPEG")
+        frames.append(base64.b64encode(encoded.tobytes()).decode("ascii"))
+    return frames
+
+
+def server_cpu_seconds(base_url: str, token: Optional[str] = None) -> Optional[float]:
+    request = urllib.request.Request(f"{base_url}/metrics")
+    if token:
+        request.add_header("Authorization", f"Bearer {token}")
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            match = CPU_METRIC.search(response.read().decode("utf-8"))
+    except Exception:
+        return None
+    return float(match.group(1)) if match else None
+
+
+class ClientStats:
+    """Кадры одного клиента: время отправки по номеру кадра, задержки, потери"""
+
+    def __init__(self, client_index: int):
+        self.client_index = client_index
+        self.sent_at: Dict[int, float] = {}
+        self.latencies_ms: List[float] = []
+        self.server_timings: List[dict] = []
+        self.sent = 0
+        self.received = 0
+        self.connect_ms: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self.sent_at)
+
+    def on_sent(self) -> int:
+        self.sent += 1
+        self.sent_at[self.sent] = time.perf_counter()
+        return self.sent
+
+    def on_result(self, message: dict):
+        sent_at = self.sent_at.pop(message.get("frame_number"), None)
+        if sent_at is None:
+            return
+        self.received += 1
+        self.latencies_ms.append((time.perf_counter() - sent_at) * 1000)
+        if "timings" in message:
+            self.server_timings.append(message["timings"])
+
+
+async def run_client(client_index: int, ws_url: str, frames: List[str], args, stats: ClientStats):
+    """Отправка кадров с заданным FPS и прием результатов в отдельной задаче"""
+    interval = 1.0 / args.fps
+    start = time.perf_counter()
+    try:
+        async with websockets.connect(ws_url, max_size=None, open_timeout=args.connect_timeout) as ws:
+            handshake = json.loads(await ws.recv())
+            if handshake.get("type") != "connection_established":
+                raise RuntimeError(f"Unexpected handshake: {handshake.get('type')}")
+            stats.connect_ms = (time.perf_counter() - start) * 1000
+
+            async def receive():
+                async for raw in ws:
+                    message = json.loads(raw)
+                    if message.get("type") == "frame_received":
+                        stats.on_result(message)
+
+            receiver = asyncio.create_task(receive())
+            # Клиенты стартуют со сдвигом внутри интервала, чтобы кадры не приходили пачкой
+            next_send = time.perf_counter() + interval * client_index / args.clients
+            deadline = time.perf_counter() + args.duration
+            frame_index = client_index
+            while next_send < deadline:
+                await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+                message = {
+                    "type": "video_frame",
+                    "timestamp": int(time.time() * 1000),
+                    "frame": frames[frame_index % len(frames)],
+                }
+                if args.timings:
+                    message["timings"] = True
+                stats.on_sent()
+                await ws.send(json.dumps(message))
+                frame_index += 1
+                next_send += interval
+
+            drain_deadline = time.perf_counter() + args.drain
+            while stats.pending and time.perf_counter() < drain_deadline and not receiver.done():
+                await asyncio.sleep(0.05)
+            receiver.cancel()
+    except Exception as e:
+        stats.error = f"{type(e).__name__}: {e}"
+
+
+def summarize(stats: List[ClientStats], elapsed: float, cpu_seconds: Optional[float]) -> dict:
+    latencies = [latency for client in stats for latency in client.latencies_ms]
+    sent = sum(client.sent for client in stats)
+    received = sum(client.received for client in stats)
+    connect_times = [client.connect_ms for client in stats if client.connect_ms is not None]
+    summary = {
+        "clients_connected": len(connect_times),
+        "clients_failed": sum(client.error is not None for client in stats),
+        "frames_sent": sent,
+        "frames_received": received,
+        "frames_dropped": sent - received,
+        "drop_rate": round((sent - received) / sent, 4) if sent else 0.0,
+        "results_per_second": round(received / elapsed, 3) if elapsed else 0.0,
+        "latency_ms": latency_summary(latencies) if latencies else None,
+        "connect_ms": latency_summary(connect_times) if connect_times else None,
+        "server_cpu_percent": round(cpu_seconds / elapsed * 100, 1) if cpu_seconds is not None else None,
+    }
+
+    timings = [timing for client in stats for timing in client.server_timings]
+    if timings:
+        stages = sorted({stage for timing in timings for stage in timing})
+        summary["server_timings_ms"] = {
+            stage: latency_summary([timing[stage] for timing in timings if stage in timing]) for stage in stages
+        }
+    errors = sorted({client.error for client in stats if client.error})
+    if errors:
+        summary["errors"] = errors
+    return summary
+
+
+async def run_load(args) -> dict:
+    base_url = args.url.rstrip("/")
+    ws_url = re.sub(r"^http", "ws", base_url) + "/api/ws/video"
+    frames = load_frames(args.images, args.width, args.height, args.quality)
+    stats = [ClientStats(index) for index in range(args.clients)]
+
+    cpu_before = server_cpu_seconds(base_url, args.metrics_token)
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(index, ws_url, frames, args, stats[index]) for index in range(args.clients)))
+    elapsed = time.perf_counter() - start
+    cpu_after = server_cpu_seconds(base_url, args.metrics_token)
+    cpu_seconds = cpu_after - cpu_before if cpu_before is not None and cpu_after is not None else None
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "url": ws_url, "clients": args.clients, "fps": args.fps, "duration": args.duration,
+            "frame_size": [args.width, args.height], "jpeg_quality": args.quality,
+            "frame_bytes": len(base64.b64decode(frames[0])), "frames_in_corpus": len(frames),
+        },
+        "elapsed_seconds": round(elapsed, 3),
+        "summary": summarize(stats, elapsed, cpu_seconds),
+        "clients": [
+            {
+                "client": client.client_index, "sent": client.sent, "received": client.received,
+                "latency_ms": latency_summary(client.latencies_ms) if client.latencies_ms else None,
+                "error": client.error,
+            }
+            for client in stats
+        ],
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузочный тест /api/ws/video")
+    parser.add_argument("--url", default="http://localhost:8000", help="Адрес API (без /api)")
+    parser.add_argument("--clients", type=int, default=10, help="Число одновременных соединений")
+    parser.add_argument("--fps", type=float, default=0.5, help="Кадров в секунду на клиента (в приложении 0.5)")
+    parser.add_argument("--duration", type=float, default=30, help="Длительность отправки кадров, секунды")
+    parser.add_argument("--drain", type=float, default=10, help="Ожидание ответов после отправки, секунды")
+    parser.add_argument("--images", type=Path, default=None, help="Каталог с кадрами (иначе синтетический кадр)")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--quality", type=int, default=90, help="Качество JPEG")
+    parser.add_argument("--timings", action="store_true", help="Запрашивать у сервера длительность этапов")
+    parser.add_argument("--connect-timeout", type=float, default=10)
+    parser.add_argument(
+        "--metrics-token", default=os.getenv("METRICS_TOKEN"),
+        help="Токен для /metrics: METRICS_TOKEN сервера или JWT администратора"
+    )
+    parser.add_argument("--output", type=Path, default=None, help="Файл для JSON-отчета (по умолчанию stdout)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    report = asyncio.run(run_load(args))
+    payload = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output is not None:
+        args.output.write_text(payload, encoding="utf-8")
+    else:
+        print(payload)
+    summary = report["summary"]
+    print(
+        f"sent={summary['frames_sent']} received={summary['frames_received']} dropped={summary['frames_dropped']} "
+        f"p95={summary['latency_ms']['p95'] if summary['latency_ms'] else None} ms "
+        f"cpu={summary['server_cpu_percent']}%",
+        file=sys.stderr,
+    )
+    return 0 if summary["clients_failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())